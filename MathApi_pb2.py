@@ -24,7 +24,7 @@ _sym_db = _symbol_database.Default()
 
 
 
-DESCRIPTOR = _descriptor_pool.Default().AddSerializedFile(b'\n\rMathApi.proto\"L\n\x08\x41rgStart\x12\x0f\n\x07modelId\x18\x01 \x01(\t\x12\x11\n\tmodelName\x18\x02 \x01(\t\x12\x1c\n\tconstants\x18\x03 \x03(\x0b\x32\t.Constant\"4\n\x07\x41rgData\x12\x0f\n\x07modelId\x18\x01 \x01(\t\x12\x18\n\x07tagsVal\x18\x02 \x03(\x0b\x32\x07.TagVal\"\x1b\n\x08\x41rgModel\x12\x0f\n\x07modelId\x18\x01 \x01(\t\"!\n\x0c\x41rgModelName\x12\x11\n\tmodelName\x18\x01 \x01(\t\",\n\nArgRequest\x12\x1e\n\x07request\x18\x01 \x03(\x0b\x32\r.KeyValuePair\"*\n\x0cKeyValuePair\x12\x0b\n\x03key\x18\x01 \x01(\t\x12\r\n\x05value\x18\x02 \x01(\t\"9\n\x06Models\x12\x1e\n\nmodelNames\x18\x01 \x03(\x0b\x32\n.ModelName\x12\x0f\n\x07message\x18\x02 \x01(\t\"\'\n\tModelName\x12\x0c\n\x04name\x18\x01 \x01(\t\x12\x0c\n\x04\x64\x65sc\x18\x02 \x01(\t\"/\n\x04Tags\x12\x16\n\x04tags\x18\x01 \x03(\x0b\x32\x08.TagType\x12\x0f\n\x07message\x18\x02 \x01(\t\"3\n\x07TagType\x12\x0c\n\x04name\x18\x01 \x01(\t\x12\x0c\n\x04\x64\x65sc\x18\x02 \x01(\t\x12\x0c\n\x04unit\x18\x03 \x01(\t\":\n\rTagsDataArray\x12\x18\n\x07tagsVal\x18\x01 \x03(\x0b\x32\x07.TagVal\x12\x0f\n\x07message\x18\x02 \x01(\t\"R\n\x06TagVal\x12\x0f\n\x07tagName\x18\x01 \x01(\t\x12\x11\n\ttimeStamp\x18\x02 \x01(\x04\x12\x14\n\x0cnumericValue\x18\x03 \x01(\x01\x12\x0e\n\x06isGood\x18\x04 \x01(\x08\"\x1b\n\x08RetReply\x12\x0f\n\x07message\x18\x01 \x01(\t\"?\n\tConstants\x12!\n\x0e\x63onstantValues\x18\x01 \x03(\x0b\x32\t.Constant\x12\x0f\n\x07message\x18\x02 \x01(\t\"\'\n\x08\x43onstant\x12\x0c\n\x04name\x18\x01 \x01(\t\x12\r\n\x05value\x18\x02 \x01(\t2\xb7\x02\n\x07MathApi\x12\x1f\n\x05Start\x12\t.ArgStart\x1a\t.RetReply\"\x00\x12\x1e\n\x04Stop\x12\t.ArgModel\x1a\t.RetReply\"\x00\x12\x1f\n\x05Pause\x12\t.ArgModel\x1a\t.RetReply\"\x00\x12#\n\tGetModels\x12\x0b.ArgRequest\x1a\x07.Models\"\x00\x12&\n\x0cGetInputTags\x12\r.ArgModelName\x1a\x05.Tags\"\x00\x12\'\n\rGetOutputTags\x12\r.ArgModelName\x1a\x05.Tags\"\x00\x12+\n\x0cGetConstants\x12\r.ArgModelName\x1a\n.Constants\"\x00\x12\'\n\tTransform\x12\x08.ArgData\x1a\x0e.TagsDataArray\"\x00\x42\x0f\xaa\x02\x0cGrpc.MathApib\x06proto3')
+DESCRIPTOR = _descriptor_pool.Default().AddSerializedFile(b'\n\rMathApi.proto\"L\n\x08\x41rgStart\x12\x0f\n\x07modelId\x18\x01 \x01(\t\x12\x11\n\tmodelName\x18\x02 \x01(\t\x12\x1c\n\tconstants\x18\x03 \x03(\x0b\x32\t.Constant\"4\n\x07\x41rgData\x12\x0f\n\x07modelId\x18\x01 \x01(\t\x12\x18\n\x07tagsVal\x18\x02 \x03(\x0b\x32\x07.TagVal\"=\n\x0c\x41rgDataBatch\x12\x0f\n\x07modelId\x18\x01 \x01(\t\x12\x1c\n\x07samples\x18\x02 \x03(\x0b\x32\x0b.TagsSample\"&\n\nTagsSample\x12\x18\n\x07tagsVal\x18\x01 \x03(\x0b\x32\x07.TagVal\"<\n\rArgAppendData\x12\x0f\n\x07modelId\x18\x01 \x01(\t\x12\x1a\n\x06points\x18\x02 \x03(\x0b\x32\n.DataPoint\".\n\tDataPoint\x12\n\n\x02x1\x18\x01 \x01(\x01\x12\n\n\x02x2\x18\x02 \x01(\x01\x12\t\n\x01y\x18\x03 \x01(\x01\"\x1b\n\x08\x41rgModel\x12\x0f\n\x07modelId\x18\x01 \x01(\t\"!\n\x0c\x41rgModelName\x12\x11\n\tmodelName\x18\x01 \x01(\t\",\n\nArgRequest\x12\x1e\n\x07request\x18\x01 \x03(\x0b\x32\r.KeyValuePair\"*\n\x0cKeyValuePair\x12\x0b\n\x03key\x18\x01 \x01(\t\x12\r\n\x05value\x18\x02 \x01(\t\"9\n\x06Models\x12\x1e\n\nmodelNames\x18\x01 \x03(\x0b\x32\n.ModelName\x12\x0f\n\x07message\x18\x02 \x01(\t\"\'\n\tModelName\x12\x0c\n\x04name\x18\x01 \x01(\t\x12\x0c\n\x04\x64\x65sc\x18\x02 \x01(\t\"/\n\x04Tags\x12\x16\n\x04tags\x18\x01 \x03(\x0b\x32\x08.TagType\x12\x0f\n\x07message\x18\x02 \x01(\t\"3\n\x07TagType\x12\x0c\n\x04name\x18\x01 \x01(\t\x12\x0c\n\x04\x64\x65sc\x18\x02 \x01(\t\x12\x0c\n\x04unit\x18\x03 \x01(\t\"K\n\rTagsDataArray\x12\x18\n\x07tagsVal\x18\x01 \x03(\x0b\x32\x07.TagVal\x12\x0f\n\x07message\x18\x02 \x01(\t\x12\x0f\n\x07modelId\x18\x03 \x01(\t\"R\n\x06TagVal\x12\x0f\n\x07tagName\x18\x01 \x01(\t\x12\x11\n\ttimeStamp\x18\x02 \x01(\x04\x12\x14\n\x0cnumericValue\x18\x03 \x01(\x01\x12\x0e\n\x06isGood\x18\x04 \x01(\x08\"\x1b\n\x08RetReply\x12\x0f\n\x07message\x18\x01 \x01(\t\"?\n\tConstants\x12!\n\x0e\x63onstantValues\x18\x01 \x03(\x0b\x32\t.Constant\x12\x0f\n\x07message\x18\x02 \x01(\t\"\'\n\x08\x43onstant\x12\x0c\n\x04name\x18\x01 \x01(\t\x12\r\n\x05value\x18\x02 \x01(\t\"4\n\x05Stats\x12\x1a\n\x06values\x18\x01 \x03(\x0b\x32\n.StatValue\x12\x0f\n\x07message\x18\x02 \x01(\t\"G\n\tStatValue\x12\x0c\n\x04name\x18\x01 \x01(\t\x12\x1d\n\x06labels\x18\x02 \x03(\x0b\x32\r.KeyValuePair\x12\r\n\x05value\x18\x03 \x01(\x01\"\xa9\x01\n\x0bModelStatus\x12\x0f\n\x07modelId\x18\x01 \x01(\t\x12\x11\n\tmodelName\x18\x02 \x01(\t\x12\r\n\x05state\x18\x03 \x01(\t\x12\r\n\x05\x65rror\x18\x04 \x01(\t\x12\x14\n\x0cqueueSeconds\x18\x05 \x01(\x01\x12\x14\n\x0c\x62uildSeconds\x18\x06 \x01(\x01\x12\x1b\n\x07timings\x18\x07 \x03(\x0b\x32\n.StatValue\x12\x0f\n\x07message\x18\x08 \x01(\t2\x98\x04\n\x07MathApi\x12\x1f\n\x05Start\x12\t.ArgStart\x1a\t.RetReply\"\x00\x12\x1e\n\x04Stop\x12\t.ArgModel\x1a\t.RetReply\"\x00\x12\x1f\n\x05Pause\x12\t.ArgModel\x1a\t.RetReply\"\x00\x12#\n\tGetModels\x12\x0b.ArgRequest\x1a\x07.Models\"\x00\x12&\n\x0cGetInputTags\x12\r.ArgModelName\x1a\x05.Tags\"\x00\x12\'\n\rGetOutputTags\x12\r.ArgModelName\x1a\x05.Tags\"\x00\x12+\n\x0cGetConstants\x12\r.ArgModelName\x1a\n.Constants\"\x00\x12\'\n\tTransform\x12\x08.ArgData\x1a\x0e.TagsDataArray\"\x00\x12\x31\n\x0eTransformBatch\x12\r.ArgDataBatch\x1a\x0e.TagsDataArray\"\x00\x12\x31\n\x0fTransformStream\x12\x08.ArgData\x1a\x0e.TagsDataArray\"\x00(\x01\x30\x01\x12!\n\x08GetStats\x12\x0b.ArgRequest\x1a\x06.Stats\"\x00\x12)\n\nAppendData\x12\x0e.ArgAppendData\x1a\t.RetReply\"\x00\x12+\n\x0eGetModelStatus\x12\t.ArgModel\x1a\x0c.ModelStatus\"\x00\x42\x0f\xaa\x02\x0cGrpc.MathApib\x06proto3')
 
 _globals = globals()
 _builder.BuildMessageAndEnumDescriptors(DESCRIPTOR, _globals)
@@ -36,32 +36,46 @@ if not _descriptor._USE_C_DESCRIPTORS:
   _globals['_ARGSTART']._serialized_end=93
   _globals['_ARGDATA']._serialized_start=95
   _globals['_ARGDATA']._serialized_end=147
-  _globals['_ARGMODEL']._serialized_start=149
-  _globals['_ARGMODEL']._serialized_end=176
-  _globals['_ARGMODELNAME']._serialized_start=178
-  _globals['_ARGMODELNAME']._serialized_end=211
-  _globals['_ARGREQUEST']._serialized_start=213
-  _globals['_ARGREQUEST']._serialized_end=257
-  _globals['_KEYVALUEPAIR']._serialized_start=259
-  _globals['_KEYVALUEPAIR']._serialized_end=301
-  _globals['_MODELS']._serialized_start=303
-  _globals['_MODELS']._serialized_end=360
-  _globals['_MODELNAME']._serialized_start=362
-  _globals['_MODELNAME']._serialized_end=401
-  _globals['_TAGS']._serialized_start=403
-  _globals['_TAGS']._serialized_end=450
-  _globals['_TAGTYPE']._serialized_start=452
-  _globals['_TAGTYPE']._serialized_end=503
-  _globals['_TAGSDATAARRAY']._serialized_start=505
-  _globals['_TAGSDATAARRAY']._serialized_end=563
-  _globals['_TAGVAL']._serialized_start=565
-  _globals['_TAGVAL']._serialized_end=647
-  _globals['_RETREPLY']._serialized_start=649
-  _globals['_RETREPLY']._serialized_end=676
-  _globals['_CONSTANTS']._serialized_start=678
-  _globals['_CONSTANTS']._serialized_end=741
-  _globals['_CONSTANT']._serialized_start=743
-  _globals['_CONSTANT']._serialized_end=782
-  _globals['_MATHAPI']._serialized_start=785
-  _globals['_MATHAPI']._serialized_end=1096
+  _globals['_ARGDATABATCH']._serialized_start=149
+  _globals['_ARGDATABATCH']._serialized_end=210
+  _globals['_TAGSSAMPLE']._serialized_start=212
+  _globals['_TAGSSAMPLE']._serialized_end=250
+  _globals['_ARGAPPENDDATA']._serialized_start=252
+  _globals['_ARGAPPENDDATA']._serialized_end=312
+  _globals['_DATAPOINT']._serialized_start=314
+  _globals['_DATAPOINT']._serialized_end=360
+  _globals['_ARGMODEL']._serialized_start=362
+  _globals['_ARGMODEL']._serialized_end=389
+  _globals['_ARGMODELNAME']._serialized_start=391
+  _globals['_ARGMODELNAME']._serialized_end=424
+  _globals['_ARGREQUEST']._serialized_start=426
+  _globals['_ARGREQUEST']._serialized_end=470
+  _globals['_KEYVALUEPAIR']._serialized_start=472
+  _globals['_KEYVALUEPAIR']._serialized_end=514
+  _globals['_MODELS']._serialized_start=516
+  _globals['_MODELS']._serialized_end=573
+  _globals['_MODELNAME']._serialized_start=575
+  _globals['_MODELNAME']._serialized_end=614
+  _globals['_TAGS']._serialized_start=616
+  _globals['_TAGS']._serialized_end=663
+  _globals['_TAGTYPE']._serialized_start=665
+  _globals['_TAGTYPE']._serialized_end=716
+  _globals['_TAGSDATAARRAY']._serialized_start=718
+  _globals['_TAGSDATAARRAY']._serialized_end=793
+  _globals['_TAGVAL']._serialized_start=795
+  _globals['_TAGVAL']._serialized_end=877
+  _globals['_RETREPLY']._serialized_start=879
+  _globals['_RETREPLY']._serialized_end=906
+  _globals['_CONSTANTS']._serialized_start=908
+  _globals['_CONSTANTS']._serialized_end=971
+  _globals['_CONSTANT']._serialized_start=973
+  _globals['_CONSTANT']._serialized_end=1012
+  _globals['_STATS']._serialized_start=1014
+  _globals['_STATS']._serialized_end=1066
+  _globals['_STATVALUE']._serialized_start=1068
+  _globals['_STATVALUE']._serialized_end=1139
+  _globals['_MODELSTATUS']._serialized_start=1142
+  _globals['_MODELSTATUS']._serialized_end=1311
+  _globals['_MATHAPI']._serialized_start=1314
+  _globals['_MATHAPI']._serialized_end=1850
 # @@protoc_insertion_point(module_scope)
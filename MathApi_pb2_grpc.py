@@ -74,6 +74,31 @@ class MathApiStub(object):
                 request_serializer=MathApi__pb2.ArgData.SerializeToString,
                 response_deserializer=MathApi__pb2.TagsDataArray.FromString,
                 _registered_method=True)
+        self.TransformBatch = channel.unary_unary(
+                '/MathApi/TransformBatch',
+                request_serializer=MathApi__pb2.ArgDataBatch.SerializeToString,
+                response_deserializer=MathApi__pb2.TagsDataArray.FromString,
+                _registered_method=True)
+        self.TransformStream = channel.stream_stream(
+                '/MathApi/TransformStream',
+                request_serializer=MathApi__pb2.ArgData.SerializeToString,
+                response_deserializer=MathApi__pb2.TagsDataArray.FromString,
+                _registered_method=True)
+        self.GetStats = channel.unary_unary(
+                '/MathApi/GetStats',
+                request_serializer=MathApi__pb2.ArgRequest.SerializeToString,
+                response_deserializer=MathApi__pb2.Stats.FromString,
+                _registered_method=True)
+        self.AppendData = channel.unary_unary(
+                '/MathApi/AppendData',
+                request_serializer=MathApi__pb2.ArgAppendData.SerializeToString,
+                response_deserializer=MathApi__pb2.RetReply.FromString,
+                _registered_method=True)
+        self.GetModelStatus = channel.unary_unary(
+                '/MathApi/GetModelStatus',
+                request_serializer=MathApi__pb2.ArgModel.SerializeToString,
+                response_deserializer=MathApi__pb2.ModelStatus.FromString,
+                _registered_method=True)
 
 
 class MathApiServicer(object):
@@ -135,6 +160,43 @@ class MathApiServicer(object):
         context.set_details('Method not implemented!')
         raise NotImplementedError('Method not implemented!')
 
+    def TransformBatch(self, request, context):
+        """Функция пакетного вычисления: N тактов за один вызов
+        """
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+    def TransformStream(self, request_iterator, context):
+        """Потоковая функция такта: на каждый ArgData приходит один TagsDataArray
+        в том же порядке. Пустой modelId - та же модель, что в предыдущем кадре
+        """
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+    def GetStats(self, request, context):
+        """Функция получения показателей производительности
+        """
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+    def AppendData(self, request, context):
+        """Функция добавления точек данных в работающую модель без повторного Start.
+        Для 1D моделей используются x1 и y
+        """
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+    def GetModelStatus(self, request, context):
+        """Функция получения состояния построения модели (асинхронный Start)
+        """
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
 
 def add_MathApiServicer_to_server(servicer, server):
     rpc_method_handlers = {
@@ -178,6 +240,31 @@ def add_MathApiServicer_to_server(servicer, server):
                     request_deserializer=MathApi__pb2.ArgData.FromString,
                     response_serializer=MathApi__pb2.TagsDataArray.SerializeToString,
             ),
+            'TransformBatch': grpc.unary_unary_rpc_method_handler(
+                    servicer.TransformBatch,
+                    request_deserializer=MathApi__pb2.ArgDataBatch.FromString,
+                    response_serializer=MathApi__pb2.TagsDataArray.SerializeToString,
+            ),
+            'TransformStream': grpc.stream_stream_rpc_method_handler(
+                    servicer.TransformStream,
+                    request_deserializer=MathApi__pb2.ArgData.FromString,
+                    response_serializer=MathApi__pb2.TagsDataArray.SerializeToString,
+            ),
+            'GetStats': grpc.unary_unary_rpc_method_handler(
+                    servicer.GetStats,
+                    request_deserializer=MathApi__pb2.ArgRequest.FromString,
+                    response_serializer=MathApi__pb2.Stats.SerializeToString,
+            ),
+            'AppendData': grpc.unary_unary_rpc_method_handler(
+                    servicer.AppendData,
+                    request_deserializer=MathApi__pb2.ArgAppendData.FromString,
+                    response_serializer=MathApi__pb2.RetReply.SerializeToString,
+            ),
+            'GetModelStatus': grpc.unary_unary_rpc_method_handler(
+                    servicer.GetModelStatus,
+                    request_deserializer=MathApi__pb2.ArgModel.FromString,
+                    response_serializer=MathApi__pb2.ModelStatus.SerializeToString,
+            ),
     }
     generic_handler = grpc.method_handlers_generic_handler(
             'MathApi', rpc_method_handlers)
@@ -404,3 +491,138 @@ class MathApi(object):
             timeout,
             metadata,
             _registered_method=True)
+
+    @staticmethod
+    def TransformBatch(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_unary(
+            request,
+            target,
+            '/MathApi/TransformBatch',
+            MathApi__pb2.ArgDataBatch.SerializeToString,
+            MathApi__pb2.TagsDataArray.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+            _registered_method=True)
+
+    @staticmethod
+    def TransformStream(request_iterator,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.stream_stream(
+            request_iterator,
+            target,
+            '/MathApi/TransformStream',
+            MathApi__pb2.ArgData.SerializeToString,
+            MathApi__pb2.TagsDataArray.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+            _registered_method=True)
+
+    @staticmethod
+    def GetStats(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_unary(
+            request,
+            target,
+            '/MathApi/GetStats',
+            MathApi__pb2.ArgRequest.SerializeToString,
+            MathApi__pb2.Stats.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+            _registered_method=True)
+
+    @staticmethod
+    def AppendData(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_unary(
+            request,
+            target,
+            '/MathApi/AppendData',
+            MathApi__pb2.ArgAppendData.SerializeToString,
+            MathApi__pb2.RetReply.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+            _registered_method=True)
+
+    @staticmethod
+    def GetModelStatus(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_unary(
+            request,
+            target,
+            '/MathApi/GetModelStatus',
+            MathApi__pb2.ArgModel.SerializeToString,
+            MathApi__pb2.ModelStatus.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+            _registered_method=True)
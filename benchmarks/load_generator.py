@@ -0,0 +1,337 @@
+import argparse
+import json
+import multiprocessing
+import os
+import queue
+import socket
+import sys
+import tempfile
+import threading
+import time
+
+import numpy as np
+
+# Логи сервера на уровне INFO мешают замерам
+os.environ.setdefault('MATH_LOG_LEVEL', 'WARNING')
+
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+import grpc
+import MathApi_pb2
+import MathApi_pb2_grpc
+
+from run_benchmarks import CASES, Dataset
+
+
+# Нагрузочный тест Transform: N моделей всех типов, фиксированное число
+# одновременных запросов (замкнутый цикл) или целевая частота запросов.
+# Каждые --interval секунд печатается пропускная способность, p50/p99/p999
+# задержки и доля ошибок.
+#
+# В режиме --qps задержка считается от запланированного момента отправки,
+# а не от фактического: если сервер не успевает, очередь видна в задержке
+
+LOCAL_HOSTS = ('localhost', '127.0.0.1', '::1', '[::1]')
+REQUESTS_PER_MODEL = 256
+
+
+def free_port():
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def run_server(port, max_workers, compute_workers, ready):
+    # Сервер MathApi в отдельном процессе: клиент и сервер не делят GIL
+    from server import MathApi
+    from utils.compute_workers import ComputeWorkerPool
+    from utils.metrics import MetricsInterceptor
+    from concurrent import futures
+
+    pool = ComputeWorkerPool(compute_workers) if compute_workers > 0 else None
+    server = grpc.server(futures.ThreadPoolExecutor(max_workers=max_workers),
+                         interceptors=[MetricsInterceptor()])
+    MathApi_pb2_grpc.add_MathApiServicer_to_server(MathApi(pool), server)
+    server.add_insecure_port(f"127.0.0.1:{port}")
+    server.start()
+    ready.set()
+    try:
+        server.wait_for_termination()
+    finally:
+        if pool is not None:
+            pool.shutdown()
+
+
+def start_models(stub, count, points, data_dir):
+    # Модели создаются по кругу из CASES; возвращается описание для генерации входов
+    specs = []
+    for k in range(count):
+        model_name, mode_key, modes = CASES[k % len(CASES)]
+        dims = 1 if '1D' in model_name else 2
+        mode = modes[(k // len(CASES)) % len(modes)]
+        dataset = Dataset(dims, points, 'scattered', data_dir, True)
+        model_id = f"load_{k}"
+
+        reply = stub.Start(MathApi_pb2.ArgStart(modelId=model_id, modelName=model_name, constants=[
+            MathApi_pb2.Constant(name='excel_file_path', value=dataset.path),
+            MathApi_pb2.Constant(name=mode_key, value=mode),
+        ]))
+        if reply.message.startswith('Err_'):
+            raise RuntimeError(f"Start {model_id} ({model_name}): {reply.message}")
+
+        ranges = [(float(column.min()), float(column.max())) for column in dataset.columns[:-1]]
+        specs.append((model_id, ranges))
+    return specs
+
+
+def build_requests(specs, rng):
+    # Заранее собранные запросы со случайными входами внутри диапазона данных
+    requests = []
+    for model_id, ranges in specs:
+        values = [rng.uniform(low, high, REQUESTS_PER_MODEL) for low, high in ranges]
+        for i in range(REQUESTS_PER_MODEL):
+            requests.append(MathApi_pb2.ArgData(modelId=model_id, tagsVal=[
+                MathApi_pb2.TagVal(tagName=f"X{k + 1}", timeStamp=i, numericValue=float(column[i]), isGood=True)
+                for k, column in enumerate(values)
+            ]))
+    rng.shuffle(requests)
+    return requests
+
+
+def client_process(target, specs, threads, qps, start, duration, interval, seed, results):
+    # Процесс нагрузки: threads потоков на одном канале. Задержки складываются
+    # по интервалам (по моменту завершения) и раз в интервал отправляются в results.
+    # Нагрузка начинается одновременно во всех процессах в момент start.value
+    channel = grpc.insecure_channel(target)
+    stub = MathApi_pb2_grpc.MathApiStub(channel)
+    requests = build_requests(specs, np.random.default_rng(seed))
+    grpc.channel_ready_future(channel).result(timeout=30)
+    results.put(None)
+    while not start.value:
+        time.sleep(0.01)
+    start_at = start.value
+
+    intervals = int(np.ceil(duration / interval))
+    end_at = start_at + duration
+
+    # Для каждого потока: интервал -> [задержки, ошибки RPC, ошибки Err_]
+    buckets = [{} for _ in range(threads)]
+
+    def run(index):
+        own = buckets[index]
+        period = threads / qps if qps else 0.0
+        scheduled = start_at + index * period / threads
+        k = index
+        while True:
+            if qps:
+                now = time.perf_counter()
+                if scheduled > now:
+                    time.sleep(scheduled - now)
+                sent = scheduled
+                scheduled += period
+            else:
+                sent = time.perf_counter()
+            if sent >= end_at:
+                break
+
+            rpc_error = app_error = 0
+            try:
+                reply = stub.Transform(requests[k % len(requests)])
+                if reply.message:
+                    app_error = 1
+            except grpc.RpcError:
+                rpc_error = 1
+            k += threads
+
+            done = time.perf_counter()
+            bucket = own.get(int((done - start_at) / interval))
+            if bucket is None:
+                bucket = own.setdefault(int((done - start_at) / interval), [[], 0, 0])
+            bucket[0].append(done - sent)
+            bucket[1] += rpc_error
+            bucket[2] += app_error
+
+    workers = [threading.Thread(target=run, args=(i,), daemon=True) for i in range(threads)]
+    now = time.perf_counter()
+    if start_at > now:
+        time.sleep(start_at - now)
+    for worker in workers:
+        worker.start()
+
+    for idx in range(intervals):
+        # Небольшой запас: запросы, завершившиеся на границе, успевают записаться
+        wait = start_at + (idx + 1) * interval + 0.05 - time.perf_counter()
+        if wait > 0:
+            time.sleep(wait)
+        if idx == intervals - 1:
+            for worker in workers:
+                worker.join()
+        latencies, rpc_errors, app_errors = [], 0, 0
+        for own in buckets:
+            bucket = own.pop(idx, None)
+            if bucket:
+                latencies.extend(bucket[0])
+                rpc_errors += bucket[1]
+                app_errors += bucket[2]
+        results.put((idx, np.asarray(latencies), rpc_errors, app_errors))
+    channel.close()
+
+
+def summarize(latencies, rpc_errors, app_errors, seconds):
+    count = len(latencies)
+    total = count or 1
+    if count:
+        p50, p99, p999 = np.percentile(latencies, [50, 99, 99.9])
+    else:
+        p50 = p99 = p999 = 0.0
+    return {
+        'requests': count,
+        'qps': count / seconds,
+        'p50_ms': float(p50) * 1e3,
+        'p99_ms': float(p99) * 1e3,
+        'p999_ms': float(p999) * 1e3,
+        'rpc_errors': rpc_errors,
+        'app_errors': app_errors,
+        'error_rate': (rpc_errors + app_errors) / total,
+    }
+
+
+def print_row(label, row):
+    print(f"{label:>8} {row['qps']:10.1f} {row['p50_ms']:9.3f} {row['p99_ms']:9.3f} {row['p999_ms']:9.3f}"
+          f" {row['rpc_errors']:8d} {row['app_errors']:8d} {row['error_rate']:8.2%}", flush=True)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Нагрузочный тест Transform сервиса MathApi на localhost')
+    parser.add_argument('--target', default='127.0.0.1:5080', help='адрес сервера (только localhost)')
+    parser.add_argument('--spawn-server', action='store_true',
+                        help='запустить сервер в отдельном процессе на свободном порту')
+    parser.add_argument('--server-threads', type=int, default=10, help='потоков gRPC у запущенного сервера')
+    parser.add_argument('--compute-workers', type=int, default=0,
+                        help='рабочих процессов вычислений у запущенного сервера')
+    parser.add_argument('--models', type=int, default=8, help='число моделей (по кругу всех типов)')
+    parser.add_argument('--points', type=int, default=1000, help='точек в наборе данных модели')
+    parser.add_argument('--concurrency', type=int, default=16, help='одновременных запросов всего')
+    parser.add_argument('--qps', type=float, default=0.0,
+                        help='целевая частота запросов; 0 - замкнутый цикл без пауз')
+    parser.add_argument('--processes', type=int, default=1, help='клиентских процессов')
+    parser.add_argument('--duration', type=float, default=30.0, help='длительность, с')
+    parser.add_argument('--warmup', type=float, default=0.0, help='первые секунды не входят в итог')
+    parser.add_argument('--interval', type=float, default=1.0, help='период вывода, с')
+    parser.add_argument('--data-dir', default=os.path.join(tempfile.gettempdir(), 'math_benchmarks'),
+                        help='каталог для сгенерированных файлов Excel')
+    parser.add_argument('--output', help='записать результаты в JSON')
+    args = parser.parse_args(argv)
+
+    if args.processes < 1 or args.concurrency < args.processes:
+        parser.error('нужно --processes >= 1 и --concurrency >= --processes')
+    host = args.target.rsplit(':', 1)[0]
+    if not args.spawn_server and host not in LOCAL_HOSTS:
+        parser.error('нагрузка допускается только на localhost')
+    return args
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    data_dir = os.path.abspath(args.data_dir)
+    os.makedirs(data_dir, exist_ok=True)
+    context = multiprocessing.get_context('spawn')
+
+    server_process = None
+    target = args.target
+    if args.spawn_server:
+        port = free_port()
+        ready = context.Event()
+        server_process = context.Process(
+            target=run_server, args=(port, args.server_threads, args.compute_workers, ready), daemon=True)
+        server_process.start()
+        if not ready.wait(60):
+            print("Сервер не запустился", file=sys.stderr)
+            return 1
+        target = f"127.0.0.1:{port}"
+
+    channel = grpc.insecure_channel(target)
+    stub = MathApi_pb2_grpc.MathApiStub(channel)
+    try:
+        grpc.channel_ready_future(channel).result(timeout=30)
+        specs = start_models(stub, args.models, args.points, data_dir)
+        print(f"Сервер {target}, моделей: {len(specs)}, процессов: {args.processes}, "
+              f"одновременных запросов: {args.concurrency}"
+              + (f", целевая частота: {args.qps:g}/с" if args.qps else ''), flush=True)
+
+        results = context.Queue()
+        start = context.Value('d', 0.0)
+        base, extra = divmod(args.concurrency, args.processes)
+        clients = []
+        for p in range(args.processes):
+            threads = base + (1 if p < extra else 0)
+            qps = args.qps * threads / args.concurrency if args.qps else 0.0
+            clients.append(context.Process(target=client_process, args=(
+                target, specs, threads, qps, start, args.duration, args.interval, p, results)))
+        for client in clients:
+            client.start()
+        for _ in clients:
+            results.get(timeout=120)
+        # perf_counter общий для процессов одной машины (CLOCK_MONOTONIC)
+        start.value = time.perf_counter() + 0.1
+
+        print(f"{'t, с':>8} {'запр/с':>10} {'p50, мс':>9} {'p99, мс':>9} {'p999, мс':>9}"
+              f" {'ош. RPC':>8} {'ош. Err_':>8} {'доля':>8}")
+        intervals = int(np.ceil(args.duration / args.interval))
+        pending = {}
+        timeline = []
+        total = [[], 0, 0]
+        for _ in range(intervals * len(clients)):
+            try:
+                idx, latencies, rpc_errors, app_errors = results.get(timeout=args.duration + 60)
+            except queue.Empty:
+                print("Клиентские процессы не ответили", file=sys.stderr)
+                return 1
+            part = pending.setdefault(idx, [[], 0, 0, 0])
+            part[0].append(latencies)
+            part[1] += rpc_errors
+            part[2] += app_errors
+            part[3] += 1
+            if part[3] < len(clients):
+                continue
+
+            del pending[idx]
+            merged = np.concatenate(part[0])
+            seconds = min(args.interval, args.duration - idx * args.interval)
+            row = summarize(merged, part[1], part[2], seconds)
+            row['t'] = (idx + 1) * args.interval
+            timeline.append(row)
+            print_row(f"{row['t']:g}", row)
+            if idx * args.interval >= args.warmup:
+                total[0].append(merged)
+                total[1] += part[1]
+                total[2] += part[2]
+
+        for client in clients:
+            client.join()
+
+        measured = args.duration - min(args.warmup, args.duration)
+        latencies = np.concatenate(total[0]) if total[0] else np.zeros(0)
+        summary = summarize(latencies, total[1], total[2], measured or 1.0)
+        print_row('итог', summary)
+
+        if args.output:
+            with open(args.output, 'w', encoding='utf-8') as f:
+                json.dump({'args': vars(args), 'target': target, 'summary': summary, 'timeline': timeline},
+                          f, ensure_ascii=False, indent=2)
+            print(f"Результаты записаны в {args.output}")
+
+        for model_id, _ in specs:
+            stub.Stop(MathApi_pb2.ArgModel(modelId=model_id))
+        return 0
+    finally:
+        channel.close()
+        if server_process is not None:
+            server_process.terminate()
+            server_process.join()
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,289 @@
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+from concurrent import futures
+
+import numpy as np
+
+# Логи моделей на уровне INFO мешают замерам
+os.environ.setdefault('MATH_LOG_LEVEL', 'WARNING')
+
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from math_models import Models, prewarm
+from utils.excel_reader import ExcelReader
+
+
+# Набор тестов: модель, имя константы режима, режимы
+CASES = [
+    ('Аппроксимация 1D', 'approximation_mode', ['0', '1']),
+    ('Аппроксимация 2D', 'approximation_mode', ['0', '1']),
+    ('Интерполяция 1D', 'interpolation_mode', ['0', '1']),
+    ('Интерполяция 2D', 'interpolation_mode', ['0']),
+]
+
+DEFAULT_SIZES = [100, 1000, 10000, 100000, 1000000]
+
+
+def generate_1d(n, layout, rng):
+    # Кривая y = sin(x) + 0.1 x^2 с шумом: на равномерной сетке или в случайных точках
+    if layout == 'grid':
+        x = np.linspace(0.0, 10.0, n)
+    else:
+        x = np.sort(rng.uniform(0.0, 10.0, n))
+        x = np.unique(x)
+    y = np.sin(x) + 0.1 * x ** 2 + rng.normal(0.0, 0.01, len(x))
+    return x, y
+
+
+def generate_2d(n, layout, rng):
+    # Поверхность y = sin(x1) cos(x2) + 0.05 x1 x2: полная сетка X1×X2 или случайные точки
+    if layout == 'grid':
+        side = max(int(round(n ** 0.5)), 2)
+        axis = np.linspace(0.0, 10.0, side)
+        x1, x2 = np.meshgrid(axis, axis, indexing='ij')
+        x1, x2 = x1.ravel(), x2.ravel()
+    else:
+        x1 = rng.uniform(0.0, 10.0, n)
+        x2 = rng.uniform(0.0, 10.0, n)
+    y = np.sin(x1) * np.cos(x2) + 0.05 * x1 * x2
+    return x1, x2, y
+
+
+def write_workbook(path, names, columns):
+    from openpyxl import Workbook
+
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet()
+    sheet.append(names)
+    for row in zip(*(column.tolist() for column in columns)):
+        sheet.append(row)
+    workbook.save(path)
+
+
+class Dataset:
+    # Синтетический набор данных и (для небольших размеров) файл Excel с ним
+
+    def __init__(self, dims, n, layout, data_dir, write_excel):
+        rng = np.random.default_rng(n)
+        if dims == 1:
+            self.columns = generate_1d(n, layout, rng)
+            names = ['X', 'Y']
+        else:
+            self.columns = generate_2d(n, layout, rng)
+            names = ['X1', 'X2', 'Y']
+
+        self.path = None
+        if write_excel:
+            self.path = os.path.join(data_dir, f"bench_{dims}d_{layout}_{n}.xlsx")
+            if not os.path.exists(self.path):
+                write_workbook(self.path, names, self.columns)
+
+    def inputs(self, count, rng):
+        # Случайные входы внутри диапазона данных
+        return tuple(rng.uniform(column.min(), column.max(), count) for column in self.columns[:-1])
+
+
+def measure(fn, repeat=5, number=1):
+    # Лучшее и медианное время одного вызова (секунды)
+    times = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for _ in range(number):
+            fn()
+        times.append((time.perf_counter() - started) / number)
+    return min(times), statistics.median(times)
+
+
+def bench_models(sizes, layouts, data_dir, max_excel_rows, batch_size, results):
+    rng = np.random.default_rng(0)
+    for model_name, mode_key, modes in CASES:
+        dims = 1 if '1D' in model_name else 2
+        model_class = Models[model_name]
+
+        for layout in layouts:
+            for n in sizes:
+                dataset = Dataset(dims, n, layout, data_dir, n <= max_excel_rows)
+
+                for mode in modes:
+                    prefix = f"{model_class.__name__}/mode{mode}/{layout}/n={n}"
+                    constants = {'excel_file_path': dataset.path or '', mode_key: mode}
+                    print(f"{prefix} ...", flush=True)
+
+                    model = model_class(constants)
+                    if dataset.path:
+                        # Холодная загрузка: разбор Excel; теплая: бинарная копия.
+                        # Кеш в памяти очищается перед каждым замером
+                        def load():
+                            ExcelReader.cache.clear()
+                            model.load_data()
+
+                        os.environ['MATH_SIDECAR'] = '0'
+                        results[f"{prefix}/load_data_cold"] = measure(load, repeat=1 if n >= 100000 else 3)
+                        os.environ['MATH_SIDECAR'] = '1'
+                        load()
+                        results[f"{prefix}/load_data_warm"] = measure(load, repeat=3)
+
+                    results[f"{prefix}/fit"] = measure(
+                        lambda: model.set_data(*dataset.columns), repeat=1 if n >= 100000 else 3)
+
+                    point = tuple(float(values[0]) for values in dataset.inputs(1, rng))
+                    results[f"{prefix}/calculate"] = measure(
+                        lambda: model.calculate(*point), repeat=5, number=200)
+
+                    batch = dataset.inputs(batch_size, rng)
+                    results[f"{prefix}/calculate_batch"] = measure(
+                        lambda: model.calculate_batch(*batch), repeat=5)
+
+
+def bench_grpc(data_dir, calls, results):
+    # Start и Transform через gRPC на localhost в этом же процессе
+    import grpc
+    import MathApi_pb2
+    import MathApi_pb2_grpc
+    from server import MathApi
+
+    server = grpc.server(futures.ThreadPoolExecutor(max_workers=4))
+    api = MathApi()
+    MathApi_pb2_grpc.add_MathApiServicer_to_server(api, server)
+    port = server.add_insecure_port('127.0.0.1:0')
+    server.start()
+    channel = grpc.insecure_channel(f"127.0.0.1:{port}")
+    stub = MathApi_pb2_grpc.MathApiStub(channel)
+
+    try:
+        rng = np.random.default_rng(1)
+        for model_name, mode_key, modes in CASES:
+            dims = 1 if '1D' in model_name else 2
+            dataset = Dataset(dims, 1000, 'scattered', data_dir, True)
+            name = Models[model_name].__name__
+            start_request = MathApi_pb2.ArgStart(modelId=f"bench_{name}", modelName=model_name, constants=[
+                MathApi_pb2.Constant(name='excel_file_path', value=dataset.path),
+                MathApi_pb2.Constant(name=mode_key, value=modes[0]),
+            ])
+
+            def start():
+                reply = stub.Start(start_request)
+                if reply.message.startswith('Err_'):
+                    raise RuntimeError(reply.message)
+
+            results[f"grpc/{name}/Start"] = measure(start, repeat=3)
+
+            values = dataset.inputs(1, rng)
+            transform_request = MathApi_pb2.ArgData(modelId=f"bench_{name}", tagsVal=[
+                MathApi_pb2.TagVal(tagName=f"X{k}", timeStamp=1, numericValue=float(v[0]), isGood=True)
+                for k, v in enumerate(values)
+            ])
+            results[f"grpc/{name}/Transform"] = measure(
+                lambda: stub.Transform(transform_request), repeat=5, number=calls)
+            stub.Stop(MathApi_pb2.ArgModel(modelId=f"bench_{name}"))
+    finally:
+        channel.close()
+        server.stop(None)
+        # Сборщики показателей снимаются с общего реестра, фоновые потоки менеджера останавливаются
+        api.close()
+
+
+def compare(results, baseline, tolerance, overrides):
+    # Сравнение лучших времен с эталоном: регрессия, если медленнее более чем на допуск.
+    # Лучшее время устойчивее к помехам от других процессов, чем медиана
+    regressions = []
+    for name, current in sorted(results.items()):
+        reference = baseline.get(name)
+        if reference is None or reference['best'] <= 0:
+            continue
+        limit = tolerance
+        for pattern, value in overrides.items():
+            if pattern in name:
+                limit = value
+        ratio = current['best'] / reference['best']
+        status = 'РЕГРЕССИЯ' if ratio > 1.0 + limit else 'ok'
+        print(f"{status:>10}  {ratio:6.2f}x  (допуск {limit:.0%})  {name}")
+        if status != 'ok':
+            regressions.append(name)
+    return regressions
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Бенчмарки моделей и gRPC сервиса MathApi')
+    parser.add_argument('--sizes', default=','.join(map(str, DEFAULT_SIZES)),
+                        help='размеры наборов данных через запятую')
+    parser.add_argument('--layouts', default='scattered,grid', help='scattered, grid')
+    parser.add_argument('--max-excel-rows', type=int, default=100000,
+                        help='для больших наборов Excel не создается, load_data не измеряется')
+    parser.add_argument('--batch-size', type=int, default=100000, help='размер пакета calculate_batch')
+    parser.add_argument('--grpc-calls', type=int, default=500, help='вызовов Transform на замер')
+    parser.add_argument('--no-grpc', action='store_true', help='не измерять gRPC')
+    parser.add_argument('--data-dir', default=os.path.join(tempfile.gettempdir(), 'math_benchmarks'),
+                        help='каталог для сгенерированных файлов Excel')
+    parser.add_argument('--output', default='benchmark_results.json', help='файл результатов JSON')
+    parser.add_argument('--baseline', help='файл эталона для сравнения')
+    parser.add_argument('--save-baseline', help='сохранить результаты как эталон')
+    parser.add_argument('--tolerance', type=float, default=0.2,
+                        help='допустимое замедление относительно эталона (0.2 = 20%%)')
+    parser.add_argument('--tolerance-for', action='append', default=[], metavar='ПОДСТРОКА=ДОПУСК',
+                        help='свой допуск для тестов, в имени которых есть подстрока')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    os.makedirs(args.data_dir, exist_ok=True)
+    os.environ.setdefault('MATH_SIDECAR_DIR', os.path.join(args.data_dir, '__mathcache__'))
+
+    # Импорт scipy/pandas не должен попадать в первый замер
+    prewarm()
+
+    sizes = [int(size) for size in args.sizes.split(',') if size]
+    layouts = [layout for layout in args.layouts.split(',') if layout]
+
+    raw = {}
+    bench_models(sizes, layouts, args.data_dir, args.max_excel_rows, args.batch_size, raw)
+    if not args.no_grpc:
+        bench_grpc(args.data_dir, args.grpc_calls, raw)
+
+    results = {name: {'best': best, 'median': median} for name, (best, median) in raw.items()}
+    report = {
+        'meta': {
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'platform': platform.platform(),
+            'processor': platform.processor(),
+        },
+        'results': results,
+    }
+
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"Результаты записаны в {args.output}")
+
+    if args.save_baseline:
+        with open(args.save_baseline, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"Эталон сохранен в {args.save_baseline}")
+
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            baseline = json.load(f)['results']
+        overrides = {}
+        for item in args.tolerance_for:
+            pattern, value = item.rsplit('=', 1)
+            overrides[pattern] = float(value)
+        regressions = compare(results, baseline, args.tolerance, overrides)
+        if regressions:
+            print(f"Регрессий: {len(regressions)}")
+            return 1
+        print("Регрессий нет")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
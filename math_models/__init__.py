@@ -1,12 +1,46 @@
+import importlib
+
 from .approximation_1d import Approximation1D
 from .approximation_2d import Approximation2D
 from .interpolation_1d import Interpolation1D
 from .interpolation_2d import Interpolation2D
+from utils.excel_reader import ExcelReader
 
-# Словарь доступных моделей
+# Словарь доступных моделей.
+# Описание, теги и константы по умолчанию - атрибуты классов, поэтому
+# реестр и запросы метаданных не загружают scipy и pandas: они
+# импортируются при первом построении модели (атрибут requires)
 Models = {
     'Аппроксимация 1D': Approximation1D,
     'Аппроксимация 2D': Approximation2D,
     'Интерполяция 1D': Interpolation1D,
     'Интерполяция 2D': Interpolation2D,
-}
\ No newline at end of file
+}
+
+# Номер версии реестра: меняется при каждом register_model,
+# по нему сервер перестраивает закешированные ответы с метаданными
+_registry_version = 0
+
+
+def register_model(name, model_class):
+    # Добавить или заменить модель в реестре
+    global _registry_version
+    Models[name] = model_class
+    _registry_version += 1
+
+
+def registry_version():
+    return _registry_version
+
+
+def prewarm():
+    # Заранее загрузить тяжелые модули всех моделей, чтобы первый Start
+    # не ждал импорта. Возвращает список загруженных модулей
+    modules = []
+    for model_class in Models.values():
+        modules.extend(name for name in model_class.requires if name not in modules)
+    modules.extend(name for name in ExcelReader.requires if name not in modules)
+
+    for name in modules:
+        importlib.import_module(name)
+    return modules
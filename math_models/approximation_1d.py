@@ -1,6 +1,7 @@
+import copy
 import numpy as np
-from scipy.interpolate import splrep, splev
 import sys
+import time
 import os
 
 
@@ -19,33 +20,66 @@ if project_root not in sys.path:
     sys.path.append(project_root)
 
 from utils.excel_reader import ExcelReader
+from utils.least_squares import StreamingLeastSquares, monomial_basis_change, scaling
+from utils.logger import get_logger
+from math_models.lookup_table import LookupTable1D, save_table, load_table
+
+
+logger = get_logger(__name__)
 
 
 class Approximation1D:
     description = ('Аппроксимация 1D: Y = f(X) - построение приближающей функции по экспериментальным точкам. '
-                   'Формат Excel: столбцы X и Y. Режимы: 0 - Полином 2-й степени,'
+                   'Формат Excel: столбцы X и Y. Режимы: 0 - Полином (степень polynomial_degree, по умолчанию 2),'
                    ' 1 - Cплайн')
     input_name = 'X'
     output_name = 'Y'
     io_desc = 'Входная/выходная переменная'
     io_unit = 'ед.'
+    default_coefs = {
+        'excel_file_path': 'test_data/test_1d.xlsx',
+        'approximation_mode': '0',
+        'polynomial_degree': '2',
+        'lut_max_error': '0'
+    }
+    input_tags = (('X', 'Входная переменная'),)
+    output_tags = (('Y', 'Выходная переменная'),)
+    requires = ('scipy.interpolate',)
 
     def __init__(self, coefs=None):
         if coefs is None:
             coefs = self._get_default_coefs()
         self.coefs = coefs
+        # Исходные точки. Полином по файлу (load_data) строится потоково
+        # и точки не хранит - тогда None; им пользуется только режим сплайна
         self.data_x = None
         self.data_y = None
         self.model = None
+        # Потоковый МНК полинома: хранится для дообучения в append_data
+        self.solver = None
+        # Полином строится от U = (X - x_shift) / x_scale, U в [-1, 1]
+        self.x_shift = 0.0
+        self.x_scale = 1.0
+        # Число точек и диапазон X построенной модели
+        self.rows = 0
+        self.x_range = None
         self.mode = coefs.get('approximation_mode', '0')
+        self.degree = int(coefs.get('polynomial_degree') or 2)
+        if self.degree < 0:
+            raise ValueError(f"Недопустимая степень полинома: {self.degree}")
         self.file_path = coefs.get('excel_file_path', '')
+        self.source_path = None
+        # Таблица значений вместо вычисления модели: lut_max_error > 0 - допуск
+        self.lut = None
+        self.lut_max_error = float(coefs.get('lut_max_error') or 0)
+        # Сведения о построенной модели (размер таблицы, достигнутая погрешность)
+        self.fit_info = {}
+        # Длительность этапов последнего Start: resolve, read, fit (секунды)
+        self.load_timings = {}
         self.is_initialized = False
 
     def _get_default_coefs(self):
-        return {
-            'excel_file_path': 'test_data/test_1d.xlsx',
-            'approximation_mode': '0'
-        }
+        return dict(self.default_coefs)
 
     @property
     def model_desc(self):
@@ -68,8 +102,41 @@ class Approximation1D:
         return self.input_name
 
     def load_data(self):
+        if self.mode != '0':
+            self.set_data(*self.read_data())
+            return
+
+        # Полином строится за один проход по блокам файла,
+        # массивы на все точки не создаются (data_x, data_y - None)
+        chunks = self._timed_chunks(ExcelReader.iter_1d_data(self._resolve_path()))
+        started = time.perf_counter()
+        self._finish_fit(started, *self._fit_polynomial(chunks))
+        self.load_timings['fit'] -= self.load_timings['read']
+
+    def _timed_chunks(self, chunks):
+        # Блоки файла; время их чтения - в load_timings['read']
+        self.load_timings['read'] = 0.0
+        iterator = iter(chunks)
+        while True:
+            started = time.perf_counter()
+            chunk = next(iterator, None)
+            self.load_timings['read'] += time.perf_counter() - started
+            if chunk is None:
+                return
+            yield chunk
+
+    def read_data(self):
+        # Поиск файла и чтение данных, без построения модели
+        actual_path = self._resolve_path()
+        started = time.perf_counter()
+        data = ExcelReader.read_1d_data(actual_path)
+        self.load_timings['read'] = time.perf_counter() - started
+        return data
+
+    def _resolve_path(self):
+        started = time.perf_counter()
         actual_path = get_resource_path(self.file_path)
-        print(f"Загрузка данных из: {actual_path}")
+        logger.info("Загрузка данных из: %s", actual_path)
 
         if not os.path.exists(actual_path):
             if os.path.exists(self.file_path):
@@ -89,29 +156,200 @@ class Approximation1D:
                 else:
                     raise FileNotFoundError(f"Excel файл не найден: {self.file_path}")
 
-        print(f"Используем файл: {actual_path}")
-        self.data_x, self.data_y = ExcelReader.read_1d_data(actual_path)
+        logger.info("Используем файл: %s", actual_path)
+        self.source_path = actual_path
+        self.load_timings['resolve'] = time.perf_counter() - started
+        return actual_path
+
+    def set_data(self, data_x, data_y):
+        # Построение модели по уже загруженным данным
+        started = time.perf_counter()
+        self.data_x, self.data_y = data_x, data_y
 
         if self.mode == '0':
-            print(f"Построение полинома 2-й степени...")
-            self.model = np.polyfit(self.data_x, self.data_y, 2)
-            print(f"Коэффициенты полинома: {self.model}")
+            step = ExcelReader.CHUNK_ROWS
+            self._finish_fit(started, *self._fit_polynomial(
+                (data_x[k:k + step], data_y[k:k + step]) for k in range(0, len(data_x), step)))
         else:
-            print(f"Построение сплайна...")
+            logger.info("Построение сплайна...")
+            from scipy.interpolate import splrep
             self.model = splrep(self.data_x, self.data_y, s=0)
+            self._finish_fit(started, len(data_x), data_x.min(), data_x.max())
+
+    def _fit_polynomial(self, chunks):
+        # Полином по блокам (X, Y) потоковым QR: память не зависит от числа точек.
+        # Возвращает число точек и диапазон X
+        logger.info("Построение полинома %d-й степени...", self.degree)
+        solver = StreamingLeastSquares(self.degree + 1)
+        x_min, x_max = np.inf, -np.inf
+        for x, y in chunks:
+            if len(x) == 0:
+                continue
+            x_min = min(x_min, float(x.min()))
+            x_max = max(x_max, float(x.max()))
+            self._rescale(solver, x_min, x_max)
+            solver.add(self._design(x), y)
+        self.model = solver.solve()
+        self.solver = solver
+        logger.info("Коэффициенты полинома от (X - %g) / %g: %s", self.x_shift, self.x_scale, self.model)
+        return solver.rows, x_min, x_max
+
+    def _design(self, x):
+        # Столбцы U^degree, ..., U, 1 - порядок коэффициентов np.polyval
+        return np.vander((x - self.x_shift) / self.x_scale, self.degree + 1)
 
+    def _rescale(self, solver, x_min, x_max):
+        # Окно масштабирования должно покрывать все точки [x_min, x_max].
+        # Диапазон известен только по прочитанным блокам: при выходе за окно
+        # накопленные строки переводятся на новое окно заменой базиса
+        if solver.rows and self.x_shift - self.x_scale <= x_min and x_max <= self.x_shift + self.x_scale:
+            return
+        shift, scale = scaling(x_min, x_max)
+        if solver.rows:
+            exponents = [(k,) for k in range(self.degree, -1, -1)]
+            solver.change_basis(monomial_basis_change(
+                exponents, (self.x_scale / scale,), ((self.x_shift - shift) / scale,)))
+        self.x_shift, self.x_scale = shift, scale
+
+    def _finish_fit(self, started, rows, x_min, x_max):
+        self.rows = rows
+        self.x_range = (x_min, x_max)
+        self._build_lut()
         self.is_initialized = True
-        print(f"Модель построена, точек: {len(self.data_x)}")
+        self.load_timings['fit'] = time.perf_counter() - started
+        logger.info("Модель построена, точек: %d", rows)
+
+    def append_data(self, data_x, data_y):
+        # Дообучение новыми точками без повторного чтения файла.
+        # Вызывается для копии модели, которая затем заменяет исходную:
+        # общие с ней объекты здесь не изменяются, только заменяются
+        if not self.is_initialized:
+            raise RuntimeError("Модель не инициализирована")
+        x = np.asarray(data_x, dtype=float)
+        y = np.asarray(data_y, dtype=float)
+        if len(x) == 0:
+            return
+
+        if self.mode == '0':
+            # Обновление QR на новых строках: стоимость зависит только от их числа
+            solver = copy.copy(self.solver)
+            self._rescale(solver, min(self.x_range[0], float(x.min())), max(self.x_range[1], float(x.max())))
+            solver.add(self._design(x), y)
+            self.model = solver.solve()
+            self.solver = solver
+        else:
+            # Сплайн глобален - вставка в отсортированные данные и перестроение
+            from scipy.interpolate import splrep
+            order = np.argsort(x)
+            positions = np.searchsorted(self.data_x, x[order], side='right')
+            self.data_x = np.insert(self.data_x, positions, x[order])
+            self.data_y = np.insert(self.data_y, positions, y[order])
+            self.model = splrep(self.data_x, self.data_y, s=0)
+
+        self.rows += len(x)
+        self.x_range = (min(self.x_range[0], float(x.min())), max(self.x_range[1], float(x.max())))
+        self._build_lut()
+        logger.info("Добавлено точек: %d, всего: %d", len(x), self.rows)
+
+    def get_state(self):
+        # Построенная модель для сохранения на диск: параметры (JSON) и массивы numpy
+        meta = {
+            'source_path': self.source_path,
+            'rows': int(self.rows),
+            'x_range': [float(v) for v in self.x_range],
+            'fit_info': self.fit_info,
+        }
+        arrays = {}
+        if self.mode == '0':
+            arrays['coefs'] = self.model
+            # Множитель R потокового МНК - для дообучения после восстановления
+            arrays['solver_r'] = self.solver.r
+            meta['solver_rows'] = int(self.solver.rows)
+            meta['scaling'] = [float(self.x_shift), float(self.x_scale)]
+        else:
+            t, c, k = self.model
+            arrays.update(data_x=self.data_x, data_y=self.data_y, tck_t=t, tck_c=c)
+            meta['tck_k'] = int(k)
+        meta['lut'] = save_table(self.lut, arrays)
+        return meta, arrays
+
+    def set_state(self, meta, arrays):
+        # Восстановление построенной модели без чтения Excel и построения
+        started = time.perf_counter()
+        if self.mode == '0':
+            self.model = arrays['coefs']
+            self.solver = StreamingLeastSquares(self.degree + 1)
+            self.solver.r = arrays['solver_r']
+            self.solver.rows = meta['solver_rows']
+            self.x_shift, self.x_scale = meta['scaling']
+        else:
+            self.data_x, self.data_y = arrays['data_x'], arrays['data_y']
+            self.model = (arrays['tck_t'], arrays['tck_c'], meta['tck_k'])
+        self.source_path = meta['source_path']
+        self.rows = meta['rows']
+        self.x_range = tuple(meta['x_range'])
+        self.lut = load_table(meta['lut'], arrays)
+        self.fit_info = meta['fit_info']
+        self.is_initialized = True
+        self.load_timings['restore'] = time.perf_counter() - started
+
+    def _build_lut(self):
+        self.lut = None
+        self.fit_info = {}
+        if self.lut_max_error > 0:
+            x_min, x_max = self.x_range
+            self.lut, error = LookupTable1D.build(
+                self._evaluate_batch, x_min, x_max, self.lut_max_error)
+            self.fit_info = {
+                'lut_points': self.lut.size if self.lut else 0,
+                'lut_error': error,
+                'lut_exact_share': self.lut.exact_share if self.lut else 1.0,
+            }
+            if self.lut is not None:
+                logger.info("Таблица значений: %d точек, погрешность %.3g (допуск %g), точный расчет в %.1f%% ячеек",
+                            self.lut.size, error, self.lut_max_error, 100 * self.lut.exact_share)
+            else:
+                logger.warning("Таблица значений не построена: погрешность %.3g больше допуска %g",
+                               error, self.lut_max_error)
 
     def calculate(self, x_input):
         if not self.is_initialized:
             raise RuntimeError("Модель не инициализирована")
 
+        if self.lut is not None:
+            result = self.lut.evaluate(x_input)
+            if result is not None:
+                return result
+
         if self.mode == '0':
-            result = np.polyval(self.model, x_input)
-            print(f"Вычисление: X={x_input} -> Y={result}")
+            result = np.polyval(self.model, (x_input - self.x_shift) / self.x_scale)
+            logger.debug("Вычисление: X=%s -> Y=%s", x_input, result)
             return result
         else:
+            from scipy.interpolate import splev
             result = splev(x_input, self.model)
-            print(f"Вычисление: X={x_input} -> Y={result}")
-            return result
\ No newline at end of file
+            logger.debug("Вычисление: X=%s -> Y=%s", x_input, result)
+            return result
+
+    def calculate_batch(self, x_inputs):
+        # Векторное вычисление для массива входов, возвращает numpy массив
+        if not self.is_initialized:
+            raise RuntimeError("Модель не инициализирована")
+
+        x = np.asarray(x_inputs, dtype=float)
+        if self.lut is None:
+            return self._evaluate_batch(x)
+
+        # Вне таблицы - сама модель
+        values = self.lut.evaluate_batch(x)
+        outside = np.isnan(values)
+        if outside.any():
+            values[outside] = self._evaluate_batch(x[outside])
+        return values
+
+    def _evaluate_batch(self, x):
+        if self.mode == '0':
+            return np.polyval(self.model, (x - self.x_shift) / self.x_scale)
+        else:
+            from scipy.interpolate import splev
+            return splev(x, self.model)
@@ -1,6 +1,7 @@
+import copy
 import numpy as np
-from scipy.interpolate import griddata
 import sys
+import time
 import os
 
 
@@ -19,34 +20,75 @@ if project_root not in sys.path:
     sys.path.append(project_root)
 
 from utils.excel_reader import ExcelReader
+from utils.least_squares import StreamingLeastSquares, monomial_basis_change, scaling
+from utils.logger import get_logger
+from math_models.regular_grid import BilinearGrid
+from math_models.lookup_table import LookupTable2D, save_table, load_table
+from math_models.incremental_triangulation import IncrementalTriangulation, save_delaunay, load_delaunay
+
+
+logger = get_logger(__name__)
 
 
 class Approximation2D:
     description = ('Аппроксимация 2D: Z = f(X, Y) - построение приближающей поверхности по экспериментальным точкам. '
                    'Формат Excel: столбцы X1, X2 и Y. '
-                   'Режимы: 0 - Полином 2-й степени, 1 - Билинейная интерполяция')
+                   'Режимы: 0 - Полином (степень polynomial_degree, по умолчанию 2), 1 - Билинейная интерполяция')
     input_name = 'X1,X2'
     output_name = 'Y'
     io_desc = 'Входные/выходные переменные'
     io_unit = 'ед.'
+    default_coefs = {
+        'excel_file_path': 'test_data/test_2d.xlsx',
+        'approximation_mode': '0',
+        'polynomial_degree': '2',
+        'lut_max_error': '0'
+    }
+    input_tags = (('X1', 'Первая входная переменная'), ('X2', 'Вторая входная переменная'))
+    output_tags = (('Y', 'Выходная переменная'),)
+    requires = ('scipy.interpolate',)
 
     def __init__(self, coefs=None):
         if coefs is None:
             coefs = self._get_default_coefs()
         self.coefs = coefs
+        # Исходные точки. Полином по файлу (load_data) строится потоково
+        # и точки не хранит - тогда None; ими пользуется только режим 1
         self.data_x1 = None
         self.data_x2 = None
         self.data_y = None
         self.model = None
+        self.grid = None
+        self.interpolator = None
+        # Потоковый МНК полинома и триангуляция с добавлением точек - для append_data
+        self.solver = None
+        self.incremental = None
+        # Полином строится от U1 = (X1 - сдвиг) / масштаб и так же U2, U в [-1, 1]
+        self.x1_shift, self.x1_scale = 0.0, 1.0
+        self.x2_shift, self.x2_scale = 0.0, 1.0
+        # Число точек и диапазоны X1, X2 построенной модели
+        self.rows = 0
+        self.x1_range = None
+        self.x2_range = None
         self.mode = coefs.get('approximation_mode', '0')
+        self.degree = int(coefs.get('polynomial_degree') or 2)
+        if self.degree < 0:
+            raise ValueError(f"Недопустимая степень полинома: {self.degree}")
+        # Степени (X1, X2) членов полинома в порядке коэффициентов модели
+        self.exponents = self._polynomial_exponents(self.degree)
         self.file_path = coefs.get('excel_file_path', '')
+        self.source_path = None
+        # Таблица значений вместо вычисления модели: lut_max_error > 0 - допуск
+        self.lut = None
+        self.lut_max_error = float(coefs.get('lut_max_error') or 0)
+        # Сведения о построенной модели (размер таблицы, достигнутая погрешность)
+        self.fit_info = {}
+        # Длительность этапов последнего Start: resolve, read, fit (секунды)
+        self.load_timings = {}
         self.is_initialized = False
 
     def _get_default_coefs(self):
-        return {
-            'excel_file_path': 'test_data/test_2d.xlsx',
-            'approximation_mode': '0'
-        }
+        return dict(self.default_coefs)
 
     @property
     def model_desc(self):
@@ -73,14 +115,118 @@ class Approximation2D:
         return ['X1', 'X2']
 
     def calculate_batch(self, x1_inputs, x2_inputs):
-        results = []
-        for x1, x2 in zip(x1_inputs, x2_inputs):
-            results.append(self.calculate(x1, x2))
-        return results
+        # Векторное вычисление для массивов входов, возвращает numpy массив
+        if not self.is_initialized:
+            raise RuntimeError("Модель не инициализирована")
+
+        x1 = np.asarray(x1_inputs, dtype=float)
+        x2 = np.asarray(x2_inputs, dtype=float)
+
+        if self.lut is None:
+            values = self._evaluate_batch(x1, x2)
+        else:
+            # Вне таблицы - сама модель
+            x1, x2 = np.broadcast_arrays(x1, x2)
+            values = self.lut.evaluate_batch(x1, x2)
+            outside = np.isnan(values)
+            if outside.any():
+                values[outside] = self._evaluate_batch(x1[outside], x2[outside])
+
+        if self.mode != '0':
+            values[np.isnan(values)] = 0.0
+        return values
+
+    def _evaluate_batch(self, x1, x2):
+        # Значения модели; вне области данных режима 1 - NaN
+        if self.mode == '0':
+            u1 = (x1 - self.x1_shift) / self.x1_scale
+            u2 = (x2 - self.x2_shift) / self.x2_scale
+            if self.degree == 2:
+                a, b, c, d, e, f = self.model
+                return (a * u1 ** 2 + b * u2 ** 2 + c * u1 * u2 +
+                        d * u1 + e * u2 + f)
+            result = np.zeros(np.broadcast(u1, u2).shape)
+            for coef, (p, q) in zip(self.model, self.exponents):
+                result += coef * u1 ** p * u2 ** q
+            return result
+
+        if self.grid is not None:
+            return self.grid.evaluate_batch(x1, x2)
+        return self.interpolator(x1, x2)
+
+    @staticmethod
+    def _polynomial_exponents(degree):
+        # Сначала старшие степени: X1^d, X2^d, затем смешанные члены, ..., 1.
+        # Для степени 2 - прежний порядок X1^2, X2^2, X1*X2, X1, X2, 1
+        exponents = []
+        for total in range(degree, 0, -1):
+            exponents.append((total, 0))
+            exponents.append((0, total))
+            exponents.extend((total - k, k) for k in range(1, total))
+        exponents.append((0, 0))
+        return exponents
+
+    def _design(self, x1, x2):
+        u1 = (x1 - self.x1_shift) / self.x1_scale
+        u2 = (x2 - self.x2_shift) / self.x2_scale
+        design = np.empty((len(x1), len(self.exponents)))
+        for column, (p, q) in enumerate(self.exponents):
+            design[:, column] = u1 ** p * u2 ** q
+        return design
+
+    def _rescale(self, solver, x1_range, x2_range):
+        # Окна масштабирования X1 и X2 должны покрывать все точки.
+        # Диапазоны известны только по прочитанным блокам: при выходе за окно
+        # накопленные строки переводятся на новые окна заменой базиса
+        windows = ((self.x1_shift, self.x1_scale), (self.x2_shift, self.x2_scale))
+        if solver.rows and all(shift - scale <= lo and hi <= shift + scale
+                               for (shift, scale), (lo, hi) in zip(windows, (x1_range, x2_range))):
+            return
+        (shift1, scale1), (shift2, scale2) = scaling(*x1_range), scaling(*x2_range)
+        if solver.rows:
+            solver.change_basis(monomial_basis_change(
+                self.exponents,
+                (self.x1_scale / scale1, self.x2_scale / scale2),
+                ((self.x1_shift - shift1) / scale1, (self.x2_shift - shift2) / scale2)))
+        self.x1_shift, self.x1_scale = shift1, scale1
+        self.x2_shift, self.x2_scale = shift2, scale2
 
     def load_data(self):
+        if self.mode != '0':
+            self.set_data(*self.read_data())
+            return
+
+        # Полином строится за один проход по блокам файла,
+        # массивы на все точки не создаются (data_x1, data_x2, data_y - None)
+        chunks = self._timed_chunks(ExcelReader.iter_2d_data(self._resolve_path()))
+        started = time.perf_counter()
+        self._finish_fit(started, *self._fit_polynomial(chunks))
+        self.load_timings['fit'] -= self.load_timings['read']
+
+    def _timed_chunks(self, chunks):
+        # Блоки файла; время их чтения - в load_timings['read']
+        self.load_timings['read'] = 0.0
+        iterator = iter(chunks)
+        while True:
+            started = time.perf_counter()
+            chunk = next(iterator, None)
+            self.load_timings['read'] += time.perf_counter() - started
+            if chunk is None:
+                return
+            yield chunk
+
+    def read_data(self):
+        # Поиск файла и чтение данных, без построения модели
+        actual_path = self._resolve_path()
+        started = time.perf_counter()
+        data = ExcelReader.read_2d_data(actual_path)
+        self.load_timings['read'] = time.perf_counter() - started
+        return data
+
+    def _resolve_path(self):
+        started = time.perf_counter()
         actual_path = get_resource_path(self.file_path)
-        print(f"Загрузка данных из: {actual_path}")
+        logger.info("Загрузка данных из: %s", actual_path)
 
         if not os.path.exists(actual_path):
             if os.path.exists(self.file_path):
@@ -100,39 +246,210 @@ class Approximation2D:
                 else:
                     raise FileNotFoundError(f"Excel файл не найден: {self.file_path}")
 
-        print(f"Используем файл: {actual_path}")
-        self.data_x1, self.data_x2, self.data_y = ExcelReader.read_2d_data(actual_path)
+        logger.info("Используем файл: %s", actual_path)
+        self.source_path = actual_path
+        self.load_timings['resolve'] = time.perf_counter() - started
+        return actual_path
+
+    def set_data(self, data_x1, data_x2, data_y):
+        # Построение модели по уже загруженным данным
+        started = time.perf_counter()
+        self.data_x1, self.data_x2, self.data_y = data_x1, data_x2, data_y
 
         if self.mode == '0':
-            print(f"Построение полинома 2D...")
-            X = np.column_stack([
-                self.data_x1 ** 2,
-                self.data_x2 ** 2,
-                self.data_x1 * self.data_x2,
-                self.data_x1,
-                self.data_x2,
-                np.ones_like(self.data_x1)
-            ])
-            self.model = np.linalg.lstsq(X, self.data_y, rcond=None)[0]
-            print(f"Коэффициенты полинома: {self.model}")
+            step = ExcelReader.CHUNK_ROWS
+            self._finish_fit(started, *self._fit_polynomial(
+                (data_x1[k:k + step], data_x2[k:k + step], data_y[k:k + step])
+                for k in range(0, len(data_x1), step)))
+        else:
+            # Таблицы из Excel обычно полная сетка X1×X2 - тогда билинейная
+            # интерполяция по таблице, иначе заранее построенная триангуляция
+            self.grid = BilinearGrid.from_points(self.data_x1, self.data_x2, self.data_y)
+            if self.grid is not None:
+                logger.info("Данные образуют сетку %dx%d", *self.grid.shape)
+            else:
+                logger.info("Данные не образуют сетку, построение триангуляции...")
+                from scipy.interpolate import LinearNDInterpolator
+                points = np.column_stack((self.data_x1, self.data_x2))
+                self.interpolator = LinearNDInterpolator(points, self.data_y)
+            self._finish_fit(started, len(data_x1), (data_x1.min(), data_x1.max()),
+                             (data_x2.min(), data_x2.max()))
+
+    def _fit_polynomial(self, chunks):
+        # Полином по блокам (X1, X2, Y) потоковым QR: память не зависит от числа точек.
+        # Возвращает число точек и диапазоны X1, X2
+        logger.info("Построение полинома 2D %d-й степени...", self.degree)
+        solver = StreamingLeastSquares(len(self.exponents))
+        x1_min = x2_min = np.inf
+        x1_max = x2_max = -np.inf
+        for x1, x2, y in chunks:
+            if len(x1) == 0:
+                continue
+            x1_min = min(x1_min, float(x1.min()))
+            x1_max = max(x1_max, float(x1.max()))
+            x2_min = min(x2_min, float(x2.min()))
+            x2_max = max(x2_max, float(x2.max()))
+            self._rescale(solver, (x1_min, x1_max), (x2_min, x2_max))
+            solver.add(self._design(x1, x2), y)
+        self.model = solver.solve()
+        self.solver = solver
+        logger.info("Коэффициенты полинома от U1 = (X1 - %g) / %g, U2 = (X2 - %g) / %g: %s",
+                    self.x1_shift, self.x1_scale, self.x2_shift, self.x2_scale, self.model)
+        return solver.rows, (x1_min, x1_max), (x2_min, x2_max)
 
+    def _finish_fit(self, started, rows, x1_range, x2_range):
+        self.rows = rows
+        self.x1_range = x1_range
+        self.x2_range = x2_range
+        self._build_lut()
         self.is_initialized = True
-        print(f"Модель построена, точек: {len(self.data_x1)}")
+        self.load_timings['fit'] = time.perf_counter() - started
+        logger.info("Модель построена, точек: %d", rows)
+
+    def append_data(self, data_x1, data_x2, data_y):
+        # Дообучение новыми точками без повторного чтения файла.
+        # Вызывается для копии модели, которая затем заменяет исходную:
+        # общие с ней объекты здесь не изменяются, только заменяются
+        if not self.is_initialized:
+            raise RuntimeError("Модель не инициализирована")
+        x1 = np.asarray(data_x1, dtype=float)
+        x2 = np.asarray(data_x2, dtype=float)
+        y = np.asarray(data_y, dtype=float)
+        if len(x1) == 0:
+            return
+
+        if self.mode == '0':
+            # Обновление QR на новых строках: стоимость зависит только от их числа
+            solver = copy.copy(self.solver)
+            self._rescale(solver,
+                          (min(self.x1_range[0], float(x1.min())), max(self.x1_range[1], float(x1.max()))),
+                          (min(self.x2_range[0], float(x2.min())), max(self.x2_range[1], float(x2.max()))))
+            solver.add(self._design(x1, x2), y)
+            self.model = solver.solve()
+            self.solver = solver
+        else:
+            incremental = self.incremental
+            if incremental is None or incremental.npoints != len(self.data_x1):
+                # Первое добавление (или прошлое не завершилось) - триангуляция
+                # с добавлением точек строится один раз по имеющимся точкам.
+                # Сетка с новыми точками перестает быть полной - дальше
+                # модель считается по триангуляции
+                if self.grid is not None:
+                    logger.info("Добавлены точки к сетке, переход на триангуляцию")
+                incremental = IncrementalTriangulation(np.column_stack((self.data_x1, self.data_x2)))
+            incremental.add_points(np.column_stack((x1, x2)))
+
+            from scipy.interpolate import LinearNDInterpolator
+            self.data_x1 = np.concatenate((self.data_x1, x1))
+            self.data_x2 = np.concatenate((self.data_x2, x2))
+            self.data_y = np.concatenate((self.data_y, y))
+            self.interpolator = LinearNDInterpolator(incremental.snapshot(), self.data_y)
+            self.grid = None
+            self.incremental = incremental
+
+        self.rows += len(x1)
+        self.x1_range = (min(self.x1_range[0], float(x1.min())), max(self.x1_range[1], float(x1.max())))
+        self.x2_range = (min(self.x2_range[0], float(x2.min())), max(self.x2_range[1], float(x2.max())))
+        self._build_lut()
+        logger.info("Добавлено точек: %d, всего: %d", len(x1), self.rows)
+
+    def get_state(self):
+        # Построенная модель для сохранения на диск: параметры (JSON) и массивы numpy
+        meta = {
+            'source_path': self.source_path,
+            'rows': int(self.rows),
+            'x1_range': [float(v) for v in self.x1_range],
+            'x2_range': [float(v) for v in self.x2_range],
+            'fit_info': self.fit_info,
+        }
+        arrays = {}
+        if self.mode == '0':
+            arrays['coefs'] = self.model
+            # Множитель R потокового МНК - для дообучения после восстановления
+            arrays['solver_r'] = self.solver.r
+            meta['solver_rows'] = int(self.solver.rows)
+            meta['scaling'] = [float(v) for v in (self.x1_shift, self.x1_scale, self.x2_shift, self.x2_scale)]
+        else:
+            arrays.update(data_x1=self.data_x1, data_x2=self.data_x2, data_y=self.data_y)
+            if self.grid is not None:
+                arrays.update(grid_x1=self.grid.axis_x1, grid_x2=self.grid.axis_x2, grid_table=self.grid.table)
+            else:
+                meta['triangulation'] = save_delaunay(self.interpolator.tri, arrays)
+        meta['lut'] = save_table(self.lut, arrays)
+        return meta, arrays
+
+    def set_state(self, meta, arrays):
+        # Восстановление построенной модели без чтения Excel и построения
+        started = time.perf_counter()
+        if self.mode == '0':
+            self.model = arrays['coefs']
+            self.solver = StreamingLeastSquares(len(self.exponents))
+            self.solver.r = arrays['solver_r']
+            self.solver.rows = meta['solver_rows']
+            self.x1_shift, self.x1_scale, self.x2_shift, self.x2_scale = meta['scaling']
+        else:
+            self.data_x1, self.data_x2, self.data_y = arrays['data_x1'], arrays['data_x2'], arrays['data_y']
+            if 'grid_table' in arrays:
+                self.grid = BilinearGrid(arrays['grid_x1'], arrays['grid_x2'], arrays['grid_table'])
+            else:
+                from scipy.interpolate import LinearNDInterpolator
+                points = np.column_stack((self.data_x1, self.data_x2))
+                triangulation = load_delaunay(meta['triangulation'], arrays, points)
+                self.interpolator = LinearNDInterpolator(triangulation, self.data_y)
+        self.source_path = meta['source_path']
+        self.rows = meta['rows']
+        self.x1_range = tuple(meta['x1_range'])
+        self.x2_range = tuple(meta['x2_range'])
+        self.lut = load_table(meta['lut'], arrays)
+        self.fit_info = meta['fit_info']
+        self.is_initialized = True
+        self.load_timings['restore'] = time.perf_counter() - started
+
+    def _build_lut(self):
+        self.lut = None
+        self.fit_info = {}
+        if self.lut_max_error > 0:
+            self.lut, error = LookupTable2D.build(
+                self._evaluate_batch, *self.x1_range, *self.x2_range, self.lut_max_error)
+            self.fit_info = {
+                'lut_points': self.lut.size if self.lut else 0,
+                'lut_error': error,
+                'lut_exact_share': self.lut.exact_share if self.lut else 1.0,
+            }
+            if self.lut is not None:
+                logger.info("Таблица значений: %dx%d, погрешность %.3g (допуск %g), точный расчет в %.1f%% ячеек",
+                            *self.lut.shape, error, self.lut_max_error, 100 * self.lut.exact_share)
+            else:
+                logger.warning("Таблица значений не построена: погрешность %.3g больше допуска %g",
+                               error, self.lut_max_error)
 
     def calculate(self, x1_input, x2_input):
         if not self.is_initialized:
             raise RuntimeError("Модель не инициализирована")
 
+        if self.lut is not None:
+            result = self.lut.evaluate(x1_input, x2_input)
+            if result is not None:
+                return result
+
         if self.mode == '0':
-            a, b, c, d, e, f = self.model
-            result = (a * x1_input ** 2 + b * x2_input ** 2 +
-                      c * x1_input * x2_input +
-                      d * x1_input + e * x2_input + f)
-            print(f"Вычисление: X1={x1_input}, X2={x2_input} -> Y={result}")
+            u1 = (x1_input - self.x1_shift) / self.x1_scale
+            u2 = (x2_input - self.x2_shift) / self.x2_scale
+            if self.degree == 2:
+                a, b, c, d, e, f = self.model
+                result = (a * u1 ** 2 + b * u2 ** 2 + c * u1 * u2 +
+                          d * u1 + e * u2 + f)
+            else:
+                result = 0.0
+                for coef, (p, q) in zip(self.model, self.exponents):
+                    result += coef * u1 ** p * u2 ** q
+            logger.debug("Вычисление: X1=%s, X2=%s -> Y=%s", x1_input, x2_input, result)
             return result
         else:
-            points = np.column_stack((self.data_x1, self.data_x2))
-            value = griddata(points, self.data_y, [(x1_input, x2_input)], method='linear')[0]
+            if self.grid is not None:
+                value = self.grid.evaluate(x1_input, x2_input)
+            else:
+                value = self.interpolator(x1_input, x2_input)[()]
             result = float(value) if not np.isnan(value) else 0.0
-            print(f"Вычисление: X1={x1_input}, X2={x2_input} -> Y={result}")
+            logger.debug("Вычисление: X1=%s, X2=%s -> Y=%s", x1_input, x2_input, result)
             return result
\ No newline at end of file
@@ -0,0 +1,66 @@
+import copy
+
+import numpy as np
+
+
+class IncrementalTriangulation:
+    # Триангуляция Делоне с добавлением точек (Qhull в режиме incremental).
+    # Точки добавляет только модель-владелец (под блокировкой AppendData),
+    # вычисления идут по снимкам: после каждого добавления Qhull выдает
+    # новые массивы симплексов, а снимок ссылается на прежние и не меняется.
+    # Qhull сам перестраивает массивы целиком, поэтому добавление дешевле
+    # полного построения, но не бесплатно для очень больших наборов
+
+    def __init__(self, points):
+        from scipy.spatial import Delaunay
+        self.delaunay = Delaunay(points, incremental=True)
+        self.npoints = len(points)
+
+    def add_points(self, points):
+        self.delaunay.add_points(points)
+        self.npoints += len(points)
+
+    def snapshot(self):
+        snapshot = copy.copy(self.delaunay)
+        # Снимок не владеет Qhull: иначе при его удалении Qhull закрылся бы и у владельца
+        snapshot._qhull = None
+        # Барицентрические преобразования считаются здесь, а не в первом запросе
+        snapshot.transform
+        return snapshot
+
+
+def save_delaunay(delaunay, arrays):
+    # Массивы триангуляции в arrays для сохранения состояния модели.
+    # Возвращает параметры для load_delaunay: версию scipy, имена массивов
+    # и скалярные атрибуты
+    import scipy
+    # Барицентрические преобразования сохраняются вместе с симплексами
+    delaunay.transform
+    names = []
+    scalars = {}
+    for name, value in vars(delaunay).items():
+        if name == '_qhull':
+            continue
+        if isinstance(value, np.ndarray):
+            arrays['tri_' + name] = value
+            names.append(name)
+        elif isinstance(value, np.generic):
+            scalars[name] = value.item()
+        elif value is None or isinstance(value, (bool, int, float)):
+            scalars[name] = value
+    return {'scipy': scipy.__version__, 'arrays': names, 'scalars': scalars}
+
+
+def load_delaunay(state, arrays, points):
+    # Триангуляция из сохраненных массивов без Qhull - как снимок в
+    # IncrementalTriangulation.snapshot. Атрибуты Delaunay внутренние,
+    # поэтому при другой версии scipy триангуляция строится заново по точкам
+    import scipy
+    from scipy.spatial import Delaunay
+    if state['scipy'] != scipy.__version__:
+        return Delaunay(points)
+    delaunay = Delaunay.__new__(Delaunay)
+    delaunay.__dict__.update(state['scalars'])
+    delaunay.__dict__.update({name: arrays['tri_' + name] for name in state['arrays']})
+    delaunay._qhull = None
+    return delaunay
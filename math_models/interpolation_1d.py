@@ -1,6 +1,7 @@
 import numpy as np
 import bisect
 import sys
+import time
 import os
 
 
@@ -18,6 +19,10 @@ if project_root not in sys.path:
     sys.path.append(project_root)
 
 from utils.excel_reader import ExcelReader
+from utils.logger import get_logger
+
+
+logger = get_logger(__name__)
 
 
 class Interpolation1D:
@@ -27,6 +32,16 @@ class Interpolation1D:
     output_name = 'Y'
     io_desc = 'Входная/выходная переменная'
     io_unit = 'ед.'
+    default_coefs = {
+        'excel_file_path': 'test_data/test_1d.xlsx',
+        'interpolation_mode': '0'
+    }
+    input_tags = (('X', 'Входная переменная'),)
+    output_tags = (('Y', 'Выходная переменная'),)
+    requires = ()
+    # До этого числа точек таблицы отрезков хранятся списками Python:
+    # индексация списка в calculate() быстрее, чем массива numpy
+    LIST_TABLE_POINTS = 65536
 
     def __init__(self, coefs=None):
         if coefs is None:
@@ -34,15 +49,23 @@ class Interpolation1D:
         self.coefs = coefs
         self.data_x = None
         self.data_y = None
+        # Таблица отрезков: узлы X, значения Y и наклоны прямых
+        self.table_x = None
+        self.table_y = None
+        self.slopes = None
+        self.slopes_array = None
+        # Для равномерной сетки X: первый узел и 1/шаг, иначе None
+        self.x0 = None
+        self.inv_step = None
         self.mode = coefs.get('interpolation_mode', '0')
         self.file_path = coefs.get('excel_file_path', '')
+        self.source_path = None
+        # Длительность этапов последнего Start: resolve, read, fit (секунды)
+        self.load_timings = {}
         self.is_initialized = False
 
     def _get_default_coefs(self):
-        return {
-            'excel_file_path': 'test_data/test_1d.xlsx',
-            'interpolation_mode': '0'
-        }
+        return dict(self.default_coefs)
 
     @property
     def model_desc(self):
@@ -65,8 +88,13 @@ class Interpolation1D:
         return self.input_name
 
     def load_data(self):
+        self.set_data(*self.read_data())
+
+    def read_data(self):
+        # Поиск файла и чтение данных, без построения модели
+        started = time.perf_counter()
         actual_path = get_resource_path(self.file_path)
-        print(f"Загрузка данных из: {actual_path}")
+        logger.info("Загрузка данных из: %s", actual_path)
 
         if not os.path.exists(actual_path):
             if os.path.exists(self.file_path):
@@ -85,16 +113,121 @@ class Interpolation1D:
                 else:
                     raise FileNotFoundError(f"Excel файл не найден: {self.file_path}")
 
-        print(f"Используем файл: {actual_path}")
-        self.data_x, self.data_y = ExcelReader.read_1d_data(actual_path)
+        logger.info("Используем файл: %s", actual_path)
+        self.source_path = actual_path
+        self.load_timings['resolve'] = time.perf_counter() - started
+
+        started = time.perf_counter()
+        data = ExcelReader.read_1d_data(actual_path)
+        self.load_timings['read'] = time.perf_counter() - started
+        return data
+
+    def set_data(self, data_x, data_y):
+        # Построение модели по уже загруженным данным
+        started = time.perf_counter()
+        self.data_x, self.data_y = data_x, data_y
 
         if len(self.data_x) == 0:
             raise ValueError("Excel файл не содержит данных")
 
+        self._build_segments()
+        self.is_initialized = True
+        self.load_timings['fit'] = time.perf_counter() - started
+        logger.info("Загружено %d точек", len(self.data_x))
+        logger.info("Диапазон X: %.2f ... %.2f", self.data_x[0], self.data_x[-1])
+        logger.info("Режим: %s", 'кусочно-линейная' if self.mode == '0' else 'ступенчатая')
+
+    def append_data(self, data_x, data_y):
+        # Вставка новых точек в отсортированные данные без повторного чтения
+        # файла. Вызывается для копии модели, которая затем заменяет исходную:
+        # массивы и таблицы отрезков создаются новые, исходные не меняются
+        if not self.is_initialized:
+            raise RuntimeError("Модель не инициализирована")
+        x = np.asarray(data_x, dtype=float)
+        y = np.asarray(data_y, dtype=float)
+        if len(x) == 0:
+            return
+
+        order = np.argsort(x, kind='stable')
+        positions = np.searchsorted(self.data_x, x[order], side='right')
+        self.data_x = np.insert(self.data_x, positions, x[order])
+        self.data_y = np.insert(self.data_y, positions, y[order])
+        self._build_segments()
+        logger.info("Добавлено точек: %d, всего: %d", len(x), len(self.data_x))
+
+    def get_state(self):
+        # Построенная модель для сохранения на диск: параметры (JSON) и массивы numpy.
+        # Таблица отрезков - линейный проход по точкам, она не сохраняется
+        meta = {'source_path': self.source_path}
+        arrays = {'data_x': self.data_x, 'data_y': self.data_y}
+        return meta, arrays
+
+    def set_state(self, meta, arrays):
+        # Восстановление модели без чтения Excel
+        started = time.perf_counter()
+        self.data_x, self.data_y = arrays['data_x'], arrays['data_y']
+        self._build_segments()
+        self.source_path = meta['source_path']
         self.is_initialized = True
-        print(f"Загружено {len(self.data_x)} точек")
-        print(f"Диапазон X: {self.data_x[0]:.2f} ... {self.data_x[-1]:.2f}")
-        print(f"Режим: {'кусочно-линейная' if self.mode == '0' else 'ступенчатая'}")
+        self.load_timings['restore'] = time.perf_counter() - started
+
+    def _build_segments(self):
+        # Отрезок i - [X[i], X[i+1]), на нем Y = Y[i] + slopes[i] * (X - X[i]).
+        # Прямая отсчитывается от левого узла, а не от нуля: так нет потери
+        # точности при больших X и узких отрезках
+        n = len(self.data_x)
+        x = np.asarray(self.data_x, dtype=float)
+        y = np.asarray(self.data_y, dtype=float)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            slopes = np.diff(y) / np.diff(x)
+        self.slopes_array = slopes
+
+        if n <= self.LIST_TABLE_POINTS:
+            self.table_x, self.table_y, self.slopes = x.tolist(), y.tolist(), slopes.tolist()
+        else:
+            self.table_x, self.table_y, self.slopes = x, y, slopes
+
+        # Равномерная сетка: отрезок находится арифметикой, без поиска.
+        # Узлы должны отклоняться от x0 + i*шаг не больше чем на 1e-6 шага
+        self.x0 = self.inv_step = None
+        if n >= 2:
+            step = (x[-1] - x[0]) / (n - 1)
+            if step > 0 and np.max(np.abs(x - (x[0] + step * np.arange(n)))) <= 1e-6 * step:
+                self.x0 = float(x[0])
+                self.inv_step = 1.0 / step
+                logger.info("Равномерная сетка X, шаг %g", step)
+
+    def _segment(self, x):
+        # Номер отрезка для X[0] < x < X[-1]
+        table_x = self.table_x
+        if self.inv_step is None:
+            if isinstance(table_x, np.ndarray):
+                return int(np.searchsorted(table_x, x, side='right')) - 1
+            return bisect.bisect_right(table_x, x) - 1
+
+        i = int((x - self.x0) * self.inv_step)
+        last = len(table_x) - 2
+        if i > last:
+            i = last
+        # Поправка на округление рядом с узлами
+        if x < table_x[i]:
+            i -= 1
+        elif x >= table_x[i + 1]:
+            i += 1
+        return i
+
+    def _segments(self, x):
+        # Номера отрезков для массива входов (крайние значения ограничены)
+        last = len(self.data_x) - 2
+        if self.inv_step is None:
+            return np.clip(np.searchsorted(self.data_x, x, side='right') - 1, 0, last)
+
+        # fmax/fmin заменяют NaN границей, приведение к int остается корректным
+        idx = np.fmin(np.fmax((x - self.x0) * self.inv_step, 0.0), last).astype(np.intp)
+        table_x = self.data_x
+        idx -= x < table_x[idx]
+        idx += x >= table_x[idx + 1]
+        return np.clip(idx, 0, last)
 
     def calculate(self, x_input):
         if not self.is_initialized:
@@ -110,16 +243,29 @@ class Interpolation1D:
         else:
             return self._step_interpolation(x_input)
 
-    def _linear_interpolation(self, x):
-        idx = bisect.bisect_right(self.data_x, x)
+    def calculate_batch(self, x_inputs):
+        # Векторное вычисление для массива входов, возвращает numpy массив
+        if not self.is_initialized:
+            raise RuntimeError("Модель не инициализирована")
 
-        x_left = self.data_x[idx - 1]
-        x_right = self.data_x[idx]
-        y_left = self.data_y[idx - 1]
-        y_right = self.data_y[idx]
+        x = np.asarray(x_inputs, dtype=float)
+        n = len(self.data_x)
+        if n == 1:
+            return np.full(x.shape, self.data_y[0])
 
-        return y_left + (y_right - y_left) * (x - x_left) / (x_right - x_left)
+        idx = self._segments(x)
+        if self.mode == '0':
+            result = self.data_y[idx] + self.slopes_array[idx] * (x - self.data_x[idx])
+        else:
+            result = self.data_y[idx]
+
+        # За границами диапазона - крайние значения, как в calculate()
+        result = np.where(x <= self.data_x[0], self.data_y[0], result)
+        return np.where(x >= self.data_x[-1], self.data_y[-1], result)
+
+    def _linear_interpolation(self, x):
+        i = self._segment(x)
+        return self.table_y[i] + self.slopes[i] * (x - self.table_x[i])
 
     def _step_interpolation(self, x):
-        idx = bisect.bisect_right(self.data_x, x) - 1
-        return self.data_y[idx]
\ No newline at end of file
+        return self.table_y[self._segment(x)]
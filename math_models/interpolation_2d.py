@@ -1,6 +1,6 @@
 import numpy as np
-from scipy.interpolate import griddata
 import sys
+import time
 import os
 
 
@@ -19,6 +19,12 @@ if project_root not in sys.path:
     sys.path.append(project_root)
 
 from utils.excel_reader import ExcelReader
+from utils.logger import get_logger
+from math_models.lookup_table import LookupTable2D, save_table, load_table
+from math_models.incremental_triangulation import IncrementalTriangulation, save_delaunay, load_delaunay
+
+
+logger = get_logger(__name__)
 
 
 class Interpolation2D:
@@ -28,6 +34,14 @@ class Interpolation2D:
     output_name = 'Y'
     io_desc = 'Входные/выходные переменные'
     io_unit = 'ед.'
+    default_coefs = {
+        'excel_file_path': 'test_data/test_2d.xlsx',
+        'interpolation_mode': '0',
+        'lut_max_error': '0'
+    }
+    input_tags = (('X1', 'Первая входная переменная'), ('X2', 'Вторая входная переменная'))
+    output_tags = (('Y', 'Выходная переменная'),)
+    requires = ('scipy.spatial', 'scipy.interpolate')
 
     def __init__(self, coefs=None):
         if coefs is None:
@@ -36,15 +50,24 @@ class Interpolation2D:
         self.data_x1 = None
         self.data_x2 = None
         self.data_y = None
+        self.triangulation = None
+        self.interpolator = None
+        # Триангуляция с добавлением точек, создается при первом append_data
+        self.incremental = None
         self.mode = coefs.get('interpolation_mode', '0')
         self.file_path = coefs.get('excel_file_path', '')
+        self.source_path = None
+        # Таблица значений вместо вычисления модели: lut_max_error > 0 - допуск
+        self.lut = None
+        self.lut_max_error = float(coefs.get('lut_max_error') or 0)
+        # Сведения о построенной модели (размер таблицы, достигнутая погрешность)
+        self.fit_info = {}
+        # Длительность этапов последнего Start: resolve, read, fit (секунды)
+        self.load_timings = {}
         self.is_initialized = False
 
     def _get_default_coefs(self):
-        return {
-            'excel_file_path': 'test_data/test_2d.xlsx',
-            'interpolation_mode': '0'
-        }
+        return dict(self.default_coefs)
 
     @property
     def model_desc(self):
@@ -71,14 +94,36 @@ class Interpolation2D:
         return ['X1', 'X2']
 
     def calculate_batch(self, x1_inputs, x2_inputs):
-        results = []
-        for x1, x2 in zip(x1_inputs, x2_inputs):
-            results.append(self.calculate(x1, x2))
-        return results
+        # Векторное вычисление: один запрос к триангуляции на весь массив
+        if not self.is_initialized:
+            raise RuntimeError("Модель не инициализирована")
+
+        x1 = np.asarray(x1_inputs, dtype=float)
+        x2 = np.asarray(x2_inputs, dtype=float)
+        if self.lut is None:
+            values = self._evaluate_batch(x1, x2)
+        else:
+            # Вне таблицы и у границы триангуляции - сама модель
+            x1, x2 = np.broadcast_arrays(x1, x2)
+            values = self.lut.evaluate_batch(x1, x2)
+            outside = np.isnan(values)
+            if outside.any():
+                values[outside] = self._evaluate_batch(x1[outside], x2[outside])
+        values[np.isnan(values)] = 0.0
+        return values
+
+    def _evaluate_batch(self, x1, x2):
+        # Значения модели; вне выпуклой оболочки точек - NaN
+        return self.interpolator(x1, x2)
 
     def load_data(self):
+        self.set_data(*self.read_data())
+
+    def read_data(self):
+        # Поиск файла и чтение данных, без построения модели
+        started = time.perf_counter()
         actual_path = get_resource_path(self.file_path)
-        print(f"Загрузка данных из: {actual_path}")
+        logger.info("Загрузка данных из: %s", actual_path)
 
         if not os.path.exists(actual_path):
             if os.path.exists(self.file_path):
@@ -98,15 +143,115 @@ class Interpolation2D:
                 else:
                     raise FileNotFoundError(f"Excel файл не найден: {self.file_path}")
 
-        print(f"Используем файл: {actual_path}")
-        self.data_x1, self.data_x2, self.data_y = ExcelReader.read_2d_data(actual_path)
+        logger.info("Используем файл: %s", actual_path)
+        self.source_path = actual_path
+        self.load_timings['resolve'] = time.perf_counter() - started
+
+        started = time.perf_counter()
+        data = ExcelReader.read_2d_data(actual_path)
+        self.load_timings['read'] = time.perf_counter() - started
+        return data
+
+    def set_data(self, data_x1, data_x2, data_y):
+        # Построение модели по уже загруженным данным
+        started = time.perf_counter()
+        self.data_x1, self.data_x2, self.data_y = data_x1, data_x2, data_y
+
+        # Триангуляция строится один раз, дальше при вычислении
+        # выполняется только поиск симплекса и барицентрическое взвешивание
+        from scipy.interpolate import LinearNDInterpolator
+        from scipy.spatial import Delaunay
+        points = np.column_stack((self.data_x1, self.data_x2))
+        self.triangulation = Delaunay(points)
+        self.interpolator = LinearNDInterpolator(self.triangulation, self.data_y)
+
+        self._build_lut()
         self.is_initialized = True
-        print(f"Загружено {len(self.data_x1)} точек")
+        self.load_timings['fit'] = time.perf_counter() - started
+        logger.info("Загружено %d точек", len(self.data_x1))
 
-    def calculate(self, x1_input, x2_input):
+    def append_data(self, data_x1, data_x2, data_y):
+        # Добавление точек в триангуляцию без повторного чтения файла.
+        # Вызывается для копии модели, которая затем заменяет исходную:
+        # вычисления в исходной идут по ее снимку триангуляции
         if not self.is_initialized:
             raise RuntimeError("Модель не инициализирована")
+        x1 = np.asarray(data_x1, dtype=float)
+        x2 = np.asarray(data_x2, dtype=float)
+        y = np.asarray(data_y, dtype=float)
+        if len(x1) == 0:
+            return
 
+        incremental = self.incremental
+        if incremental is None or incremental.npoints != len(self.data_x1):
+            # Первое добавление (или прошлое не завершилось) - триангуляция
+            # с добавлением точек строится один раз по имеющимся точкам
+            incremental = IncrementalTriangulation(np.column_stack((self.data_x1, self.data_x2)))
+        incremental.add_points(np.column_stack((x1, x2)))
+
+        from scipy.interpolate import LinearNDInterpolator
+        self.data_x1 = np.concatenate((self.data_x1, x1))
+        self.data_x2 = np.concatenate((self.data_x2, x2))
+        self.data_y = np.concatenate((self.data_y, y))
+        self.triangulation = incremental.snapshot()
+        self.interpolator = LinearNDInterpolator(self.triangulation, self.data_y)
+        self.incremental = incremental
+
+        self._build_lut()
+        logger.info("Добавлено точек: %d, всего: %d", len(x1), len(self.data_x1))
+
+    def get_state(self):
+        # Построенная модель для сохранения на диск: параметры (JSON) и массивы numpy
+        arrays = {'data_x1': self.data_x1, 'data_x2': self.data_x2, 'data_y': self.data_y}
+        meta = {
+            'source_path': self.source_path,
+            'fit_info': self.fit_info,
+            'triangulation': save_delaunay(self.triangulation, arrays),
+        }
+        meta['lut'] = save_table(self.lut, arrays)
+        return meta, arrays
+
+    def set_state(self, meta, arrays):
+        # Восстановление построенной модели без чтения Excel и триангуляции
+        started = time.perf_counter()
+        from scipy.interpolate import LinearNDInterpolator
+        self.data_x1, self.data_x2, self.data_y = arrays['data_x1'], arrays['data_x2'], arrays['data_y']
         points = np.column_stack((self.data_x1, self.data_x2))
-        value = griddata(points, self.data_y, [(x1_input, x2_input)], method='linear')[0]
+        self.triangulation = load_delaunay(meta['triangulation'], arrays, points)
+        self.interpolator = LinearNDInterpolator(self.triangulation, self.data_y)
+        self.source_path = meta['source_path']
+        self.lut = load_table(meta['lut'], arrays)
+        self.fit_info = meta['fit_info']
+        self.is_initialized = True
+        self.load_timings['restore'] = time.perf_counter() - started
+
+    def _build_lut(self):
+        self.lut = None
+        self.fit_info = {}
+        if self.lut_max_error > 0:
+            self.lut, error = LookupTable2D.build(
+                self._evaluate_batch, self.data_x1.min(), self.data_x1.max(),
+                self.data_x2.min(), self.data_x2.max(), self.lut_max_error)
+            self.fit_info = {
+                'lut_points': self.lut.size if self.lut else 0,
+                'lut_error': error,
+                'lut_exact_share': self.lut.exact_share if self.lut else 1.0,
+            }
+            if self.lut is not None:
+                logger.info("Таблица значений: %dx%d, погрешность %.3g (допуск %g), точный расчет в %.1f%% ячеек",
+                            *self.lut.shape, error, self.lut_max_error, 100 * self.lut.exact_share)
+            else:
+                logger.warning("Таблица значений не построена: погрешность %.3g больше допуска %g",
+                               error, self.lut_max_error)
+
+    def calculate(self, x1_input, x2_input):
+        if not self.is_initialized:
+            raise RuntimeError("Модель не инициализирована")
+
+        if self.lut is not None:
+            result = self.lut.evaluate(x1_input, x2_input)
+            if result is not None:
+                return result
+
+        value = self.interpolator(x1_input, x2_input)[()]
         return float(value) if not np.isnan(value) else 0.0
\ No newline at end of file
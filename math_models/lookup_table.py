@@ -0,0 +1,332 @@
+import os
+
+import numpy as np
+
+
+# Плотные таблицы значений модели на равномерной сетке.
+# Сетка удваивается, пока линейная (билинейная) интерполяция по таблице
+# отличается от модели в серединах ячеек больше допуска (см. SAFETY).
+# Вычисление по таблице - арифметика индекса и смешивание соседних узлов.
+#
+# Кусочно-линейные модели (триангуляция, билинейная сетка) имеют изломы,
+# рядом с которыми допуск достигается только очень мелкой сеткой. Поэтому
+# удвоение останавливается, когда допуск не выполнен лишь в малой доле
+# ячеек (EXACT_CELLS_SHARE) или достигнут предел размера: такие ячейки
+# помечаются, и в них считается сама модель. Так же - вне таблицы и там,
+# где модель не определена (NaN): evaluate возвращает None, evaluate_batch - NaN.
+#
+# Середины ячеек не видят изломов внутри ячейки, поэтому готовая таблица
+# дополнительно сверяется с моделью в PROBE_POINTS случайных точках внутри
+# каждой ячейки: ячейки, где допуск нарушен, тоже переводятся на точное вычисление.
+#
+# Ячейки принимаются с запасом (SAFETY), поэтому оценка по серединам и
+# выборочным точкам занижает настоящую погрешность. Сообщаемая погрешность
+# измеряется отдельно на новых VERIFY_POINTS точках в каждой ячейке готовой
+# таблицы (ячейки с ошибкой больше допуска и здесь переводятся на точное вычисление)
+
+START_POINTS = 17
+EXACT_CELLS_SHARE = 0.01
+PROBE_POINTS = 4
+# Выборочные точки занижают ошибку ячейки с изломом: ячейка принимается,
+# если найденная ошибка не больше SAFETY * max_error
+SAFETY = 0.5
+VERIFY_POINTS = 64
+# До этого числа узлов значения хранятся списком Python (быстрее для скалярного вычисления)
+LIST_TABLE_POINTS = 65536
+
+
+def max_points():
+    # Предел числа узлов таблицы: MATH_LUT_MAX_POINTS, по умолчанию 4M (32 МБ)
+    return int(os.environ.get('MATH_LUT_MAX_POINTS', str(1 << 22)))
+
+
+def _abs_error(approx, exact):
+    # Ошибка в точках, где определены и таблица, и модель (иначе 0)
+    error = np.abs(approx - exact)
+    error[~np.isfinite(error)] = 0.0
+    return error
+
+
+def _finish(cell_error, max_error, at_limit):
+    # Решение после очередного удвоения: (готово, маска точных ячеек, погрешность)
+    exact = cell_error > SAFETY * max_error
+    share = exact.mean()
+    if share == 0:
+        return True, None, float(cell_error.max())
+    if share <= EXACT_CELLS_SHARE or (at_limit and share < 1):
+        return True, exact, float(cell_error[~exact].max())
+    return False, None, float(cell_error.max())
+
+
+def _probes_per_cell(cells, limit, points=PROBE_POINTS):
+    # Всего проверочных точек не больше предела размера таблицы
+    return max(1, min(points, limit // cells))
+
+
+def _probe(table, func, points, threshold):
+    # Сверка таблицы с моделью в точках points (кортеж массивов).
+    # Ячейки с ошибкой больше threshold переводятся на точное вычисление.
+    # Возвращает таблицу и наибольшую ошибку в остальных ячейках
+    error_at = _abs_error(table.evaluate_batch(*points), func(*points))
+    bad = error_at > threshold
+    if bad.any():
+        exact = np.zeros(table.cell_count, dtype=bool) if table.exact_array is None else table.exact_array.copy()
+        exact[table.cell_index(*(p[bad] for p in points))] = True
+        table = table.with_exact(exact)
+    return table, float(error_at[~bad].max(initial=0.0))
+
+
+def _check(table, func, sample, max_error, error):
+    # Проверка готовой таблицы: выборочные точки с запасом SAFETY, затем
+    # измерение на новых точках. sample(rng, на ячейку) - точки в ячейках.
+    # Возвращает таблицу и измеренную погрешность
+    rng = np.random.default_rng(0)
+    table, probe_error = _probe(table, func, sample(rng, PROBE_POINTS), SAFETY * max_error)
+    table, measured = _probe(table, func, sample(rng, VERIFY_POINTS), max_error)
+    return table, max(error, probe_error, measured)
+
+
+def save_table(table, arrays):
+    # Таблица в массивы arrays для сохранения состояния модели.
+    # Возвращает границы таблицы (None - таблицы нет) для параметров состояния
+    if table is None:
+        return None
+    arrays['lut_values'] = table.array.reshape(table.shape)
+    if table.exact_array is not None:
+        arrays['lut_exact'] = table.exact_array.reshape(table.cells_shape)
+    return list(table.bounds)
+
+
+def load_table(bounds, arrays):
+    # Таблица из сохраненного состояния, без повторного построения
+    if bounds is None:
+        return None
+    table_class = LookupTable1D if len(bounds) == 2 else LookupTable2D
+    return table_class(*bounds, arrays['lut_values'], arrays.get('lut_exact'))
+
+
+def _as_table(values, dtype=float):
+    values = np.ascontiguousarray(values, dtype=dtype).ravel()
+    return values.tolist() if values.size <= LIST_TABLE_POINTS else values
+
+
+class LookupTable1D:
+
+    def __init__(self, x_min, x_max, values, exact=None):
+        self.x_min = float(x_min)
+        self.x_max = float(x_max)
+        self.size = len(values)
+        self.cells = self.size - 1
+        self.inv_step = self.cells / (self.x_max - self.x_min)
+        self.array = np.asarray(values, dtype=float)
+        self.values = _as_table(values)
+        # Ячейки, где считается сама модель (None - таких нет)
+        self.exact_array = exact
+        self.exact = None if exact is None else _as_table(exact, bool)
+        self.exact_share = 0.0 if exact is None else float(exact.mean())
+        self.shape = (self.size,)
+        self.cells_shape = (self.cells,)
+        self.bounds = (self.x_min, self.x_max)
+
+    @property
+    def cell_count(self):
+        return self.cells
+
+    def cell_index(self, x):
+        t = (x - self.x_min) * self.inv_step
+        return np.clip(t.astype(np.intp), 0, self.cells - 1)
+
+    def with_exact(self, exact):
+        return type(self)(self.x_min, self.x_max, self.array, exact)
+
+    @classmethod
+    def build(cls, func, x_min, x_max, max_error, limit=None):
+        # Таблица для func(x) (векторной) на [x_min, x_max] и оценка погрешности.
+        # Если таблица невозможна (вырожденный диапазон) - (None, inf)
+        limit = limit or max_points()
+        if not x_max > x_min:
+            return None, float('inf')
+
+        n = START_POINTS
+        values = func(np.linspace(x_min, x_max, n))
+        while True:
+            m = 2 * n - 1
+            fine = func(np.linspace(x_min, x_max, m))
+            cell_error = _abs_error((values[:-1] + values[1:]) / 2, fine[1::2])
+            done, exact, error = _finish(cell_error, max_error, 2 * m - 1 > limit)
+            if done:
+                step = (x_max - x_min) / (n - 1)
+
+                def sample(rng, per_cell):
+                    cell = np.repeat(np.arange(n - 1), _probes_per_cell(n - 1, limit, per_cell))
+                    return (x_min + (cell + rng.random(cell.size)) * step,)
+
+                return _check(cls(x_min, x_max, values, exact), func, sample, max_error, error)
+            if 2 * m - 1 > limit:
+                return None, error
+            n = m
+            values = fine
+
+    def evaluate(self, x):
+        t = (x - self.x_min) * self.inv_step
+        if not 0.0 <= t <= self.cells:
+            return None
+        i = int(t)
+        if i == self.cells:
+            i -= 1
+        if self.exact is not None and self.exact[i]:
+            return None
+        values = self.values
+        left = values[i]
+        result = left + (values[i + 1] - left) * (t - i)
+        if result != result:
+            return None
+        return result
+
+    def evaluate_batch(self, x):
+        # Вход любой формы, в том числе скаляр; результат - той же формы
+        shape = np.shape(x)
+        x = np.atleast_1d(np.asarray(x, dtype=float))
+        t = (x - self.x_min) * self.inv_step
+        inside = (t >= 0.0) & (t <= self.cells)
+        i = np.clip(np.where(inside, t, 0.0).astype(np.intp), 0, self.cells - 1)
+        left = self.array[i]
+        result = left + (self.array[i + 1] - left) * (t - i)
+        result[~inside] = np.nan
+        if self.exact_array is not None:
+            result[self.exact_array[i]] = np.nan
+        return result.reshape(shape)
+
+
+class LookupTable2D:
+
+    def __init__(self, x1_min, x1_max, x2_min, x2_max, values, exact=None):
+        self.x1_min = float(x1_min)
+        self.x2_min = float(x2_min)
+        self.shape = values.shape
+        self.size = values.size
+        self.cells1 = values.shape[0] - 1
+        self.cells2 = values.shape[1] - 1
+        self.inv_step1 = self.cells1 / (float(x1_max) - self.x1_min)
+        self.inv_step2 = self.cells2 / (float(x2_max) - self.x2_min)
+        # Строка таблицы - фиксированный X1, индекс узла (i, j) -> i * stride + j
+        self.stride = values.shape[1]
+        self.array = np.ascontiguousarray(values, dtype=float).ravel()
+        self.values = _as_table(values)
+        # Ячейки, где считается сама модель, индекс ячейки (i, j) -> i * cells2 + j
+        self.exact_array = None if exact is None else exact.ravel()
+        self.exact = None if exact is None else _as_table(exact, bool)
+        self.exact_share = 0.0 if exact is None else float(exact.mean())
+        self.bounds = (self.x1_min, float(x1_max), self.x2_min, float(x2_max))
+        self.cells_shape = (self.cells1, self.cells2)
+
+    @property
+    def cell_count(self):
+        return self.cells1 * self.cells2
+
+    def cell_index(self, x1, x2):
+        i = np.clip(((x1 - self.x1_min) * self.inv_step1).astype(np.intp), 0, self.cells1 - 1)
+        j = np.clip(((x2 - self.x2_min) * self.inv_step2).astype(np.intp), 0, self.cells2 - 1)
+        return i * self.cells2 + j
+
+    def with_exact(self, exact):
+        values = self.array.reshape(self.shape)
+        return type(self)(*self.bounds, values, exact.reshape(self.cells1, self.cells2))
+
+    @classmethod
+    def build(cls, func, x1_min, x1_max, x2_min, x2_max, max_error, limit=None):
+        # Таблица для func(x1, x2) (векторной) на прямоугольнике и оценка погрешности
+        limit = limit or max_points()
+        if not (x1_max > x1_min and x2_max > x2_min):
+            return None, float('inf')
+
+        def grid(n):
+            x1, x2 = np.meshgrid(np.linspace(x1_min, x1_max, n), np.linspace(x2_min, x2_max, n), indexing='ij')
+            return func(x1.ravel(), x2.ravel()).reshape(n, n)
+
+        n = START_POINTS
+        values = grid(n)
+        while True:
+            m = 2 * n - 1
+            fine = grid(m)
+            approx = np.empty_like(fine)
+            approx[::2, ::2] = values
+            approx[1::2, ::2] = (values[:-1] + values[1:]) / 2
+            approx[::2, 1::2] = (values[:, :-1] + values[:, 1:]) / 2
+            approx[1::2, 1::2] = (values[:-1, :-1] + values[1:, :-1] + values[:-1, 1:] + values[1:, 1:]) / 4
+            error = _abs_error(approx, fine)
+
+            # Ошибка ячейки - максимум по 3x3 точкам мелкой сетки внутри нее
+            cells = n - 1
+            cell_error = np.maximum.reduce([
+                error[a:a + 2 * cells:2, b:b + 2 * cells:2] for a in range(3) for b in range(3)
+            ])
+            at_limit = (2 * m - 1) ** 2 > limit
+            done, exact, error = _finish(cell_error, max_error, at_limit)
+            if done:
+                step1 = (x1_max - x1_min) / cells
+                step2 = (x2_max - x2_min) / cells
+
+                def sample(rng, per_cell):
+                    cell = np.repeat(np.arange(cells * cells), _probes_per_cell(cells * cells, limit, per_cell))
+                    return (x1_min + (cell // cells + rng.random(cell.size)) * step1,
+                            x2_min + (cell % cells + rng.random(cell.size)) * step2)
+
+                table = cls(x1_min, x1_max, x2_min, x2_max, values, exact)
+                return _check(table, func, sample, max_error, error)
+            if at_limit:
+                return None, error
+            n = m
+            values = fine
+
+    def evaluate(self, x1, x2):
+        t1 = (x1 - self.x1_min) * self.inv_step1
+        t2 = (x2 - self.x2_min) * self.inv_step2
+        if not (0.0 <= t1 <= self.cells1 and 0.0 <= t2 <= self.cells2):
+            return None
+        i = int(t1)
+        j = int(t2)
+        if i == self.cells1:
+            i -= 1
+        if j == self.cells2:
+            j -= 1
+        if self.exact is not None and self.exact[i * self.cells2 + j]:
+            return None
+        f1 = t1 - i
+        f2 = t2 - j
+
+        values = self.values
+        k = i * self.stride + j
+        v00 = values[k]
+        v01 = values[k + 1]
+        v10 = values[k + self.stride]
+        v11 = values[k + self.stride + 1]
+        result = v00 + (v10 - v00) * f1 + ((v01 - v00) + (v11 - v10 - v01 + v00) * f1) * f2
+        if result != result:
+            return None
+        return result
+
+    def evaluate_batch(self, x1, x2):
+        # Входы любой (совместимой) формы, в том числе скаляры; результат - их общей формы
+        shape = np.broadcast_shapes(np.shape(x1), np.shape(x2))
+        x1, x2 = np.broadcast_arrays(np.atleast_1d(np.asarray(x1, dtype=float)),
+                                     np.atleast_1d(np.asarray(x2, dtype=float)))
+        t1 = (x1 - self.x1_min) * self.inv_step1
+        t2 = (x2 - self.x2_min) * self.inv_step2
+        inside = (t1 >= 0.0) & (t1 <= self.cells1) & (t2 >= 0.0) & (t2 <= self.cells2)
+        i = np.clip(np.where(inside, t1, 0.0).astype(np.intp), 0, self.cells1 - 1)
+        j = np.clip(np.where(inside, t2, 0.0).astype(np.intp), 0, self.cells2 - 1)
+        f1 = t1 - i
+        f2 = t2 - j
+
+        k = i * self.stride + j
+        values = self.array
+        v00 = values[k]
+        v01 = values[k + 1]
+        v10 = values[k + self.stride]
+        v11 = values[k + self.stride + 1]
+        result = v00 + (v10 - v00) * f1 + ((v01 - v00) + (v11 - v10 - v01 + v00) * f1) * f2
+        result[~inside] = np.nan
+        if self.exact_array is not None:
+            result[self.exact_array[i * self.cells2 + j]] = np.nan
+        return result.reshape(shape)
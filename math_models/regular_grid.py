@@ -0,0 +1,77 @@
+import bisect
+import numpy as np
+
+
+class BilinearGrid:
+    # Билинейная интерполяция на прямоугольной сетке X1×X2.
+    # Поиск ячейки - бинарный поиск по осям, O(log n)
+
+    def __init__(self, axis_x1, axis_x2, table):
+        self.axis_x1 = np.asarray(axis_x1, dtype=float)
+        self.axis_x2 = np.asarray(axis_x2, dtype=float)
+        self.table = np.asarray(table, dtype=float)
+        # Списки для скалярного пути: bisect по list быстрее, чем по numpy
+        self._axis_x1 = self.axis_x1.tolist()
+        self._axis_x2 = self.axis_x2.tolist()
+        self._table = self.table.tolist()
+
+    @classmethod
+    def from_points(cls, x1, x2, y):
+        # Проверяет, что точки образуют полную сетку, и раскладывает их в таблицу.
+        # Если данные не сетка - возвращает None
+        axis_x1, idx1 = np.unique(x1, return_inverse=True)
+        axis_x2, idx2 = np.unique(x2, return_inverse=True)
+        n1, n2 = len(axis_x1), len(axis_x2)
+
+        if n1 < 2 or n2 < 2 or n1 * n2 != len(y):
+            return None
+
+        cells = idx1 * n2 + idx2
+        # Каждая ячейка должна встречаться ровно один раз
+        if np.bincount(cells, minlength=n1 * n2).max() != 1:
+            return None
+
+        table = np.empty(n1 * n2, dtype=float)
+        table[cells] = y
+        return cls(axis_x1, axis_x2, table.reshape(n1, n2))
+
+    @property
+    def shape(self):
+        return self.table.shape
+
+    def evaluate(self, x1, x2):
+        # Вычисление в одной точке, вне сетки - NaN
+        ax1, ax2 = self._axis_x1, self._axis_x2
+        if not (ax1[0] <= x1 <= ax1[-1] and ax2[0] <= x2 <= ax2[-1]):
+            return float('nan')
+
+        i = min(bisect.bisect_right(ax1, x1), len(ax1) - 1) - 1
+        j = min(bisect.bisect_right(ax2, x2), len(ax2) - 1) - 1
+
+        t = (x1 - ax1[i]) / (ax1[i + 1] - ax1[i])
+        u = (x2 - ax2[j]) / (ax2[j + 1] - ax2[j])
+
+        row0 = self._table[i]
+        row1 = self._table[i + 1]
+        return ((1 - t) * (1 - u) * row0[j] + t * (1 - u) * row1[j] +
+                (1 - t) * u * row0[j + 1] + t * u * row1[j + 1])
+
+    def evaluate_batch(self, x1, x2):
+        # Векторное вычисление для массивов точек, вне сетки - NaN
+        x1 = np.asarray(x1, dtype=float)
+        x2 = np.asarray(x2, dtype=float)
+        ax1, ax2 = self.axis_x1, self.axis_x2
+
+        i = np.clip(np.searchsorted(ax1, x1, side='right') - 1, 0, len(ax1) - 2)
+        j = np.clip(np.searchsorted(ax2, x2, side='right') - 1, 0, len(ax2) - 2)
+
+        t = (x1 - ax1[i]) / (ax1[i + 1] - ax1[i])
+        u = (x2 - ax2[j]) / (ax2[j + 1] - ax2[j])
+
+        table = self.table
+        result = ((1 - t) * (1 - u) * table[i, j] + t * (1 - u) * table[i + 1, j] +
+                  (1 - t) * u * table[i, j + 1] + t * u * table[i + 1, j + 1])
+
+        outside = (x1 < ax1[0]) | (x1 > ax1[-1]) | (x2 < ax2[0]) | (x2 > ax2[-1])
+        result[outside] = np.nan
+        return result
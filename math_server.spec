@@ -6,7 +6,7 @@ a = Analysis(
     pathex=[],
     binaries=[],
     datas=[('math_models', 'math_models'), ('utils', 'utils'), ('test_data', 'test_data'), ('MathApi_pb2.py', '.'), ('MathApi_pb2_grpc.py', '.')],
-    hiddenimports=['scipy', 'scipy.interpolate', 'scipy.interpolate._bspl', 'scipy.interpolate._fitpack', 'scipy.interpolate._ppoly', 'scipy.interpolate.interpnd', 'scipy._lib', 'scipy._lib._ccallback', 'scipy._lib._testutils', 'scipy._lib.array_api_compat', 'scipy._lib.array_api_compat.numpy', 'scipy._lib.array_api_compat.numpy.fft', 'scipy._lib.array_api_compat.numpy.linalg', 'scipy._lib.array_api_compat.common', 'scipy.special', 'scipy.special._ufuncs_cxx', 'scipy.special._specfun', 'platformdirs', 'jaraco.collections', 'jaraco.text', 'jaraco.functools', 'jaraco.context', 'pkg_resources', 'setuptools', 'math_models', 'math_models.interpolation_1d', 'math_models.interpolation_2d', 'math_models.approximation_1d', 'math_models.approximation_2d', 'utils', 'utils.excel_reader', 'grpc', 'grpc._cython', 'pandas', 'openpyxl', 'numpy', 'numpy.core._methods', 'numpy.lib.format'],
+    hiddenimports=['scipy', 'scipy.interpolate', 'scipy.interpolate._bspl', 'scipy.interpolate._fitpack', 'scipy.interpolate._ppoly', 'scipy.interpolate.interpnd', 'scipy.spatial', 'scipy.spatial._qhull', 'scipy._lib', 'scipy._lib._ccallback', 'scipy._lib._testutils', 'scipy._lib.array_api_compat', 'scipy._lib.array_api_compat.numpy', 'scipy._lib.array_api_compat.numpy.fft', 'scipy._lib.array_api_compat.numpy.linalg', 'scipy._lib.array_api_compat.common', 'scipy.special', 'scipy.special._ufuncs_cxx', 'scipy.special._specfun', 'platformdirs', 'jaraco.collections', 'jaraco.text', 'jaraco.functools', 'jaraco.context', 'pkg_resources', 'setuptools', 'math_models', 'math_models.interpolation_1d', 'math_models.interpolation_2d', 'math_models.approximation_1d', 'math_models.approximation_2d', 'math_models.regular_grid', 'math_models.lookup_table', 'math_models.incremental_triangulation', 'utils', 'utils.excel_reader', 'utils.compute_workers', 'utils.dataset_cache', 'utils.binary_sidecar', 'utils.logger', 'utils.metrics', 'utils.result_cache', 'utils.least_squares', 'utils.file_watcher', 'utils.model_state', 'grpc', 'grpc._cython', 'pandas', 'openpyxl', 'numpy', 'numpy.core._methods', 'numpy.lib.format'],
     hookspath=[],
     hooksconfig={},
     runtime_hooks=['C:\\Users\\Mad\\AppData\\Local\\Temp\\runtime_hook_scipy.py'],
@@ -1,58 +1,516 @@
+import argparse
+import asyncio
+import copy
 import grpc
 from concurrent import futures
-import traceback
+import threading
+import os
+import multiprocessing
+import time
+import numpy as np
 
 # Импорт protobuf файлов
 import MathApi_pb2
 import MathApi_pb2_grpc
 
 # Импорт моделей
-from math_models import Models
+from math_models import Models, prewarm, registry_version
+from utils.compute_workers import ComputeWorkerPool
+from utils.excel_reader import ExcelReader
+from utils.file_watcher import FileWatcher
+from utils.logger import get_logger
+from utils.metrics import metrics, AsyncMetricsInterceptor, MetricsInterceptor, start_prometheus_server
+from utils.model_state import ModelStateStore
+from utils.result_cache import ResultCache
 
 
-class ModelManager:
-    # Класс для управления моделями
+logger = get_logger('server')
+
+metrics.add_collector(lambda: [
+    (f"dataset_cache_{name}", {}, value) for name, value in ExcelReader.cache.stats().items()
+])
+
+
+class MetadataCache:
+    # Готовые ответы GetModels/GetConstants/GetInputTags/GetOutputTags.
+    # Собираются один раз из атрибутов классов моделей и перестраиваются
+    # только при изменении реестра (register_model). Сообщения общие для
+    # всех вызовов и не изменяются после сборки
 
     def __init__(self):
+        self._lock = threading.Lock()
+        self._snapshot = None
+
+    def snapshot(self):
+        snapshot = self._snapshot
+        if snapshot is None or snapshot['version'] != registry_version():
+            with self._lock:
+                snapshot = self._snapshot
+                if snapshot is None or snapshot['version'] != registry_version():
+                    snapshot = self._snapshot = self._build()
+        return snapshot
+
+    @staticmethod
+    def _build():
+        version = registry_version()
+        models = list(Models.items())
+
+        constants = {}
+        input_tags = {}
+        output_tags = {}
+        for name, model_class in models:
+            # К константам модели добавляются общие настройки кеша результатов
+            constants[name] = MathApi_pb2.Constants(constantValues=[
+                MathApi_pb2.Constant(name=key, value=str(value))
+                for key, value in {**model_class.default_coefs, **ResultCache.defaults()}.items()
+            ])
+            input_tags[name] = MathApi_pb2.Tags(tags=[
+                MathApi_pb2.TagType(name=tag, desc=desc, unit=model_class.io_unit)
+                for tag, desc in model_class.input_tags
+            ])
+            output_tags[name] = MathApi_pb2.Tags(tags=[
+                MathApi_pb2.TagType(name=tag, desc=desc, unit=model_class.io_unit)
+                for tag, desc in model_class.output_tags
+            ])
+
+        logger.debug("Кеш метаданных собран, версия реестра %d", version)
+        return {
+            'version': version,
+            'models': MathApi_pb2.Models(modelNames=[
+                MathApi_pb2.ModelName(name=name, desc=model_class.description) for name, model_class in models
+            ]),
+            'constants': constants,
+            'input_tags': input_tags,
+            'output_tags': output_tags,
+        }
+
+
+class ModelManager:
+    # Класс для управления моделями.
+    # Чтение (get_model) идет без блокировок: запись в словарь атомарна,
+    # а запись делается только полностью построенной моделью.
+    # Start/Stop одного modelId сериализуются полосатыми блокировками
+
+    LOCK_STRIPES = 16
+
+    def __init__(self, worker_pool=None, watch_files=False, build_workers=0, state_dir=None):
         # Словарь для хранения моделей
         self.models = {}
+        # Состояние построения по modelId: pending, ready, failed и длительности
+        self.status = {}
+        self._status_lock = threading.Lock()
+        self._next_token = 0
+        # Пул построения моделей: Start ставит построение в очередь и сразу
+        # отвечает; если не задан, модель строится в потоке Start
+        self.build_executor = None
+        if build_workers > 0:
+            self.build_executor = futures.ThreadPoolExecutor(max_workers=build_workers,
+                                                             thread_name_prefix='math-build')
+        # Пул рабочих процессов; если не задан, модели считаются в этом процессе
+        self.worker_pool = worker_pool
+        # Счетчик изменений набора моделей, по нему потоки сбрасывают кеш
+        self.generation = 0
+        self._generation_lock = threading.Lock()
+        self._locks = [threading.Lock() for _ in range(self.LOCK_STRIPES)]
+        # Наблюдение за исходными файлами: измененный файл перечитывается
+        # и модель перестраивается в фоновом потоке
+        self.watcher = None
+        if watch_files:
+            self._reload_executor = futures.ThreadPoolExecutor(max_workers=1, thread_name_prefix='math-reload')
+            self._reload_pending = set()
+            self._reload_lock = threading.Lock()
+            self.watcher = FileWatcher(self._source_changed)
+        # Снимки построенных моделей на диске для быстрого перезапуска.
+        # Запись и удаление - по очереди в одном фоновом потоке
+        self.state_store = None
+        if state_dir:
+            self.state_store = ModelStateStore(state_dir)
+            self._state_executor = futures.ThreadPoolExecutor(max_workers=1, thread_name_prefix='math-state')
+            self._saved = {}  # modelId -> последний записанный экземпляр модели
+
+    def _lock_for(self, model_id):
+        return self._locks[hash(model_id) % len(self._locks)]
+
+    def _bump_generation(self):
+        with self._generation_lock:
+            self.generation += 1
 
     def create_model(self, model_id, model_name, constants):
-        if model_id in self.models:
-            self.remove_model(model_id)
+        with self._lock_for(model_id):
+            return self._create_locked(model_id, model_name, constants)
 
+    def queue_model(self, model_id, model_name, constants):
+        # Start без ожидания: модель строится в пуле построения, клиент
+        # следит за состоянием через get_status. Прежняя модель с тем же
+        # modelId обслуживает Transform, пока новая не готова
         if model_name not in Models:
-            return False, f"Модель '{model_name}' не найдена"
+            return self.create_model(model_id, model_name, constants)
+
+        with self._status_lock:
+            self._next_token += 1
+            token = self._next_token
+            self.status[model_id] = {
+                'state': 'pending',
+                'model_name': model_name,
+                'token': token,
+                'queued_at': time.time(),
+                'started_at': None,
+                'finished_at': None,
+                'error': '',
+                'timings': {},
+            }
+        self.build_executor.submit(self._run_build, model_id, model_name, constants, token)
+        logger.info("Построение модели поставлено в очередь: %s (id: %s)", model_name, model_id)
+        return True, "Построение модели поставлено в очередь"
+
+    def _run_build(self, model_id, model_name, constants, token):
+        # Модель строится без блокировки modelId: Start, Stop и AppendData
+        # этой модели не ждут построения. Блокировка берется только для
+        # проверки, что построение не отменено, и замены модели
+        with self._status_lock:
+            status = self.status.get(model_id)
+            if status is None or status['token'] != token:
+                # После постановки в очередь был Stop или новый Start
+                return
+            status['started_at'] = time.time()
+            queued = status['started_at'] - status['queued_at']
+        metrics.observe('build_queue_seconds', {'model': model_name}, queued)
 
+        started = time.perf_counter()
+        started_at = time.time()
         try:
-            model = Models[model_name](constants)
-            model.load_data()
+            model = self._build_model(model_id, model_name, constants)
+        except Exception as e:
+            error_msg = f"Ошибка при создании модели: {str(e)}"
+            logger.exception("Ошибка: %s", error_msg)
+            with self._lock_for(model_id):
+                if self._is_current(model_id, token):
+                    self._fail_locked(model_id, model_name, token, started_at, error_msg)
+            return
 
-            self.models[model_id] = {
-                'instance': model,
-                'name': model_name,
-                'constants': constants
-            }
+        with self._lock_for(model_id):
+            if self._is_current(model_id, token):
+                self._ready_locked(model_id, model_name, constants, model, token, started, started_at)
+                return
+        # Построение отменено, пока шло: модель не нужна
+        self._discard(model)
+
+    def _is_current(self, model_id, token):
+        with self._status_lock:
+            status = self.status.get(model_id)
+            return status is not None and status['token'] == token
+
+    def _create_locked(self, model_id, model_name, constants):
+        started = time.perf_counter()
+        started_at = time.time()
+        if model_name not in Models:
+            error_msg = f"Модель '{model_name}' не найдена"
+            self._fail_locked(model_id, model_name, None, started_at, error_msg)
+            return False, error_msg
 
-            print(f"Создана модель: {model_name} (id: {model_id})")
-            return True, "Модель успешно создана"
+        try:
+            # Новый экземпляр строится в стороне, старый продолжает
+            # обслуживать Transform до замены
+            model = self._build_model(model_id, model_name, constants)
         except Exception as e:
             error_msg = f"Ошибка при создании модели: {str(e)}"
-            print(f"Ошибка: {error_msg}")
-            traceback.print_exc()
+            logger.exception("Ошибка: %s", error_msg)
+            self._fail_locked(model_id, model_name, None, started_at, error_msg)
             return False, error_msg
 
+        self._ready_locked(model_id, model_name, constants, model, None, started, started_at)
+        return True, "Модель успешно создана"
+
+    def _fail_locked(self, model_id, model_name, token, started_at, error_msg):
+        # Клиент запросил новую конфигурацию - старую не оставляем
+        self._remove_locked(model_id)
+        self._finish_status(model_id, model_name, token, started_at, 'failed', error_msg)
+
+    def _ready_locked(self, model_id, model_name, constants, model, token, started, started_at):
+        self._install_locked(model_id, model_name, constants, model)
+        self._finish_status(model_id, model_name, token, started_at, 'ready', timings=model.load_timings)
+        self._save_state(model_id)
+
+        # Длительность этапов Start: поиск файла, чтение, построение модели
+        for phase, seconds in model.load_timings.items():
+            metrics.observe('start_phase_seconds', {'phase': phase, 'model': model_name}, seconds)
+        metrics.observe('start_seconds', {'model': model_name}, time.perf_counter() - started)
+
+        logger.info("Создана модель: %s (id: %s)", model_name, model_id)
+
+    def _install_locked(self, model_id, model_name, constants, model):
+        # Кеш результатов создается заново: перезапуск модели его сбрасывает
+        self._commit(model)
+        self.models[model_id] = {
+            'id': model_id,
+            'instance': model,
+            'name': model_name,
+            'constants': constants,
+            'cache': ResultCache.from_constants(constants)
+        }
+        self._bump_generation()
+        self._watch(model_id, model)
+
+    def restore_models(self):
+        # Восстановление моделей, работавших до перезапуска сервера, из снимков.
+        # Снимки загружаются параллельно; модель, у которой изменился
+        # исходный файл, строится заново. Возвращает число готовых моделей
+        if self.state_store is None:
+            return 0
+        paths = self.state_store.paths()
+        if not paths:
+            return 0
+        started = time.perf_counter()
+        with futures.ThreadPoolExecutor(max_workers=min(len(paths), os.cpu_count() or 1),
+                                        thread_name_prefix='math-restore') as executor:
+            restored = sum(executor.map(self._restore_safely, paths))
+        logger.info("Восстановлено моделей: %d из %d за %.3f с", restored, len(paths), time.perf_counter() - started)
+        return restored
+
+    def _restore_safely(self, path):
+        # Ошибка одного снимка не прерывает восстановление остальных и запуск сервера
+        try:
+            return self._restore_model(path)
+        except Exception:
+            logger.exception("Ошибка восстановления модели из снимка %s", path)
+            return False
+
+    def _restore_model(self, path):
+        loaded = self.state_store.load(path)
+        if loaded is None:
+            return False
+        record, arrays = loaded
+        model_id, model_name, constants = record['model_id'], record['model_name'], record['constants']
+        started = time.perf_counter()
+        started_at = time.time()
+        with self._lock_for(model_id):
+            if model_id in self.models:
+                return False
+            if model_name not in Models or not ModelStateStore.is_current(record):
+                logger.info("Снимок модели %s устарел, построение по исходному файлу", model_id)
+                return self._create_locked(model_id, model_name, constants)[0]
+            try:
+                if self.worker_pool is not None:
+                    model = self.worker_pool.restore_model(model_id, model_name, constants, record['state'], arrays)
+                else:
+                    model = Models[model_name](constants)
+                    model.set_state(record['state'], arrays)
+            except Exception:
+                logger.exception("Ошибка восстановления модели %s из снимка, построение по исходному файлу", model_id)
+                return self._create_locked(model_id, model_name, constants)[0]
+
+            self._install_locked(model_id, model_name, constants, model)
+            self._finish_status(model_id, model_name, None, started_at, 'ready', timings=model.load_timings)
+
+        metrics.observe('restore_seconds', {'model': model_name}, time.perf_counter() - started)
+        logger.info("Модель восстановлена из снимка: %s (id: %s)", model_name, model_id)
+        return True
+
+    def _save_state(self, model_id):
+        # Записать снимок модели в фоне (если каталог снимков задан)
+        if self.state_store is not None:
+            self._state_executor.submit(self._write_state, model_id)
+
+    def _forget_state(self, model_id):
+        if self.state_store is not None:
+            self._state_executor.submit(self._remove_state, model_id)
+
+    def _write_state(self, model_id):
+        # Записывается текущий экземпляр модели: при нескольких изменениях
+        # подряд он записывается один раз, следующие задачи его пропускают
+        model_data = self.models.get(model_id)
+        if not model_data or self._saved.get(model_id) is model_data['instance']:
+            return
+        started = time.perf_counter()
+        labels = {'model': model_data['name']}
+        try:
+            self.state_store.save(model_id, model_data['name'], model_data['constants'], model_data['instance'])
+        except Exception:
+            metrics.inc('state_save_errors_total', labels)
+            logger.exception("Не удалось сохранить снимок модели %s", model_id)
+            return
+        self._saved[model_id] = model_data['instance']
+        metrics.observe('state_save_seconds', labels, time.perf_counter() - started)
+
+    def _remove_state(self, model_id):
+        self._saved.pop(model_id, None)
+        self.state_store.remove(model_id)
+
+    def _finish_status(self, model_id, model_name, token, started_at, state, error='', timings=None):
+        # Итог построения. Для построения из очереди (token) - только если
+        # после него не было нового Start или Stop
+        with self._status_lock:
+            status = self.status.get(model_id)
+            if token is not None and (status is None or status['token'] != token):
+                return
+            if token is None:
+                status = self.status[model_id] = {
+                    'model_name': model_name, 'token': None, 'queued_at': started_at, 'started_at': started_at,
+                }
+            status.update(state=state, error=error, finished_at=time.time(), timings=dict(timings or {}))
+
+    def pending_count(self):
+        # Число моделей, ожидающих построения в очереди
+        with self._status_lock:
+            return sum(1 for status in self.status.values() if status['state'] == 'pending')
+
+    @property
+    def builds_in_background(self):
+        # Start ставит построение в очередь и отвечает сразу
+        return self.build_executor is not None
+
+    def close(self):
+        # Остановка фоновых потоков менеджера. Построения из очереди
+        # отменяются, записи снимков дописываются
+        if self.build_executor is not None:
+            self.build_executor.shutdown(wait=True, cancel_futures=True)
+        if self.watcher is not None:
+            self.watcher.stop()
+            self._reload_executor.shutdown(wait=True, cancel_futures=True)
+        if self.state_store is not None:
+            self._state_executor.shutdown(wait=True)
+
+    def get_status(self, model_id):
+        # Копия состояния построения модели или None
+        with self._status_lock:
+            status = self.status.get(model_id)
+            return dict(status) if status is not None else None
+
+    def _build_model(self, model_id, model_name, constants):
+        model = Models[model_name](constants)
+        if self.worker_pool is not None:
+            return self.worker_pool.start_model(model_id, model_name, model)
+        model.load_data()
+        return model
+
+    def _commit(self, model):
+        # Рабочий процесс переключается на построенную модель только при
+        # замене в менеджере: до этого modelId обслуживает прежняя
+        if self.worker_pool is not None:
+            self.worker_pool.commit_model(model)
+
+    def _discard(self, model):
+        if self.worker_pool is not None:
+            self.worker_pool.discard_model(model)
+
+    def _watch(self, model_id, model):
+        source_path = getattr(model, 'source_path', None)
+        if self.watcher is not None and source_path:
+            self.watcher.watch(source_path, model_id)
+
+    def _source_changed(self, path):
+        # Вызывается наблюдателем: перестроение всех моделей на этом файле.
+        # Повторные изменения, пока перестроение ждет очереди, не добавляют работы
+        for model_id in self.watcher.owners(path):
+            with self._reload_lock:
+                if model_id in self._reload_pending:
+                    continue
+                self._reload_pending.add(model_id)
+            logger.info("Файл изменен: %s, перестроение модели %s", path, model_id)
+            self._reload_executor.submit(self.reload_model, model_id)
+
+    def reload_model(self, model_id):
+        # Перестроение модели с прежними константами по текущему файлу.
+        # Как и при Start, старая модель обслуживает Transform до замены,
+        # при ошибке она остается. Точки, добавленные AppendData, не
+        # сохраняются: источник данных - файл
+        with self._reload_lock:
+            self._reload_pending.discard(model_id)
+        started = time.perf_counter()
+        started_at = time.time()
+        with self._lock_for(model_id):
+            model_data = self.models.get(model_id)
+            if not model_data:
+                return False
+            labels = {'model': model_data['name']}
+            try:
+                model = self._build_model(model_id, model_data['name'], model_data['constants'])
+            except Exception as e:
+                metrics.inc('reload_errors_total', labels)
+                logger.exception("Ошибка перестроения модели %s, используется прежняя", model_id)
+                self._reload_status(model_id, model_data['name'], started_at, 'failed',
+                                    f"Ошибка при перестроении модели: {str(e)}")
+                return False
+
+            self._commit(model)
+            self.models[model_id] = dict(model_data, instance=model,
+                                         cache=ResultCache.from_constants(model_data['constants']))
+            self._bump_generation()
+            self._watch(model_id, model)
+            self._reload_status(model_id, model_data['name'], started_at, 'ready', timings=model.load_timings)
+            self._save_state(model_id)
+
+        metrics.inc('reload_total', labels)
+        metrics.observe('reload_seconds', labels, time.perf_counter() - started)
+        logger.info("Модель перестроена: %s (id: %s)", model_data['name'], model_id)
+        return True
+
+    def _reload_status(self, model_id, model_name, started_at, state, error='', timings=None):
+        # Итог перестроения по измененному файлу. Если клиент уже поставил
+        # новый Start в очередь, состояние останется за ним
+        with self._status_lock:
+            status = self.status.get(model_id)
+            if status is not None and status['state'] == 'pending':
+                return
+            self.status[model_id] = {
+                'model_name': model_name, 'token': None, 'queued_at': started_at, 'started_at': started_at,
+                'state': state, 'error': error, 'finished_at': time.time(), 'timings': dict(timings or {}),
+            }
+
+    def append_data(self, model_id, columns):
+        # Добавить точки в работающую модель. Дополняется копия модели и
+        # заменяет прежнюю целиком: вычисления, начатые на старой, ее
+        # не видят в промежуточном состоянии, а при ошибке она остается
+        started = time.perf_counter()
+        with self._lock_for(model_id):
+            model_data = self.models.get(model_id)
+            if not model_data:
+                return False, f"Модель {model_id} не найдена"
+            if not hasattr(model_data['instance'], 'append_data'):
+                return False, f"Модель '{model_data['name']}' не поддерживает добавление данных"
+
+            try:
+                model = copy.copy(model_data['instance'])
+                model.append_data(*columns)
+            except Exception as e:
+                error_msg = f"Ошибка при добавлении данных: {str(e)}"
+                logger.exception("Ошибка: %s", error_msg)
+                return False, error_msg
+
+            # Результаты в кеше посчитаны прежней моделью - кеш создается заново
+            self.models[model_id] = dict(model_data, instance=model,
+                                         cache=ResultCache.from_constants(model_data['constants']))
+            self._bump_generation()
+            self._save_state(model_id)
+
+        labels = {'model': model_data['name']}
+        metrics.inc('append_points_total', labels, len(columns[0]))
+        metrics.observe('append_seconds', labels, time.perf_counter() - started)
+        return True, "Данные добавлены"
+
     def get_model(self, model_id):
         # Получить модель по ID
         return self.models.get(model_id)
 
     def remove_model(self, model_id):
-        # Удалить модель по ID
-        if model_id in self.models:
-            del self.models[model_id]
-            print(f"Удалена модель: {model_id}")
-            return True
-        return False
+        # Удалить модель по ID; построение в очереди отменяется
+        with self._lock_for(model_id):
+            with self._status_lock:
+                status = self.status.pop(model_id, None)
+            return self._remove_locked(model_id) or status is not None
+
+    def _remove_locked(self, model_id):
+        # Снимок удаляется и для модели, которая не построилась
+        self._forget_state(model_id)
+        if self.models.pop(model_id, None) is None:
+            return False
+        if self.watcher is not None:
+            self.watcher.unwatch(model_id)
+        if self.worker_pool is not None:
+            self.worker_pool.stop_model(model_id)
+        self._bump_generation()
+        logger.info("Удалена модель: %s", model_id)
+        return True
 
     def calculate(self, model_id, inputs):
         # Вычислить результат с помощью модели
@@ -71,7 +529,7 @@ class ModelManager:
                 if len(inputs) == 0:
                     return None
                 last_value = inputs[-1]
-                print(f"1D: X={last_value} (из {len(inputs)} значений)")
+                logger.debug("1D: X=%s (из %d значений)", last_value, len(inputs), extra={'model_id': model_id})
                 return model.calculate(last_value)
 
             elif '2D' in model_name:
@@ -80,82 +538,95 @@ class ModelManager:
                     return None
                 x1 = inputs[-2] if len(inputs) >= 2 else inputs[0]
                 x2 = inputs[-1]
-                print(f"2D: X1={x1}, X2={x2}")
+                logger.debug("2D: X1=%s, X2=%s", x1, x2, extra={'model_id': model_id})
                 return model.calculate(x1, x2)
 
             else:
                 return None
 
         except Exception:
-            traceback.print_exc()
+            logger.exception("Ошибка вычисления модели %s", model_id)
             return None
 
 
 class MathApi(MathApi_pb2_grpc.MathApiServicer):
     #Основной класс gRPC
 
-    def __init__(self):
+    def __init__(self, worker_pool=None, watch_files=False, build_workers=0, state_dir=None):
         # Менеджер моделей
-        self.model_manager = ModelManager()
+        self.model_manager = ModelManager(worker_pool, watch_files, build_workers, state_dir)
+        # Ответы с метаданными собираются сразу, до первого запроса
+        self.metadata = MetadataCache()
+        self.metadata.snapshot()
+        # Источники показателей этого экземпляра; close() снимает их с общего
+        # реестра, иначе он держал бы менеджер моделей и дублировал ряды
+        self._collectors = [
+            lambda: [('models_loaded', {}, len(self.model_manager.models))],
+            self._result_cache_stats,
+            self._fit_info_stats,
+            self._build_stats,
+        ]
+        for collector in self._collectors:
+            metrics.add_collector(collector)
+
+    def close(self):
+        for collector in self._collectors:
+            metrics.remove_collector(collector)
+        self.model_manager.close()
+
+    def _build_stats(self):
+        # Число моделей в очереди построения
+        return [('models_pending', {}, self.model_manager.pending_count())]
+
+    def _result_cache_stats(self):
+        # Попадания в кеш результатов по каждой модели, где он включен
+        values = []
+        for model_id, model_data in list(self.model_manager.models.items()):
+            cache = model_data['cache']
+            if cache is not None:
+                for name, value in cache.stats().items():
+                    values.append((f"result_cache_{name}", {'model_id': model_id}, value))
+        return values
+
+    def _fit_info_stats(self):
+        # Сведения о построенных моделях: размер таблицы значений и ее погрешность
+        values = []
+        for model_id, model_data in list(self.model_manager.models.items()):
+            for name, value in getattr(model_data['instance'], 'fit_info', {}).items():
+                values.append((f"model_{name}", {'model_id': model_id}, value))
+        return values
 
     def GetModels(self, request, context):
         # Получить список доступных моделей
         try:
-            items = []
-            for name, model_class in Models.items():
-                # Экземпляр для получения описания
-                model = model_class()
-                items.append(MathApi_pb2.ModelName(name=name, desc=model.model_desc))
-            return MathApi_pb2.Models(modelNames=items)
+            return self.metadata.snapshot()['models']
         except Exception as e:
             return MathApi_pb2.Models(message=f"Err_{str(e)}")
 
     def GetConstants(self, request, context):
         try:
-            model_name = request.modelName
-            if model_name not in Models:
-                return MathApi_pb2.Constants(message=f"Err_Модель '{model_name}' не найдена")
-
-            model = Models[model_name]()
-            constants = []
-            for name, value in model.coefs.items():
-                constants.append(MathApi_pb2.Constant(name=name, value=str(value)))
-            return MathApi_pb2.Constants(constantValues=constants)
+            response = self.metadata.snapshot()['constants'].get(request.modelName)
+            if response is None:
+                return MathApi_pb2.Constants(message=f"Err_Модель '{request.modelName}' не найдена")
+            return response
         except Exception as e:
             return MathApi_pb2.Constants(message=f"Err_{str(e)}")
 
     def GetInputTags(self, request, context):
         try:
-            model_name = request.modelName
-            if model_name not in Models:
-                return MathApi_pb2.Tags(message=f"Err_Модель '{model_name}' не найдена")
-
-            model = Models[model_name]()
-            tags = []
-
-            if '1D' in model_name:
-                tags.append(MathApi_pb2.TagType(name="X", desc="Входная переменная", unit=model.io_units))
-            elif '2D' in model_name:
-                tags.append(MathApi_pb2.TagType(name="X1", desc="Первая входная переменная", unit=model.io_units))
-                tags.append(MathApi_pb2.TagType(name="X2", desc="Вторая входная переменная", unit=model.io_units))
-
-            return MathApi_pb2.Tags(tags=tags)
+            response = self.metadata.snapshot()['input_tags'].get(request.modelName)
+            if response is None:
+                return MathApi_pb2.Tags(message=f"Err_Модель '{request.modelName}' не найдена")
+            return response
         except Exception as e:
             return MathApi_pb2.Tags(message=f"Err_{str(e)}")
 
     def GetOutputTags(self, request, context):
         try:
-            model_name = request.modelName
-            if model_name not in Models:
-                return MathApi_pb2.Tags(message=f"Err_Модель '{model_name}' не найдена")
-
-            model = Models[model_name]()
-            tags = [MathApi_pb2.TagType(
-                name="Y",
-                desc="Выходная переменная",
-                unit=model.io_units
-            )]
-            return MathApi_pb2.Tags(tags=tags)
+            response = self.metadata.snapshot()['output_tags'].get(request.modelName)
+            if response is None:
+                return MathApi_pb2.Tags(message=f"Err_Модель '{request.modelName}' не найдена")
+            return response
         except Exception as e:
             return MathApi_pb2.Tags(message=f"Err_{str(e)}")
 
@@ -165,104 +636,327 @@ class MathApi(MathApi_pb2_grpc.MathApiServicer):
             model_name = request.modelName
             constants = {const.name: const.value for const in request.constants}
 
-            print(f"Start: {model_name} (id: {model_id})")
+            logger.info("Start: %s (id: %s)", model_name, model_id)
+
+            if self.model_manager.builds_in_background:
+                success, message = self.model_manager.queue_model(model_id, model_name, constants)
+                if success:
+                    return MathApi_pb2.RetReply(message="Start принят")
+                return MathApi_pb2.RetReply(message=f"Err_{message}")
 
             success, message = self.model_manager.create_model(model_id, model_name, constants)
 
             if success:
-                return MathApi_pb2.RetReply(message="Start успешен")
+                return MathApi_pb2.RetReply(message="Start успешен" + self._fit_summary(model_id))
             else:
                 return MathApi_pb2.RetReply(message=f"Err_{message}")
         except Exception as e:
             return MathApi_pb2.RetReply(message=f"Err_{str(e)}")
 
+    def _fit_summary(self, model_id):
+        # Итог построения таблицы значений (lut_max_error) для ответа Start
+        model_data = self.model_manager.get_model(model_id)
+        fit_info = getattr(model_data['instance'], 'fit_info', {}) if model_data else {}
+        if 'lut_error' not in fit_info:
+            return ""
+        if not fit_info['lut_points']:
+            return f": таблица значений не построена, погрешность {fit_info['lut_error']:.3g}"
+        return (f": таблица значений {fit_info['lut_points']} точек, погрешность {fit_info['lut_error']:.3g},"
+                f" точный расчет в {100 * fit_info['lut_exact_share']:.1f}% ячеек")
+
     def Transform(self, request, context):
         try:
             model_id = request.modelId
-            print(f"Transform для модели {model_id}")
+            logger.debug("Transform для модели %s", model_id, extra={'model_id': model_id})
 
             inputs = []
             for tag in request.tagsVal:
                 inputs.append(tag.numericValue)
 
-            print(f"Получено {len(inputs)} значений")
+            logger.debug("Получено %d значений", len(inputs), extra={'model_id': model_id})
 
             model_data = self.model_manager.get_model(model_id)
             if not model_data:
-                return MathApi_pb2.TagsDataArray(message=f"Err_Модель {model_id} не найдена")
+                return MathApi_pb2.TagsDataArray(message=self._missing_message(model_id))
+
+            return self._transform_model(model_data, inputs, request.tagsVal)
+
+        except Exception as e:
+            logger.exception("Ошибка Transform: %s", e)
+            return MathApi_pb2.TagsDataArray(message=f"Err_{str(e)}")
+
+    def _missing_message(self, model_id):
+        # Ответ для modelId без готовой модели: строится (асинхронный Start) или нет
+        status = self.model_manager.get_status(model_id)
+        if status is not None and status['state'] == 'pending':
+            return f"Err_NotReady: модель {model_id} еще строится"
+        return f"Err_Модель {model_id} не найдена"
+
+    def _transform_model(self, model_data, inputs, tags_val):
+        # Вычисление одного такта для уже найденной модели с учетом в показателях
+        started = time.perf_counter()
+        response = self._evaluate_tags(model_data, inputs, tags_val)
+
+        labels = {'model_id': model_data['id']}
+        metrics.inc('model_requests_total', labels)
+        if response.message:
+            metrics.inc('model_errors_total', labels)
+        metrics.observe('model_latency_seconds', labels, time.perf_counter() - started)
+        return response
+
+    def _evaluate_tags(self, model_data, inputs, tags_val):
+        model = model_data['instance']
+        model_name = model_data['name']
+
+        try:
+            # Проверяем тип модели
+            model_class_name = model.__class__.__name__
+
+            if 'NOx' in model_name or 'NOx' in model_class_name:
+                # 5 входов для модели
+                if len(inputs) < 5:
+                    return MathApi_pb2.TagsDataArray(message="Err_Недостаточно входных данных")
+
+                # Берем первые 5 значений
+                result = model.calculate(inputs[:5])
+
+            if '1D' in model_name or '1D' in model_class_name:
+                # Для 1D моделей - 1 вход
+                if len(inputs) == 0:
+                    return MathApi_pb2.TagsDataArray(message="Err_Нет входных данных")
+                last_value = inputs[-1]
+                result = self._calculate(model_data, last_value)
+
+            elif '2D' in model_name or '2D' in model_class_name:
+                # Для 2D моделей - 2 входа
+                if len(inputs) < 2:
+                    return MathApi_pb2.TagsDataArray(message="Err_Недостаточно входных данных для 2D модели")
+                x1 = inputs[-2] if len(inputs) >= 2 else inputs[0]
+                x2 = inputs[-1]
+                result = self._calculate(model_data, x1, x2)
+
+            else:
+                # Если не можем определить, пробуем универсально
+                # Пробуем вызвать calculate с массивом
+                try:
+                    result = model.calculate(inputs)
+                except TypeError:
+                    # Если не получается, пробуем с одним значением
+                    if len(inputs) > 0:
+                        result = model.calculate(inputs[0])
+                    else:
+                        return MathApi_pb2.TagsDataArray(message="Err_Неизвестный тип модели")
+
+            if result is None:
+                return MathApi_pb2.TagsDataArray(message="Err_Ошибка вычисления")
+
+            timestamp = tags_val[-1].timeStamp if tags_val else 0
+            response = MathApi_pb2.TagsDataArray()
+            response.tagsVal.append(MathApi_pb2.TagVal(
+                tagName="Y",
+                timeStamp=timestamp,
+                numericValue=float(result),
+                isGood=True
+            ))
+            logger.debug("Результат: Y=%s", result, extra={'model_id': model_data['id']})
+            return response
+
+        except Exception as calc_error:
+            error_msg = f"Ошибка при вычислении: {str(calc_error)}"
+            logger.warning("Ошибка вычисления: %s", error_msg)
+            return MathApi_pb2.TagsDataArray(message=f"Err_{error_msg}")
+
+    @staticmethod
+    def _calculate(model_data, *inputs):
+        # Вычисление через кеш результатов модели, если он включен
+        cache = model_data['cache']
+        if cache is None:
+            return model_data['instance'].calculate(*inputs)
+        return cache.get_or_compute(inputs, model_data['instance'].calculate)
+
+    def TransformStream(self, request_iterator, context):
+        state = self._stream_state()
+        logger.info("TransformStream: поток открыт")
+        for request in request_iterator:
+            yield self._stream_frame(state, request)
+        logger.info("TransformStream: поток закрыт")
+
+    def _stream_state(self):
+        # Модели разрешаются один раз на поток и перечитываются
+        # только если с тех пор был Start или Stop
+        return {'bound': {}, 'generation': self.model_manager.generation, 'model_id': ''}
+
+    def _stream_frame(self, state, request):
+        # Один кадр потока: пустой modelId - модель предыдущего кадра
+        if request.modelId:
+            state['model_id'] = request.modelId
+        model_id = state['model_id']
+        bound = state['bound']
+        try:
+            if state['generation'] != self.model_manager.generation:
+                state['generation'] = self.model_manager.generation
+                bound.clear()
+
+            model_data = bound.get(model_id)
+            if model_data is None:
+                model_data = self.model_manager.get_model(model_id)
+                if model_data:
+                    bound[model_id] = model_data
+
+            if not model_data:
+                response = MathApi_pb2.TagsDataArray(message=self._missing_message(model_id))
+            else:
+                inputs = [tag.numericValue for tag in request.tagsVal]
+                response = self._transform_model(model_data, inputs, request.tagsVal)
+        except Exception as e:
+            logger.exception("Ошибка TransformStream: %s", e)
+            response = MathApi_pb2.TagsDataArray(message=f"Err_{str(e)}")
+
+        response.modelId = model_id
+        return response
+
+    def TransformBatch(self, request, context):
+        # Пакетное вычисление: каждая выборка - набор тегов одного такта,
+        # все выборки считаются одним векторным вызовом модели
+        try:
+            model_id = request.modelId
+            count = len(request.samples)
+            logger.debug("TransformBatch для модели %s: %d выборок", model_id, count, extra={'model_id': model_id})
+
+            model_data = self.model_manager.get_model(model_id)
+            if not model_data:
+                return MathApi_pb2.TagsDataArray(message=self._missing_message(model_id))
 
             model = model_data['instance']
             model_name = model_data['name']
 
-            try:
-                # Проверяем тип модели
-                model_class_name = model.__class__.__name__
-
-                if 'NOx' in model_name or 'NOx' in model_class_name:
-                    # 5 входов для модели
-                    if len(inputs) < 5:
-                        return MathApi_pb2.TagsDataArray(message="Err_Недостаточно входных данных")
-
-                    # Берем первые 5 значений
-                    result = model.calculate(inputs[:5])
-
-                if '1D' in model_name or '1D' in model_class_name:
-                    # Для 1D моделей - 1 вход
-                    if len(inputs) == 0:
-                        return MathApi_pb2.TagsDataArray(message="Err_Нет входных данных")
-                    last_value = inputs[-1]
-                    result = model.calculate(last_value)
-
-                elif '2D' in model_name or '2D' in model_class_name:
-                    # Для 2D моделей - 2 входа
-                    if len(inputs) < 2:
-                        return MathApi_pb2.TagsDataArray(message="Err_Недостаточно входных данных для 2D модели")
-                    x1 = inputs[-2] if len(inputs) >= 2 else inputs[0]
-                    x2 = inputs[-1]
-                    result = model.calculate(x1, x2)
+            if '1D' in model_name:
+                inputs_count = 1
+            elif '2D' in model_name:
+                inputs_count = 2
+            else:
+                return MathApi_pb2.TagsDataArray(message="Err_Неизвестный тип модели")
 
-                else:
-                    # Если не можем определить, пробуем универсально
-                    # Пробуем вызвать calculate с массивом
-                    try:
-                        result = model.calculate(inputs)
-                    except TypeError:
-                        # Если не получается, пробуем с одним значением
-                        if len(inputs) > 0:
-                            result = model.calculate(inputs[0])
-                        else:
-                            return MathApi_pb2.TagsDataArray(message="Err_Неизвестный тип модели")
-
-                if result is None:
-                    return MathApi_pb2.TagsDataArray(message="Err_Ошибка вычисления")
-
-                timestamp = request.tagsVal[-1].timeStamp if request.tagsVal else 0
-                response = MathApi_pb2.TagsDataArray()
-                response.tagsVal.append(MathApi_pb2.TagVal(
-                    tagName="Y",
-                    timeStamp=timestamp,
-                    numericValue=float(result),
-                    isGood=True
-                ))
-                print(f"Результат: Y={result}")
-                return response
+            # Как и в Transform: 1D берет последнее значение, 2D - два последних
+            columns = np.zeros((inputs_count, count))
+            timestamps = [0] * count
+            is_good = np.zeros(count, dtype=bool)
+            for i, sample in enumerate(request.samples):
+                tags = sample.tagsVal
+                if len(tags) < inputs_count:
+                    if tags:
+                        timestamps[i] = tags[-1].timeStamp
+                    continue
+                for k, tag in enumerate(tags[len(tags) - inputs_count:]):
+                    columns[k, i] = tag.numericValue
+                timestamps[i] = tags[-1].timeStamp
+                is_good[i] = True
 
+            labels = {'model_id': model_id}
+            started = time.perf_counter()
+            try:
+                results = np.asarray(model.calculate_batch(*columns), dtype=float)
             except Exception as calc_error:
+                metrics.inc('model_errors_total', labels)
                 error_msg = f"Ошибка при вычислении: {str(calc_error)}"
-                print(f"Ошибка вычисления: {error_msg}")
+                logger.warning("Ошибка вычисления: %s", error_msg)
                 return MathApi_pb2.TagsDataArray(message=f"Err_{error_msg}")
+            metrics.observe('model_batch_latency_seconds', labels, time.perf_counter() - started)
+            metrics.inc('model_batch_samples_total', labels, count)
+
+            is_good &= np.isfinite(results)
+            results[~is_good] = 0.0
+
+            response = MathApi_pb2.TagsDataArray()
+            response.tagsVal.extend(
+                MathApi_pb2.TagVal(tagName="Y", timeStamp=timestamp, numericValue=value, isGood=good)
+                for timestamp, value, good in zip(timestamps, results.tolist(), is_good.tolist())
+            )
+            return response
 
         except Exception as e:
-            print(f"Ошибка Transform: {e}")
-            traceback.print_exc()
+            logger.exception("Ошибка TransformBatch: %s", e)
             return MathApi_pb2.TagsDataArray(message=f"Err_{str(e)}")
 
+    def GetStats(self, request, context):
+        # Показатели производительности: счетчики, квантили задержек, этапы Start
+        try:
+            values = []
+            for name, labels, value in metrics.snapshot():
+                values.append(MathApi_pb2.StatValue(
+                    name=name,
+                    labels=[MathApi_pb2.KeyValuePair(key=k, value=str(v)) for k, v in labels.items()],
+                    value=float(value)
+                ))
+            return MathApi_pb2.Stats(values=values)
+        except Exception as e:
+            return MathApi_pb2.Stats(message=f"Err_{str(e)}")
+
+    def AppendData(self, request, context):
+        # Добавление точек в работающую модель
+        try:
+            model_id = request.modelId
+            model_data = self.model_manager.get_model(model_id)
+            if not model_data:
+                return MathApi_pb2.RetReply(message=self._missing_message(model_id))
+            if not request.points:
+                return MathApi_pb2.RetReply(message="Err_Нет точек данных")
+
+            # 1D: X = x1; 2D: X1, X2
+            points = request.points
+            y = np.fromiter((point.y for point in points), dtype=float, count=len(points))
+            x1 = np.fromiter((point.x1 for point in points), dtype=float, count=len(points))
+            if '1D' in model_data['name']:
+                columns = (x1, y)
+            elif '2D' in model_data['name']:
+                x2 = np.fromiter((point.x2 for point in points), dtype=float, count=len(points))
+                columns = (x1, x2, y)
+            else:
+                return MathApi_pb2.RetReply(message="Err_Неизвестный тип модели")
+            if not all(np.isfinite(column).all() for column in columns):
+                return MathApi_pb2.RetReply(message="Err_Точки данных содержат NaN или бесконечность")
+
+            logger.info("AppendData: %d точек (id: %s)", len(points), model_id)
+            success, message = self.model_manager.append_data(model_id, columns)
+            if success:
+                return MathApi_pb2.RetReply(message="AppendData успешен")
+            return MathApi_pb2.RetReply(message=f"Err_{message}")
+        except Exception as e:
+            return MathApi_pb2.RetReply(message=f"Err_{str(e)}")
+
+    def GetModelStatus(self, request, context):
+        # Состояние построения модели и длительность ожидания в очереди и построения
+        try:
+            model_id = request.modelId
+            status = self.model_manager.get_status(model_id)
+            if status is None:
+                return MathApi_pb2.ModelStatus(modelId=model_id, message=f"Err_Модель {model_id} не найдена")
+
+            now = time.time()
+            started_at = status['started_at']
+            finished_at = status['finished_at'] or now
+            return MathApi_pb2.ModelStatus(
+                modelId=model_id,
+                modelName=status['model_name'],
+                state=status['state'],
+                error=status['error'],
+                queueSeconds=(started_at or now) - status['queued_at'],
+                buildSeconds=finished_at - started_at if started_at is not None else 0.0,
+                timings=[MathApi_pb2.StatValue(name=phase, value=seconds)
+                         for phase, seconds in status['timings'].items()],
+                message="GetModelStatus успешен"
+            )
+        except Exception as e:
+            return MathApi_pb2.ModelStatus(message=f"Err_{str(e)}")
+
     def Stop(self, request, context):
         # Остановка модели
         try:
             model_id = request.modelId
-            print(f"Stop: {model_id}")
+            logger.info("Stop: %s", model_id)
             success = self.model_manager.remove_model(model_id)
+            # Ряды показателей остановленной модели больше не обновляются
+            metrics.remove_series('model_id', model_id)
 
             if success:
                 return MathApi_pb2.RetReply(message="Stop успешен")
@@ -273,31 +967,235 @@ class MathApi(MathApi_pb2_grpc.MathApiServicer):
 
     def Pause(self, request, context):
         # Пауза
-        print(f"Pause: {request.modelId}")
+        logger.info("Pause: %s", request.modelId)
         return MathApi_pb2.RetReply(message="Pause успешен")
 
 
-def serve():
+class AsyncMathApi(MathApi_pb2_grpc.MathApiServicer):
+    # Сервис MathApi для grpc.aio. Соединения и ожидание запросов
+    # обслуживает цикл событий, поэтому простаивающие клиенты и потоки
+    # не занимают потоков. Вычисления и Start/Stop выполняются в пуле
+    # потоков executor; готовые ответы с метаданными - прямо в цикле
+
+    def __init__(self, api, executor):
+        self.api = api
+        self.executor = executor
+
+    async def _offload(self, method, *args):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, method, *args)
+
+    async def GetModels(self, request, context):
+        return self.api.GetModels(request, context)
+
+    async def GetConstants(self, request, context):
+        return self.api.GetConstants(request, context)
+
+    async def GetInputTags(self, request, context):
+        return self.api.GetInputTags(request, context)
+
+    async def GetOutputTags(self, request, context):
+        return self.api.GetOutputTags(request, context)
+
+    async def Start(self, request, context):
+        return await self._offload(self.api.Start, request, context)
+
+    async def Stop(self, request, context):
+        return await self._offload(self.api.Stop, request, context)
+
+    async def AppendData(self, request, context):
+        return await self._offload(self.api.AppendData, request, context)
+
+    async def Pause(self, request, context):
+        return self.api.Pause(request, context)
+
+    async def GetModelStatus(self, request, context):
+        return self.api.GetModelStatus(request, context)
+
+    async def Transform(self, request, context):
+        return await self._offload(self.api.Transform, request, context)
+
+    async def TransformBatch(self, request, context):
+        return await self._offload(self.api.TransformBatch, request, context)
+
+    async def TransformStream(self, request_iterator, context):
+        state = self.api._stream_state()
+        logger.info("TransformStream: поток открыт")
+        async for request in request_iterator:
+            yield await self._offload(self.api._stream_frame, state, request)
+        logger.info("TransformStream: поток закрыт")
+
+    async def GetStats(self, request, context):
+        return await self._offload(self.api.GetStats, request, context)
+
+
+def prewarm_models():
+    # Фоновая загрузка scipy/pandas после открытия порта
+    started = time.perf_counter()
+    try:
+        modules = prewarm()
+    except Exception:
+        logger.exception("Ошибка предзагрузки модулей")
+        return
+    logger.info("Модули загружены заранее (%s) за %.2f с", ', '.join(modules), time.perf_counter() - started)
+
+
+COMPRESSION = {
+    'none': grpc.Compression.NoCompression,
+    'gzip': grpc.Compression.Gzip,
+    'deflate': grpc.Compression.Deflate,
+}
+
+
+def parse_args(argv=None):
+    # Настройки сервера: аргументы командной строки, по умолчанию - переменные окружения
+    env = os.environ.get
+    parser = argparse.ArgumentParser(description='gRPC сервер MathApi')
+    parser.add_argument('--port', type=int, default=int(env('MATH_PORT', '5080')),
+                        help='порт (MATH_PORT), по умолчанию 5080')
+    parser.add_argument('--aio', action='store_true', default=env('MATH_SERVER_MODE', 'sync') == 'aio',
+                        help='асинхронный сервер grpc.aio (MATH_SERVER_MODE=aio)')
+    parser.add_argument('--workers', type=int, default=int(env('MATH_WORKERS', '10')),
+                        help='потоков обработки запросов, для --aio - потоков вычислений (MATH_WORKERS)')
+    parser.add_argument('--compute-workers', type=int, default=int(env('MATH_COMPUTE_WORKERS', '0')),
+                        help='рабочих процессов вычислений, 0 - в процессе сервера (MATH_COMPUTE_WORKERS)')
+    parser.add_argument('--max-concurrent-rpcs', type=int, default=int(env('MATH_MAX_CONCURRENT_RPCS', '0')),
+                        help='лимит одновременных RPC, сверх него RESOURCE_EXHAUSTED; 0 - без лимита')
+    parser.add_argument('--max-message-mb', type=float, default=float(env('MATH_MAX_MESSAGE_MB', '0')),
+                        help='максимальный размер сообщения, МБ; 0 - по умолчанию gRPC (MATH_MAX_MESSAGE_MB)')
+    parser.add_argument('--keepalive-ms', type=int, default=int(env('MATH_KEEPALIVE_MS', '0')),
+                        help='период keepalive-пингов клиентам, мс; 0 - выключено (MATH_KEEPALIVE_MS)')
+    parser.add_argument('--keepalive-timeout-ms', type=int, default=int(env('MATH_KEEPALIVE_TIMEOUT_MS', '20000')),
+                        help='ожидание ответа на пинг, мс (MATH_KEEPALIVE_TIMEOUT_MS)')
+    parser.add_argument('--compression', choices=sorted(COMPRESSION), default=env('MATH_COMPRESSION', 'none'),
+                        help='сжатие ответов (MATH_COMPRESSION)')
+    parser.add_argument('--watch-files', action='store_true', default=env('MATH_WATCH_FILES', '0') == '1',
+                        help='перестраивать модели в фоне при изменении их файлов (MATH_WATCH_FILES=1)')
+    parser.add_argument('--build-workers', type=int, default=int(env('MATH_BUILD_WORKERS', '0')),
+                        help='потоков построения моделей: Start отвечает сразу, состояние - GetModelStatus; '
+                             '0 - построение в Start (MATH_BUILD_WORKERS)')
+    parser.add_argument('--state-dir', default=env('MATH_STATE_DIR', ''),
+                        help='каталог снимков построенных моделей: после перезапуска модели '
+                             'восстанавливаются без чтения Excel; пусто - выключено (MATH_STATE_DIR)')
+    parser.add_argument('--metrics-port', type=int, default=int(env('MATH_METRICS_PORT', '0')),
+                        help='порт Prometheus /metrics, 0 - выключено (MATH_METRICS_PORT)')
+    return parser.parse_args(argv)
+
+
+def server_options(args):
+    # Параметры канала gRPC из настроек
+    options = []
+    if args.max_message_mb > 0:
+        size = int(args.max_message_mb * 1024 * 1024)
+        options.append(('grpc.max_send_message_length', size))
+        options.append(('grpc.max_receive_message_length', size))
+    if args.keepalive_ms > 0:
+        options.append(('grpc.keepalive_time_ms', args.keepalive_ms))
+        options.append(('grpc.keepalive_timeout_ms', args.keepalive_timeout_ms))
+        options.append(('grpc.keepalive_permit_without_calls', 1))
+        options.append(('grpc.http2.max_pings_without_data', 0))
+    return options
+
+
+def start_services(args):
+    # Общая часть запуска: пул вычислений и HTTP показатели
+    worker_pool = ComputeWorkerPool(args.compute_workers) if args.compute_workers > 0 else None
+
+    # Показатели в формате Prometheus на локальном порту, если задан
+    if args.metrics_port:
+        start_prometheus_server(args.metrics_port)
+        logger.info("Показатели Prometheus: http://127.0.0.1:%d/metrics", args.metrics_port)
+    return worker_pool
+
+
+def start_prewarm():
+    # Тяжелые модули грузятся в фоне, когда порт уже слушается.
+    # MATH_PREWARM=0 - загружать только при первом Start
+    if os.environ.get('MATH_PREWARM', '1') != '0':
+        threading.Thread(target=prewarm_models, name='prewarm', daemon=True).start()
+
+
+def serve(args=None):
     # Функция запуска gRPC сервера
-    port = "5080"
+    if args is None:
+        args = parse_args([])
+
+    worker_pool = start_services(args)
 
-    server = grpc.server(futures.ThreadPoolExecutor(max_workers=10))
+    server = grpc.server(futures.ThreadPoolExecutor(max_workers=args.workers),
+                         interceptors=[MetricsInterceptor()],
+                         options=server_options(args),
+                         maximum_concurrent_rpcs=args.max_concurrent_rpcs or None,
+                         compression=COMPRESSION[args.compression])
 
-    # Добавление сервиса к серверу
-    MathApi_pb2_grpc.add_MathApiServicer_to_server(MathApi(), server)
+    # Добавление сервиса к серверу; модели прошлого запуска восстанавливаются до приема запросов
+    api = MathApi(worker_pool, args.watch_files, args.build_workers, args.state_dir)
+    api.model_manager.restore_models()
+    MathApi_pb2_grpc.add_MathApiServicer_to_server(api, server)
 
     # Настройка порта
-    server.add_insecure_port("[::]:" + port)
+    server.add_insecure_port(f"[::]:{args.port}")
 
     # Выводт информации о запуске
-    print(f"СЕРВЕР ЗАПУЩЕН НА ПОРТУ {port}")
-    print("Ожидание подключений...")
+    logger.info("СЕРВЕР ЗАПУЩЕН НА ПОРТУ %s", args.port)
+    logger.info("Ожидание подключений...")
 
     # Запуск сервера
     server.start()
+    start_prewarm()
     # Ожидание завершения работы
-    server.wait_for_termination()
+    try:
+        server.wait_for_termination()
+    finally:
+        api.close()
+        if worker_pool is not None:
+            worker_pool.shutdown()
+
+
+async def _serve(args):
+    worker_pool = start_services(args)
+    executor = futures.ThreadPoolExecutor(max_workers=args.workers, thread_name_prefix='compute')
+
+    server = grpc.aio.server(interceptors=[AsyncMetricsInterceptor()],
+                             options=server_options(args),
+                             maximum_concurrent_rpcs=args.max_concurrent_rpcs or None,
+                             compression=COMPRESSION[args.compression])
+    api = MathApi(worker_pool, args.watch_files, args.build_workers, args.state_dir)
+    api.model_manager.restore_models()
+    MathApi_pb2_grpc.add_MathApiServicer_to_server(AsyncMathApi(api, executor), server)
+    server.add_insecure_port(f"[::]:{args.port}")
+
+    logger.info("СЕРВЕР (grpc.aio) ЗАПУЩЕН НА ПОРТУ %s", args.port)
+    logger.info("Ожидание подключений...")
+
+    await server.start()
+    start_prewarm()
+    try:
+        await server.wait_for_termination()
+    finally:
+        await server.stop(None)
+        executor.shutdown(wait=False, cancel_futures=True)
+        api.close()
+        if worker_pool is not None:
+            worker_pool.shutdown()
+
+
+def serve_async(args=None):
+    # Запуск асинхронного сервера; настройки те же, что у serve()
+    if args is None:
+        args = parse_args([])
+    asyncio.run(_serve(args))
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.aio:
+        serve_async(args)
+    else:
+        serve(args)
 
 
 if __name__ == "__main__":
-    serve()
\ No newline at end of file
+    # Нужно для рабочих процессов в сборке PyInstaller
+    multiprocessing.freeze_support()
+    main()
@@ -0,0 +1,100 @@
+import hashlib
+import os
+import uuid
+
+import numpy as np
+
+from utils.logger import get_logger
+
+
+logger = get_logger(__name__)
+
+
+class BinarySidecar:
+    # Скомпилированная копия данных Excel в формате .npy: колонки лежат
+    # строками массива (число колонок, число точек) float64.
+    # Время изменения и размер исходного файла входят в имя копии,
+    # поэтому после правки Excel старая копия просто не находится.
+    # Чтение через mmap: данные не копируются, а страницы файла
+    # разделяются всеми процессами через кеш ОС
+
+    VERSION = 1
+
+    @staticmethod
+    def enabled():
+        return os.environ.get('MATH_SIDECAR', '1') != '0'
+
+    @staticmethod
+    def cache_dir(source_path):
+        # Каталог копий: MATH_SIDECAR_DIR или __mathcache__ рядом с исходным файлом
+        directory = os.environ.get('MATH_SIDECAR_DIR')
+        if directory:
+            return directory
+        return os.path.join(os.path.dirname(os.path.realpath(source_path)), '__mathcache__')
+
+    @staticmethod
+    def _prefix(source_path, kind):
+        real_path = os.path.realpath(source_path)
+        digest = hashlib.sha1(real_path.encode('utf-8')).hexdigest()[:16]
+        return f"{os.path.basename(real_path)}.{digest}.{kind}."
+
+    @staticmethod
+    def path_for(source_path, kind):
+        stat = os.stat(source_path)
+        name = (BinarySidecar._prefix(source_path, kind) +
+                f"v{BinarySidecar.VERSION}.{stat.st_mtime_ns}.{stat.st_size}.npy")
+        return os.path.join(BinarySidecar.cache_dir(source_path), name)
+
+    @staticmethod
+    def load(source_path, kind, columns):
+        # Вернуть колонки из актуальной копии или None, если копии нет
+        path = BinarySidecar.path_for(source_path, kind)
+        if not os.path.exists(path):
+            return None
+        try:
+            table = np.load(path, mmap_mode='r', allow_pickle=False)
+        except (OSError, ValueError):
+            return None
+        if table.ndim != 2 or table.shape[0] != columns or table.dtype != np.float64:
+            return None
+        # Обычные массивы-представления поверх отображения, без подкласса memmap
+        return tuple(np.asarray(table))
+
+    @staticmethod
+    def save(source_path, kind, arrays):
+        # Записать копию атомарно; если каталог недоступен для записи - пропустить
+        path = BinarySidecar.path_for(source_path, kind)
+        directory = os.path.dirname(path)
+        try:
+            os.makedirs(directory, exist_ok=True)
+            # Права копии как у обычного файла (0666 с учетом umask, ее применяет
+            # ядро): mkstemp создает 0600, и копию рядом с общей книгой не
+            # смогли бы читать другие учетные записи
+            tmp_path = os.path.join(directory, f"tmp{uuid.uuid4().hex}.tmp")
+            fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o666)
+            try:
+                with os.fdopen(fd, 'wb') as f:
+                    np.save(f, np.vstack([np.asarray(a, dtype=np.float64) for a in arrays]))
+                os.replace(tmp_path, path)
+            except BaseException:
+                os.unlink(tmp_path)
+                raise
+        except OSError as e:
+            logger.warning("Не удалось записать бинарную копию %s: %s", path, e)
+            return None
+
+        BinarySidecar._remove_stale(source_path, kind, path)
+        return path
+
+    @staticmethod
+    def _remove_stale(source_path, kind, current_path):
+        # Удалить копии от прежних версий того же файла и старых форматов
+        directory = os.path.dirname(current_path)
+        prefix = BinarySidecar._prefix(source_path, kind)
+        for name in os.listdir(directory):
+            path = os.path.join(directory, name)
+            if name.startswith(prefix) and path != current_path:
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
@@ -0,0 +1,356 @@
+import copy
+import multiprocessing
+import threading
+import zlib
+from concurrent.futures import Future
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from utils.dataset_cache import DatasetCache
+from utils.logger import get_logger
+
+
+logger = get_logger(__name__)
+
+
+def _attach_shared_memory(name):
+    # Подключение к чужому блоку: удалять его должен только главный процесс.
+    # До Python 3.13 параметра track нет, но spawn-процессы используют общий
+    # с главным процессом resource_tracker, и повторная регистрация безвредна
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        return shared_memory.SharedMemory(name=name)
+
+
+def _worker_main(conn):
+    # Цикл рабочего процесса: команды выполняются по очереди,
+    # ответ отправляется с тем же идентификатором запроса
+    from math_models import Models
+
+    models = {}
+    staged = {}    # этап -> модель, построенная, но еще не принятая менеджером
+    attached = {}  # имя блока -> [SharedMemory, число моделей]
+
+    def unref(shm_name):
+        if shm_name is None:
+            # Модель восстановлена из снимка, данные - ее собственные
+            return
+        block = attached[shm_name]
+        block[1] -= 1
+        if block[1] == 0:
+            del attached[shm_name]
+            try:
+                block[0].close()
+            except BufferError:
+                # На буфер еще ссылаются массивы - блок закроется при сборке мусора
+                pass
+
+    def release(model_id):
+        entry = models.pop(model_id, None)
+        if entry is not None:
+            unref(entry[1])
+
+    while True:
+        try:
+            request_id, command, args = conn.recv()
+        except (EOFError, OSError):
+            break
+
+        try:
+            result = None
+            if command == 'calculate':
+                model_id, inputs = args
+                result = models[model_id][0].calculate(*inputs)
+            elif command == 'calculate_batch':
+                model_id, inputs = args
+                result = models[model_id][0].calculate_batch(*inputs)
+            elif command == 'start':
+                # Новая модель ждет подтверждения под ключом этапа, прежняя
+                # модель modelId обслуживает вычисления до команды commit
+                stage, model_name, constants, shm_name, shape = args
+                if shm_name not in attached:
+                    attached[shm_name] = [_attach_shared_memory(shm_name), 0]
+                block = attached[shm_name]
+                block[1] += 1
+                try:
+                    columns = np.ndarray(shape, dtype=np.float64, buffer=block[0].buf)
+                    columns.flags.writeable = False
+                    model = Models[model_name](constants)
+                    model.set_data(*columns)
+                except Exception:
+                    unref(shm_name)
+                    raise
+                staged[stage] = (model, shm_name)
+                result = model.load_timings, getattr(model, 'fit_info', {})
+                columns = model = None
+            elif command == 'commit':
+                # Менеджер заменил модель - рабочий процесс переключается на новую
+                model_id, stage = args
+                entry = staged.pop(stage)
+                release(model_id)
+                models[model_id] = entry
+                entry = None
+            elif command == 'discard':
+                entry = staged.pop(args[0], None)
+                if entry is not None:
+                    unref(entry[1])
+                entry = None
+            elif command == 'append':
+                # Точки добавляются в копию модели, она заменяет прежнюю
+                model_id, columns = args
+                model, shm_name = models[model_id]
+                updated = copy.copy(model)
+                updated.append_data(*columns)
+                models[model_id] = (updated, shm_name)
+                result = getattr(updated, 'fit_info', {})
+                model = updated = None
+            elif command == 'restore':
+                # Модель из сохраненного состояния, без общего блока данных
+                stage, model_name, constants, state, arrays = args
+                model = Models[model_name](constants)
+                model.set_state(state, arrays)
+                staged[stage] = (model, None)
+                result = model.load_timings, getattr(model, 'fit_info', {})
+                model = None
+            elif command == 'state':
+                result = models[args[0]][0].get_state()
+            elif command == 'stop':
+                release(args[0])
+            elif command == 'shutdown':
+                conn.send((request_id, True, None))
+                break
+            else:
+                raise ValueError(f"Неизвестная команда: {command}")
+            conn.send((request_id, True, result))
+        except Exception as e:
+            logger.exception("Ошибка в рабочем процессе: %s", command)
+            conn.send((request_id, False, str(e)))
+
+    for model_id in list(models):
+        release(model_id)
+    for _, shm_name in staged.values():
+        unref(shm_name)
+
+
+class _WorkerHandle:
+    # Рабочий процесс и канал к нему. Запросы из разных потоков
+    # идут в один канал, ответы разбирает отдельный поток-читатель
+
+    def __init__(self, context, index):
+        self.index = index
+        self.conn, child_conn = context.Pipe()
+        self.process = context.Process(target=_worker_main, args=(child_conn,),
+                                       name=f"math-worker-{index}", daemon=True)
+        self.process.start()
+        child_conn.close()
+
+        self._send_lock = threading.Lock()
+        self._pending = {}
+        self._closed = False
+        self._next_id = 0
+        self._reader = threading.Thread(target=self._read_loop,
+                                        name=f"math-worker-{index}-reader", daemon=True)
+        self._reader.start()
+
+    def _read_loop(self):
+        while True:
+            try:
+                request_id, ok, payload = self.conn.recv()
+            except (EOFError, OSError):
+                break
+            future = self._pending.pop(request_id, None)
+            if future is None:
+                continue
+            if ok:
+                future.set_result(payload)
+            else:
+                future.set_exception(RuntimeError(payload))
+
+        # Процесс завершился - все ожидающие запросы получают ошибку
+        with self._send_lock:
+            self._closed = True
+            pending, self._pending = self._pending, {}
+        for future in pending.values():
+            future.set_exception(RuntimeError(f"Рабочий процесс {self.index} завершился"))
+
+    def submit(self, command, *args):
+        future = Future()
+        with self._send_lock:
+            if self._closed:
+                raise RuntimeError(f"Рабочий процесс {self.index} не запущен")
+            request_id = self._next_id
+            self._next_id += 1
+            self._pending[request_id] = future
+            self.conn.send((request_id, command, args))
+        return future
+
+    def call(self, command, *args):
+        return self.submit(command, *args).result()
+
+
+class RemoteModel:
+    # Заместитель модели в главном процессе: вычисления выполняются
+    # в рабочем процессе, которому назначен modelId
+
+    def __init__(self, worker, model_id, model_name, load_timings=None, fit_info=None, source_path=None,
+                 stage=None):
+        self.worker = worker
+        self.model_id = model_id
+        # Ключ модели в рабочем процессе до подтверждения (commit_model)
+        self.stage = stage
+        self.model_name = model_name
+        self.source_path = source_path
+        self.load_timings = load_timings or {}
+        self.fit_info = fit_info or {}
+
+    def calculate(self, *inputs):
+        return self.worker.call('calculate', self.model_id, inputs)
+
+    def calculate_batch(self, *inputs):
+        inputs = tuple(np.asarray(values, dtype=float) for values in inputs)
+        return self.worker.call('calculate_batch', self.model_id, inputs)
+
+    def append_data(self, *columns):
+        columns = tuple(np.asarray(values, dtype=float) for values in columns)
+        self.fit_info = self.worker.call('append', self.model_id, columns)
+
+    def get_state(self):
+        return self.worker.call('state', self.model_id)
+
+
+class ComputeWorkerPool:
+    # Пул рабочих процессов для вычисления моделей.
+    # Модели распределяются по процессам по modelId, данные моделей
+    # лежат в общей памяти: один блок на файл, процессы его не копируют
+
+    def __init__(self, workers):
+        context = multiprocessing.get_context('spawn')
+        self.workers = [_WorkerHandle(context, i) for i in range(workers)]
+        self._lock = threading.Lock()
+        self._datasets = {}        # ключ файла -> [SharedMemory, форма, число моделей]
+        self._model_datasets = {}  # modelId -> ключ файла
+        self._staged_datasets = {}  # этап -> ключ файла (None - модель из снимка)
+        self._next_stage = 0
+        logger.info("Запущено рабочих процессов: %d", workers)
+
+    def worker_for(self, model_id):
+        return self.workers[zlib.crc32(model_id.encode('utf-8')) % len(self.workers)]
+
+    def _dataset_key(self, model, columns):
+        return DatasetCache.make_key(model.source_path, len(columns))
+
+    def _acquire_dataset(self, key, columns):
+        # Блок общей памяти для набора данных, общий для всех моделей с тем же файлом
+        with self._lock:
+            dataset = self._datasets.get(key)
+            if dataset is None:
+                table = np.vstack([np.asarray(column, dtype=np.float64) for column in columns])
+                shm = shared_memory.SharedMemory(create=True, size=max(table.nbytes, 1))
+                np.ndarray(table.shape, dtype=np.float64, buffer=shm.buf)[:] = table
+                dataset = self._datasets[key] = [shm, table.shape, 0]
+            dataset[2] += 1
+            return dataset[0].name, dataset[1]
+
+    def _release_dataset(self, key):
+        with self._lock:
+            dataset = self._datasets.get(key)
+            if dataset is None:
+                return
+            dataset[2] -= 1
+            if dataset[2] == 0:
+                del self._datasets[key]
+                dataset[0].close()
+                dataset[0].unlink()
+
+    def _new_stage(self, model_id):
+        with self._lock:
+            self._next_stage += 1
+            return f"{model_id}#{self._next_stage}"
+
+    def start_model(self, model_id, model_name, model):
+        # Данные читаются в главном процессе незагруженным экземпляром model,
+        # сама модель строится в рабочем процессе. Построенная модель
+        # начинает обслуживать modelId только после commit_model,
+        # до этого ее можно отбросить discard_model
+        columns = model.read_data()
+        key = self._dataset_key(model, columns)
+        shm_name, shape = self._acquire_dataset(key, columns)
+
+        worker = self.worker_for(model_id)
+        stage = self._new_stage(model_id)
+        try:
+            worker_timings, fit_info = worker.call('start', stage, model_name, model.coefs, shm_name, shape)
+        except Exception:
+            self._release_dataset(key)
+            raise
+
+        with self._lock:
+            self._staged_datasets[stage] = key
+        return RemoteModel(worker, model_id, model_name, dict(model.load_timings, **worker_timings),
+                           fit_info, model.source_path, stage)
+
+    def restore_model(self, model_id, model_name, constants, state, arrays):
+        # Модель из снимка строится сразу в рабочем процессе; как и в
+        # start_model, до commit_model она не заменяет прежнюю
+        worker = self.worker_for(model_id)
+        stage = self._new_stage(model_id)
+        worker_timings, fit_info = worker.call('restore', stage, model_name, constants, state, arrays)
+
+        with self._lock:
+            self._staged_datasets[stage] = None
+        return RemoteModel(worker, model_id, model_name, worker_timings, fit_info, state.get('source_path'), stage)
+
+    def commit_model(self, model):
+        # Менеджер заменил модель: рабочий процесс переключает modelId на
+        # новую модель, набор данных прежней освобождается
+        stage, model.stage = model.stage, None
+        if stage is None:
+            return
+        model.worker.call('commit', model.model_id, stage)
+        with self._lock:
+            key = self._staged_datasets.pop(stage, None)
+            old_key = self._model_datasets.pop(model.model_id, None)
+            if key is not None:
+                self._model_datasets[model.model_id] = key
+        if old_key is not None:
+            self._release_dataset(old_key)
+
+    def discard_model(self, model):
+        # Построенная модель не понадобилась (отмена или ошибка до замены)
+        stage, model.stage = model.stage, None
+        if stage is None:
+            return
+        with self._lock:
+            key = self._staged_datasets.pop(stage, None)
+        try:
+            model.worker.call('discard', stage)
+        finally:
+            if key is not None:
+                self._release_dataset(key)
+
+    def stop_model(self, model_id):
+        # Восстановленные из снимка модели общего блока не имеют
+        with self._lock:
+            key = self._model_datasets.pop(model_id, None)
+        try:
+            self.worker_for(model_id).call('stop', model_id)
+        finally:
+            if key is not None:
+                self._release_dataset(key)
+
+    def shutdown(self):
+        for worker in self.workers:
+            try:
+                worker.call('shutdown')
+            except Exception:
+                pass
+            worker.process.join(timeout=5)
+        with self._lock:
+            for shm, _, _ in self._datasets.values():
+                shm.close()
+                shm.unlink()
+            self._datasets.clear()
+            self._model_datasets.clear()
+            self._staged_datasets.clear()
@@ -0,0 +1,113 @@
+import os
+import threading
+from collections import OrderedDict
+
+
+class DatasetCache:
+    # Кеш разобранных наборов данных на весь процесс.
+    # Ключ - реальный путь к файлу, время изменения, размер и вид данных,
+    # поэтому измененный файл автоматически читается заново.
+    # Объем ограничен max_bytes, вытесняются давно не использованные записи
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._items = OrderedDict()
+        self._bytes = 0
+        # Блокировки загрузки по ключу: один файл не разбирается дважды одновременно
+        self._loading = {}
+
+    @classmethod
+    def from_env(cls):
+        max_mb = float(os.environ.get('MATH_DATASET_CACHE_MB', '512'))
+        return cls(int(max_mb * 1024 * 1024))
+
+    @staticmethod
+    def make_key(file_path, kind):
+        stat = os.stat(file_path)
+        return os.path.realpath(file_path), stat.st_mtime_ns, stat.st_size, kind
+
+    def get_or_load(self, file_path, kind, loader):
+        # Вернуть массивы из кеша или загрузить их функцией loader(file_path)
+        if self.max_bytes <= 0:
+            return loader(file_path)
+
+        key = self.make_key(file_path, kind)
+        arrays = self._get(key)
+        if arrays is not None:
+            return arrays
+
+        with self._lock:
+            key_lock = self._loading.setdefault(key, threading.Lock())
+
+        try:
+            with key_lock:
+                # Пока ждали, файл мог загрузить другой поток
+                arrays = self._get(key, count=False)
+                if arrays is not None:
+                    return arrays
+
+                arrays = loader(file_path)
+                for array in arrays:
+                    array.setflags(write=False)
+                self._put(key, arrays)
+        finally:
+            # И при ошибке загрузки: иначе блокировка ключа остается навсегда.
+            # Удаляется только своя блокировка - другой поток мог уже поставить новую
+            with self._lock:
+                if self._loading.get(key) is key_lock:
+                    del self._loading[key]
+        return arrays
+
+    def peek(self, file_path, kind):
+        # Массивы из кеша без загрузки, None если их там нет
+        if self.max_bytes <= 0:
+            return None
+        return self._get(self.make_key(file_path, kind), count=False)
+
+    def _get(self, key, count=True):
+        with self._lock:
+            arrays = self._items.get(key)
+            if arrays is not None:
+                self._items.move_to_end(key)
+                if count:
+                    self.hits += 1
+            elif count:
+                self.misses += 1
+            return arrays
+
+    def _put(self, key, arrays):
+        size = sum(array.nbytes for array in arrays)
+        if size > self.max_bytes:
+            return
+
+        with self._lock:
+            # Повторная запись ключа заменяет прежние массивы, а не добавляет их объем
+            previous = self._items.pop(key, None)
+            if previous is not None:
+                self._bytes -= sum(array.nbytes for array in previous)
+            self._items[key] = arrays
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                _, evicted = self._items.popitem(last=False)
+                self._bytes -= sum(array.nbytes for array in evicted)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+            self._bytes = 0
+
+    def stats(self):
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'entries': len(self._items),
+                'bytes': self._bytes,
+                'max_bytes': self.max_bytes,
+            }
@@ -1,12 +1,92 @@
-import pandas as pd
+import os
 import numpy as np
 
+from utils.dataset_cache import DatasetCache
+from utils.binary_sidecar import BinarySidecar
+
 
 class ExcelReader:
+    # pandas и openpyxl загружаются только при разборе Excel:
+    # если есть бинарная копия, они не нужны вовсе
+    requires = ('pandas', 'openpyxl')
+    # Общий кеш разобранных файлов: повторный Start не читает Excel заново
+    cache = DatasetCache.from_env()
+    # Размер блока строк при потоковом чтении
+    CHUNK_ROWS = 65536
 
     @staticmethod
     def read_1d_data(file_path: str):
-        # Читает данные для 1D моделей, колонки X и Y
+        # Читает данные для 1D моделей (через кеш), колонки X и Y
+        return ExcelReader.cache.get_or_load(file_path, '1d', ExcelReader._load_1d_data)
+
+    @staticmethod
+    def read_2d_data(file_path: str):
+        # Читает данные для 2D моделей (через кеш), колонки X1, X2 и Y
+        return ExcelReader.cache.get_or_load(file_path, '2d', ExcelReader._load_2d_data)
+
+    @staticmethod
+    def iter_1d_data(file_path: str, chunk_rows=None):
+        # Блоки (X, Y) для однопроходного построения модели, без сортировки
+        return ExcelReader._iter_data(file_path, '1d', ['X', 'Y'], ExcelReader.read_1d_data, chunk_rows)
+
+    @staticmethod
+    def iter_2d_data(file_path: str, chunk_rows=None):
+        # Блоки (X1, X2, Y) для однопроходного построения модели
+        return ExcelReader._iter_data(file_path, '2d', ['X1', 'X2', 'Y'], ExcelReader.read_2d_data, chunk_rows)
+
+    @staticmethod
+    def _iter_data(file_path: str, kind, names, reader, chunk_rows):
+        # Уже разобранные данные (кеш, бинарная копия) отдаются срезами массивов.
+        # Большой Excel без копии читается потоково: массивы на весь файл не создаются
+        chunk_rows = chunk_rows or ExcelReader.CHUNK_ROWS
+        arrays = ExcelReader.cache.peek(file_path, kind)
+        if arrays is None and BinarySidecar.enabled():
+            arrays = BinarySidecar.load(file_path, kind, len(names))
+        if arrays is None and ExcelReader.use_streaming(file_path):
+            yield from ExcelReader.iter_chunks(file_path, names, chunk_rows)
+            return
+
+        if arrays is None:
+            arrays = reader(file_path)
+        for start in range(0, len(arrays[0]), chunk_rows):
+            yield tuple(array[start:start + chunk_rows] for array in arrays)
+
+    @staticmethod
+    def _load_1d_data(file_path: str):
+        return ExcelReader._load_compiled(file_path, '1d', 2, ExcelReader._parse_1d_data)
+
+    @staticmethod
+    def _load_2d_data(file_path: str):
+        return ExcelReader._load_compiled(file_path, '2d', 3, ExcelReader._parse_2d_data)
+
+    @staticmethod
+    def _load_compiled(file_path: str, kind, columns, parser):
+        # Сначала бинарная копия рядом с файлом, Excel разбирается только
+        # если копии нет или исходный файл изменился
+        if not BinarySidecar.enabled():
+            return parser(file_path)
+
+        arrays = BinarySidecar.load(file_path, kind, columns)
+        if arrays is not None:
+            return arrays
+
+        arrays = parser(file_path)
+        if BinarySidecar.save(file_path, kind, arrays) is not None:
+            # Отдаем отображение файла, а не прочитанные массивы:
+            # так страницы данных общие для всех процессов
+            compiled = BinarySidecar.load(file_path, kind, columns)
+            if compiled is not None:
+                return compiled
+        return arrays
+
+    @staticmethod
+    def _parse_1d_data(file_path: str):
+        # Разбор файла для 1D моделей, колонки X и Y
+        if ExcelReader.use_streaming(file_path):
+            x, y = ExcelReader._stream_columns(file_path, ['X', 'Y'])
+            return ExcelReader._sort_by_x(x, y)
+
+        import pandas as pd
         df = pd.read_excel(file_path, engine='openpyxl')
 
         # Проверяем нужные колонки
@@ -21,13 +101,24 @@ class ExcelReader:
         valid = ~(np.isnan(x) | np.isnan(y))
         x, y = x[valid], y[valid]
 
-        # Сортируем по X
+        return ExcelReader._sort_by_x(x, y)
+
+    @staticmethod
+    def _sort_by_x(x, y):
+        # Сортируем по X; уже отсортированные данные не копируем
+        if len(x) < 2 or np.all(x[1:] >= x[:-1]):
+            return x, y
         order = np.argsort(x)
-        return x[order], y[order]
+        x = x[order]
+        return x, y[order]
 
     @staticmethod
-    def read_2d_data(file_path: str):
-        # Читает данные для 2D моделей: колонки X1, X2 и Y
+    def _parse_2d_data(file_path: str):
+        # Разбор файла для 2D моделей: колонки X1, X2 и Y
+        if ExcelReader.use_streaming(file_path):
+            return ExcelReader._stream_columns(file_path, ['X1', 'X2', 'Y'])
+
+        import pandas as pd
         df = pd.read_excel(file_path, engine='openpyxl')
 
         # Проверяем нужные колонки
@@ -43,4 +134,99 @@ class ExcelReader:
 
         # Убираем строки где есть NaN
         valid = ~(np.isnan(x1) | np.isnan(x2) | np.isnan(y))
-        return x1[valid], x2[valid], y[valid]
\ No newline at end of file
+        return x1[valid], x2[valid], y[valid]
+
+    @staticmethod
+    def use_streaming(file_path: str):
+        # Потоковое чтение: MATH_EXCEL_STREAMING=1 - всегда, 0 - никогда,
+        # иначе для файлов больше MATH_EXCEL_STREAMING_MB (10 МБ)
+        mode = os.environ.get('MATH_EXCEL_STREAMING', 'auto')
+        if mode in ('0', '1'):
+            return mode == '1'
+        threshold_mb = float(os.environ.get('MATH_EXCEL_STREAMING_MB', '10'))
+        return os.path.getsize(file_path) > threshold_mb * 1024 * 1024
+
+    @staticmethod
+    def _open_rows(file_path: str, names):
+        # Открывает первый лист в режиме read_only и возвращает книгу,
+        # итератор строк данных и номера нужных колонок
+        from openpyxl import load_workbook
+
+        workbook = load_workbook(file_path, read_only=True, data_only=True)
+        try:
+            sheet = workbook.worksheets[0]
+            rows = sheet.iter_rows(values_only=True)
+            header = [str(cell) if cell is not None else None for cell in next(rows, ())]
+            for name in names:
+                if name not in header:
+                    raise ValueError(f"В файле {file_path} должна быть колонка '{name}'")
+            indices = [header.index(name) for name in names]
+            return workbook, sheet, rows, indices
+        except Exception:
+            workbook.close()
+            raise
+
+    @staticmethod
+    def _row_values(row, indices, values):
+        # Заполняет values числами из строки; False если есть пустое значение или NaN
+        for k, index in enumerate(indices):
+            cell = row[index] if index < len(row) else None
+            if cell is None:
+                return False
+            value = float(cell)
+            if value != value:
+                return False
+            values[k] = value
+        return True
+
+    @staticmethod
+    def iter_chunks(file_path: str, names, chunk_rows=None):
+        # Генератор блоков колонок по chunk_rows строк без NaN.
+        # Первые блоки доступны до того, как разобран весь файл
+        chunk_rows = chunk_rows or ExcelReader.CHUNK_ROWS
+        workbook, _, rows, indices = ExcelReader._open_rows(file_path, names)
+        try:
+            buffer = np.empty((len(names), chunk_rows))
+            values = [0.0] * len(names)
+            filled = 0
+            for row in rows:
+                if not ExcelReader._row_values(row, indices, values):
+                    continue
+                buffer[:, filled] = values
+                filled += 1
+                if filled == chunk_rows:
+                    yield tuple(buffer)
+                    buffer = np.empty((len(names), chunk_rows))
+                    filled = 0
+            if filled:
+                yield tuple(buffer[:, :filled])
+        finally:
+            workbook.close()
+
+    @staticmethod
+    def _stream_columns(file_path: str, names):
+        # Читает колонки построчно сразу в заранее выделенные массивы.
+        # Пиковая память близка к размеру итоговых массивов
+        workbook, sheet, rows, indices = ExcelReader._open_rows(file_path, names)
+        try:
+            capacity = max((sheet.max_row or 0) - 1, ExcelReader.CHUNK_ROWS)
+            columns = [np.empty(capacity) for _ in names]
+            values = [0.0] * len(names)
+            filled = 0
+            for row in rows:
+                if not ExcelReader._row_values(row, indices, values):
+                    continue
+                if filled == capacity:
+                    # Размер листа в файле оказался неверным - расширяем
+                    capacity += capacity // 2
+                    for column in columns:
+                        column.resize(capacity, refcheck=False)
+                for column, value in zip(columns, values):
+                    column[filled] = value
+                filled += 1
+        finally:
+            workbook.close()
+
+        for column in columns:
+            column.resize(filled, refcheck=False)
+        return tuple(columns)
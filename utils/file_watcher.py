@@ -0,0 +1,212 @@
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import sys
+import threading
+import time
+
+from utils.logger import get_logger
+
+
+logger = get_logger(__name__)
+
+
+# Флаги inotify (linux/inotify.h)
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+WATCH_MASK = IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE
+EVENT_HEADER = struct.Struct('iIII')
+
+
+def _file_state(path):
+    # Время изменения и размер; None - файла нет
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+class _Inotify:
+    # Минимальная обертка inotify через ctypes. Наблюдаются каталоги,
+    # а не сами файлы: Excel и многие редакторы сохраняют файл заменой
+    # (запись во временный и переименование), и наблюдение за файлом теряется
+
+    def __init__(self):
+        libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+        self._add_watch = libc.inotify_add_watch
+        self._add_watch.argtypes = (ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32)
+        self.fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1")
+        self.directories = {}  # дескриптор наблюдения -> каталог
+
+    def add_directory(self, directory):
+        wd = self._add_watch(self.fd, os.fsencode(directory), WATCH_MASK)
+        if wd < 0:
+            raise OSError(ctypes.get_errno(), f"inotify_add_watch {directory}")
+        self.directories[wd] = directory
+
+    def read_paths(self, timeout):
+        # Пути файлов, с которыми были события, за время ожидания timeout
+        readable, _, _ = select.select([self.fd], [], [], timeout)
+        if not readable:
+            return []
+        try:
+            data = os.read(self.fd, 65536)
+        except BlockingIOError:
+            return []
+
+        paths = []
+        offset = 0
+        while offset + EVENT_HEADER.size <= len(data):
+            wd, _, _, length = EVENT_HEADER.unpack_from(data, offset)
+            offset += EVENT_HEADER.size
+            name = data[offset:offset + length].rstrip(b'\0')
+            offset += length
+            directory = self.directories.get(wd)
+            if directory is not None and name:
+                paths.append(os.path.join(directory, os.fsdecode(name)))
+        return paths
+
+    def close(self):
+        os.close(self.fd)
+
+
+class FileWatcher:
+    # Наблюдение за исходными файлами моделей.
+    # on_change(path) вызывается из потока наблюдателя, когда файл изменился
+    # (время изменения или размер) и после последнего события прошло
+    # debounce секунд - так сохранение по частям дает один вызов.
+    #
+    # Режим MATH_WATCH_MODE: auto (inotify на Linux, иначе опрос), inotify, poll.
+    # Опрос - каждые MATH_WATCH_INTERVAL секунд (2), пауза MATH_WATCH_DEBOUNCE_MS (500)
+
+    def __init__(self, on_change, mode=None, interval=None, debounce=None):
+        env = os.environ.get
+        self.on_change = on_change
+        self.interval = interval if interval is not None else float(env('MATH_WATCH_INTERVAL', '2'))
+        self.debounce = debounce if debounce is not None else float(env('MATH_WATCH_DEBOUNCE_MS', '500')) / 1000
+        self._lock = threading.Lock()
+        self._files = {}    # реальный путь -> последнее известное состояние
+        self._owners = {}   # владелец (modelId) -> реальный путь
+        self._dirty = {}    # реальный путь -> время последнего события
+        self._seen = {}     # реальный путь -> состояние при последнем опросе
+        self._stopped = threading.Event()
+
+        mode = mode or env('MATH_WATCH_MODE', 'auto')
+        self._inotify = None
+        if mode == 'inotify' or (mode == 'auto' and sys.platform.startswith('linux')):
+            try:
+                self._inotify = _Inotify()
+            except (OSError, AttributeError) as e:
+                if mode == 'inotify':
+                    raise
+                logger.warning("inotify недоступен (%s), изменения файлов ищутся опросом", e)
+        self.mode = 'inotify' if self._inotify is not None else 'poll'
+
+        self._thread = threading.Thread(target=self._run, name='file-watcher', daemon=True)
+        self._thread.start()
+        logger.info("Наблюдение за файлами моделей: %s", self.mode)
+
+    def watch(self, path, owner):
+        # Наблюдать за файлом path для владельца owner (прежний файл владельца снимается)
+        real_path = os.path.realpath(path)
+        with self._lock:
+            self._release(owner)
+            self._owners[owner] = real_path
+            if real_path in self._files:
+                return
+            self._files[real_path] = _file_state(real_path)
+            if self._inotify is not None:
+                directory = os.path.dirname(real_path)
+                if directory not in self._inotify.directories.values():
+                    try:
+                        self._inotify.add_directory(directory)
+                    except OSError as e:
+                        logger.warning("Не удалось наблюдать за каталогом %s: %s", directory, e)
+
+    def unwatch(self, owner):
+        with self._lock:
+            self._release(owner)
+
+    def owners(self, path):
+        with self._lock:
+            return [owner for owner, owner_path in self._owners.items() if owner_path == path]
+
+    def _release(self, owner):
+        real_path = self._owners.pop(owner, None)
+        if real_path is not None and real_path not in self._owners.values():
+            # Каталог в inotify остается: наблюдение за ним почти ничего не стоит
+            self._files.pop(real_path, None)
+            self._dirty.pop(real_path, None)
+            self._seen.pop(real_path, None)
+
+    def stop(self):
+        self._stopped.set()
+        self._thread.join(timeout=5)
+        if self._inotify is not None:
+            self._inotify.close()
+
+    def _run(self):
+        while not self._stopped.is_set():
+            try:
+                self._collect_events()
+                for path in self._settled():
+                    try:
+                        self.on_change(path)
+                    except Exception:
+                        logger.exception("Ошибка обработки изменения файла %s", path)
+            except Exception:
+                logger.exception("Ошибка наблюдения за файлами")
+                self._stopped.wait(self.interval)
+
+    def _collect_events(self):
+        # Отметить файлы, с которыми что-то происходило
+        if self._inotify is not None:
+            timeout = self.debounce if self._dirty else 1.0
+            paths = self._inotify.read_paths(timeout)
+            now = time.monotonic()
+            with self._lock:
+                for path in paths:
+                    if path in self._files:
+                        self._dirty[path] = now
+            return
+
+        self._stopped.wait(min(self.interval, self.debounce) if self._dirty else self.interval)
+        now = time.monotonic()
+        with self._lock:
+            files = list(self._files.items())
+        for path, state in files:
+            observed = _file_state(path)
+            if observed == state:
+                continue
+            with self._lock:
+                # Пока файл продолжает меняться, пауза отсчитывается заново
+                if path in self._files and self._seen.get(path) != observed:
+                    self._seen[path] = observed
+                    self._dirty[path] = now
+
+    def _settled(self):
+        # Файлы, которые не трогали debounce секунд и которые действительно изменились
+        now = time.monotonic()
+        changed = []
+        with self._lock:
+            for path, touched in list(self._dirty.items()):
+                if now - touched < self.debounce:
+                    continue
+                del self._dirty[path]
+                self._seen.pop(path, None)
+                state = _file_state(path)
+                if state is None or state == self._files.get(path):
+                    # Файл удален (временно - при сохранении заменой) или не изменился
+                    continue
+                self._files[path] = state
+                changed.append(path)
+        return changed
@@ -0,0 +1,85 @@
+import itertools
+from math import comb
+
+import numpy as np
+
+
+def scaling(lo, hi):
+    # Сдвиг и масштаб, переводящие [lo, hi] в [-1, 1]. Одночлены от
+    # такой переменной не различаются на порядки, и МНК не теряет
+    # точность, как на одночленах от X порядка сотен и тысяч
+    shift = (lo + hi) / 2
+    scale = (hi - lo) / 2
+    if not scale > 0:
+        scale = max(abs(shift), 1.0)
+    return shift, scale
+
+
+def monomial_basis_change(exponents, alpha, beta):
+    # Матрица замены базиса одночленов при замене переменных
+    # v[i] = alpha[i] * u[i] + beta[i]: одночлен exponents[k] от v равен
+    # сумме одночленов от u с коэффициентами из столбца k. Все младшие
+    # степени каждого одночлена должны входить в exponents
+    index = {powers: i for i, powers in enumerate(exponents)}
+    matrix = np.zeros((len(exponents), len(exponents)))
+    for k, powers in enumerate(exponents):
+        for lower in itertools.product(*(range(p + 1) for p in powers)):
+            coef = 1.0
+            for p, j, a, b in zip(powers, lower, alpha, beta):
+                coef *= comb(p, j) * a ** j * b ** (p - j)
+            matrix[index[lower], k] = coef
+    return matrix
+
+
+class StreamingLeastSquares:
+    # Метод наименьших квадратов по блокам строк (потоковый QR).
+    # Хранится только треугольный множитель R расширенной матрицы [A | y]
+    # размером (k+1)x(k+1): память не зависит от числа строк, данные
+    # просматриваются один раз. Последний столбец R - это Q^T y,
+    # последний диагональный элемент - норма невязки
+
+    BLOCK_ROWS = 4096
+
+    def __init__(self, n_terms):
+        self.n_terms = n_terms
+        self.rows = 0
+        self.r = np.zeros((0, n_terms + 1))
+
+    def add(self, design, y):
+        # Добавить блок строк: design - матрица (m, k), y - вектор (m,).
+        # QR считается по BLOCK_ROWS строк - временная память ограничена
+        step = self.BLOCK_ROWS
+        for start in range(0, len(y), step):
+            rows = len(y[start:start + step])
+            block = np.empty((len(self.r) + rows, self.n_terms + 1))
+            block[:len(self.r)] = self.r
+            block[len(self.r):, :-1] = design[start:start + step]
+            block[len(self.r):, -1] = y[start:start + step]
+            self.r = np.linalg.qr(block, mode='r')
+            self.rows += rows
+
+    def change_basis(self, matrix):
+        # Перейти к столбцам design @ matrix без повторного прохода по данным:
+        # R заменяется треугольным множителем R @ matrix (R общий с копиями
+        # решателя, поэтому создается новый)
+        k = self.n_terms
+        r = self.r.copy()
+        r[:, :k] = self.r[:, :k] @ matrix
+        self.r = np.linalg.qr(r, mode='r')
+
+    def solve(self):
+        # Коэффициенты, минимизирующие ||A c - y||
+        if self.rows == 0:
+            raise ValueError("Нет данных для построения модели")
+        k = self.n_terms
+        r = self.r[:k, :k]
+        qty = self.r[:k, k]
+        if len(r) < k:
+            # Строк меньше, чем коэффициентов - решение с минимальной нормой
+            r = np.vstack((r, np.zeros((k - len(r), k))))
+            qty = np.concatenate((qty, np.zeros(k - len(qty))))
+        return np.linalg.lstsq(r, qty, rcond=None)[0]
+
+    def residual_norm(self):
+        k = self.n_terms
+        return abs(float(self.r[k, k])) if len(self.r) > k else 0.0
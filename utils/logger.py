@@ -0,0 +1,116 @@
+import atexit
+import logging
+import logging.handlers
+import os
+import queue
+import threading
+import time
+
+
+# Все логгеры приложения - потомки 'math'. Запись в консоль идет
+# из фонового потока через очередь, вызывающий поток только кладет запись.
+#
+# Переменные окружения:
+#   MATH_LOG_LEVEL  - уровень (DEBUG, INFO, WARNING...), по умолчанию INFO
+#   MATH_LOG_SAMPLE - писать каждую N-ю запись уровня ниже WARNING на модель
+#   MATH_LOG_RATE   - не больше N таких записей в секунду на модель, 0 - без ограничения
+
+ROOT_LOGGER = 'math'
+
+_listener = None
+_handler = None
+_setup_lock = threading.Lock()
+
+
+class _DeferredQueueHandler(logging.handlers.QueueHandler):
+    # Запись кладется в очередь как есть: форматирование сообщения
+    # выполняется в фоновом потоке, а не в потоке вычислений
+
+    def prepare(self, record):
+        return record
+
+
+class ModelLogFilter(logging.Filter):
+    # Прореживание и ограничение частоты записей отдельно для каждой модели.
+    # Ключ - атрибут model_id записи (extra={'model_id': ...}), иначе имя логгера.
+    # Предупреждения и ошибки проходят всегда
+
+    def __init__(self, sample_every=1, max_per_second=0):
+        super().__init__()
+        self.sample_every = max(int(sample_every), 1)
+        self.max_per_second = max_per_second
+        self.dropped = 0
+        self._lock = threading.Lock()
+        self._counters = {}  # ключ -> [счетчик записей, начало секунды, записей за секунду]
+
+    def filter(self, record):
+        if record.levelno >= logging.WARNING:
+            return True
+        if self.sample_every == 1 and not self.max_per_second:
+            return True
+
+        key = getattr(record, 'model_id', record.name)
+        now = time.monotonic()
+        with self._lock:
+            counter = self._counters.get(key)
+            if counter is None:
+                counter = self._counters[key] = [0, now, 0]
+            counter[0] += 1
+            if (counter[0] - 1) % self.sample_every:
+                self.dropped += 1
+                return False
+            if self.max_per_second:
+                if now - counter[1] >= 1.0:
+                    counter[1] = now
+                    counter[2] = 0
+                if counter[2] >= self.max_per_second:
+                    self.dropped += 1
+                    return False
+                counter[2] += 1
+        return True
+
+
+def setup_logging(level=None, stream=None):
+    # Настройка логгера 'math'; повторный вызов ничего не делает
+    global _listener, _handler
+    with _setup_lock:
+        if _listener is not None:
+            return
+
+        level = level or os.environ.get('MATH_LOG_LEVEL', 'INFO')
+        log_queue = queue.SimpleQueue()
+
+        console = logging.StreamHandler(stream)
+        console.setFormatter(logging.Formatter('%(asctime)s %(levelname)s %(name)s: %(message)s'))
+
+        handler = _DeferredQueueHandler(log_queue)
+        handler.addFilter(ModelLogFilter(
+            sample_every=int(os.environ.get('MATH_LOG_SAMPLE', '1')),
+            max_per_second=float(os.environ.get('MATH_LOG_RATE', '0')),
+        ))
+
+        root = logging.getLogger(ROOT_LOGGER)
+        root.setLevel(level.upper() if isinstance(level, str) else level)
+        root.addHandler(handler)
+        root.propagate = False
+
+        _handler = handler
+        _listener = logging.handlers.QueueListener(log_queue, console)
+        _listener.start()
+        atexit.register(shutdown_logging)
+
+
+def shutdown_logging():
+    # Дописать оставшиеся в очереди записи и остановить фоновый поток
+    global _listener, _handler
+    with _setup_lock:
+        if _listener is not None:
+            logging.getLogger(ROOT_LOGGER).removeHandler(_handler)
+            _listener.stop()
+            _listener = None
+            _handler = None
+
+
+def get_logger(name):
+    setup_logging()
+    return logging.getLogger(f"{ROOT_LOGGER}.{name}")
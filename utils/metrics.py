@@ -0,0 +1,314 @@
+import bisect
+import math
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import grpc
+
+
+class LatencyHistogram:
+    # Гистограмма задержек с логарифмическими корзинами (10 на декаду,
+    # от 1 мкс до 100 с). Квантили оцениваются интерполяцией внутри корзины
+
+    BOUNDS = [10 ** (k / 10) * 1e-6 for k in range(81)]
+
+    def __init__(self):
+        self.buckets = [0] * (len(self.BOUNDS) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, seconds):
+        index = bisect.bisect_left(self.BOUNDS, seconds)
+        with self._lock:
+            self.buckets[index] += 1
+            self.count += 1
+            self.sum += seconds
+            if seconds > self.max:
+                self.max = seconds
+
+    def quantile(self, q):
+        with self._lock:
+            buckets = list(self.buckets)
+            count = self.count
+            maximum = self.max
+        if count == 0:
+            return 0.0
+
+        rank = q * count
+        seen = 0
+        for index, bucket in enumerate(buckets):
+            if bucket and seen + bucket >= rank:
+                lower = self.BOUNDS[index - 1] if index > 0 else 0.0
+                upper = self.BOUNDS[index] if index < len(self.BOUNDS) else lower
+                return min(lower + (upper - lower) * (rank - seen) / bucket, maximum)
+            seen += bucket
+        return maximum
+
+
+class Metrics:
+    # Реестр счетчиков, показателей и гистограмм.
+    # Метки передаются словарем и хранятся как отсортированный кортеж пар
+
+    QUANTILES = (0.5, 0.95, 0.99)
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters = {}
+        self._gauges = {}
+        self._histograms = {}
+        # Источники показателей, которые вычисляются в момент снимка
+        self._collectors = []
+
+    @staticmethod
+    def _key(name, labels):
+        return name, tuple(sorted(labels.items())) if labels else ()
+
+    def inc(self, name, labels=None, value=1):
+        key = self._key(name, labels)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def gauge_add(self, name, labels=None, delta=1):
+        key = self._key(name, labels)
+        with self._lock:
+            self._gauges[key] = self._gauges.get(key, 0) + delta
+
+    def observe(self, name, labels, seconds):
+        key = self._key(name, labels)
+        histogram = self._histograms.get(key)
+        if histogram is None:
+            with self._lock:
+                histogram = self._histograms.setdefault(key, LatencyHistogram())
+        histogram.observe(seconds)
+
+    def remove_series(self, label, value):
+        # Удалить счетчики, показатели и гистограммы с меткой label=value
+        # (например, ряды остановленной модели)
+        pair = (label, value)
+        with self._lock:
+            for series in (self._counters, self._gauges, self._histograms):
+                for key in [key for key in series if pair in key[1]]:
+                    del series[key]
+
+    def add_collector(self, collector):
+        # collector() возвращает список (имя, метки, значение).
+        # Список заменяется целиком: snapshot обходит его без блокировки
+        with self._lock:
+            self._collectors = self._collectors + [collector]
+
+    def remove_collector(self, collector):
+        with self._lock:
+            self._collectors = [c for c in self._collectors if c is not collector]
+
+    def snapshot(self):
+        # Все значения списком (имя, словарь меток, число)
+        with self._lock:
+            counters = list(self._counters.items())
+            gauges = list(self._gauges.items())
+            histograms = list(self._histograms.items())
+
+        values = []
+        for (name, labels), value in counters + gauges:
+            values.append((name, dict(labels), value))
+        for (name, labels), histogram in histograms:
+            labels = dict(labels)
+            values.append((f"{name}_count", labels, histogram.count))
+            values.append((f"{name}_sum", labels, histogram.sum))
+            for q in self.QUANTILES:
+                values.append((name, dict(labels, quantile=str(q)), histogram.quantile(q)))
+        for collector in self._collectors:
+            values.extend(collector())
+        return values
+
+    def prometheus_text(self):
+        lines = []
+        for name, labels, value in self.snapshot():
+            if labels:
+                text = ','.join(f'{k}="{_escape(str(v))}"' for k, v in sorted(labels.items()))
+                lines.append(f"math_{name}{{{text}}} {_number(value)}")
+            else:
+                lines.append(f"math_{name} {_number(value)}")
+        return '\n'.join(lines) + '\n'
+
+
+def _escape(value):
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _number(value):
+    if isinstance(value, float) and not math.isfinite(value):
+        return 'NaN' if math.isnan(value) else ('+Inf' if value > 0 else '-Inf')
+    return repr(float(value))
+
+
+# Общий реестр процесса
+metrics = Metrics()
+
+
+def _is_error(response):
+    # Ошибки API возвращаются в поле message с префиксом Err_
+    return getattr(response, 'message', '').startswith('Err_')
+
+
+class MetricsInterceptor(grpc.ServerInterceptor):
+    # Задержка, число вызовов, ошибок и выполняющихся запросов по каждому RPC
+
+    def __init__(self, registry=None):
+        self.registry = registry or metrics
+        self._handlers = {}
+
+    def intercept_service(self, continuation, handler_call_details):
+        handler = continuation(handler_call_details)
+        if handler is None:
+            return None
+
+        method = handler_call_details.method
+        wrapped = self._handlers.get(method)
+        if wrapped is None or wrapped[0] is not handler:
+            wrapped = (handler, self._wrap(handler, method.rsplit('/', 1)[-1]))
+            self._handlers[method] = wrapped
+        return wrapped[1]
+
+    def _wrap(self, handler, method):
+        labels = {'method': method}
+        registry = self.registry
+
+        def unary(behavior):
+            def wrapper(request, context):
+                started = time.perf_counter()
+                registry.gauge_add('rpc_in_flight', labels, 1)
+                error = True
+                try:
+                    response = behavior(request, context)
+                    error = _is_error(response)
+                    return response
+                finally:
+                    registry.gauge_add('rpc_in_flight', labels, -1)
+                    registry.inc('rpc_requests_total', labels)
+                    if error:
+                        registry.inc('rpc_errors_total', labels)
+                    registry.observe('rpc_latency_seconds', labels, time.perf_counter() - started)
+            return wrapper
+
+        def streaming(behavior):
+            # Для потоковых ответов задержка - время жизни потока,
+            # ошибки считаются по каждому кадру
+            def wrapper(request, context):
+                started = time.perf_counter()
+                registry.gauge_add('rpc_in_flight', labels, 1)
+                try:
+                    for response in behavior(request, context):
+                        if _is_error(response):
+                            registry.inc('rpc_errors_total', labels)
+                        yield response
+                finally:
+                    registry.gauge_add('rpc_in_flight', labels, -1)
+                    registry.inc('rpc_requests_total', labels)
+                    registry.observe('rpc_latency_seconds', labels, time.perf_counter() - started)
+            return wrapper
+
+        if handler.unary_unary:
+            return handler._replace(unary_unary=unary(handler.unary_unary))
+        if handler.stream_unary:
+            return handler._replace(stream_unary=unary(handler.stream_unary))
+        if handler.unary_stream:
+            return handler._replace(unary_stream=streaming(handler.unary_stream))
+        if handler.stream_stream:
+            return handler._replace(stream_stream=streaming(handler.stream_stream))
+        return handler
+
+
+class AsyncMetricsInterceptor(grpc.aio.ServerInterceptor):
+    # То же для сервера grpc.aio: обработчики - корутины и асинхронные генераторы
+
+    def __init__(self, registry=None):
+        self.registry = registry or metrics
+        self._handlers = {}
+
+    async def intercept_service(self, continuation, handler_call_details):
+        handler = await continuation(handler_call_details)
+        if handler is None:
+            return None
+
+        method = handler_call_details.method
+        wrapped = self._handlers.get(method)
+        if wrapped is None or wrapped[0] is not handler:
+            wrapped = (handler, self._wrap(handler, method.rsplit('/', 1)[-1]))
+            self._handlers[method] = wrapped
+        return wrapped[1]
+
+    def _wrap(self, handler, method):
+        labels = {'method': method}
+        registry = self.registry
+
+        def unary(behavior):
+            async def wrapper(request, context):
+                started = time.perf_counter()
+                registry.gauge_add('rpc_in_flight', labels, 1)
+                error = True
+                try:
+                    response = await behavior(request, context)
+                    error = _is_error(response)
+                    return response
+                finally:
+                    registry.gauge_add('rpc_in_flight', labels, -1)
+                    registry.inc('rpc_requests_total', labels)
+                    if error:
+                        registry.inc('rpc_errors_total', labels)
+                    registry.observe('rpc_latency_seconds', labels, time.perf_counter() - started)
+            return wrapper
+
+        def streaming(behavior):
+            async def wrapper(request, context):
+                started = time.perf_counter()
+                registry.gauge_add('rpc_in_flight', labels, 1)
+                try:
+                    async for response in behavior(request, context):
+                        if _is_error(response):
+                            registry.inc('rpc_errors_total', labels)
+                        yield response
+                finally:
+                    registry.gauge_add('rpc_in_flight', labels, -1)
+                    registry.inc('rpc_requests_total', labels)
+                    registry.observe('rpc_latency_seconds', labels, time.perf_counter() - started)
+            return wrapper
+
+        if handler.unary_unary:
+            return handler._replace(unary_unary=unary(handler.unary_unary))
+        if handler.stream_unary:
+            return handler._replace(stream_unary=unary(handler.stream_unary))
+        if handler.unary_stream:
+            return handler._replace(unary_stream=streaming(handler.unary_stream))
+        if handler.stream_stream:
+            return handler._replace(stream_stream=streaming(handler.stream_stream))
+        return handler
+
+
+class _PrometheusHandler(BaseHTTPRequestHandler):
+    registry = metrics
+
+    def do_GET(self):
+        if self.path.split('?', 1)[0] not in ('/', '/metrics'):
+            self.send_error(404)
+            return
+        body = self.registry.prometheus_text().encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_prometheus_server(port, host='127.0.0.1', registry=None):
+    # HTTP-сервер с показателями в текстовом формате Prometheus (GET /metrics)
+    handler = type('PrometheusHandler', (_PrometheusHandler,), {'registry': registry or metrics})
+    http_server = ThreadingHTTPServer((host, port), handler)
+    thread = threading.Thread(target=http_server.serve_forever, name='metrics-http', daemon=True)
+    thread.start()
+    return http_server
@@ -0,0 +1,124 @@
+import hashlib
+import json
+import os
+import tempfile
+import time
+import zipfile
+
+import numpy as np
+
+from utils.logger import get_logger
+
+
+logger = get_logger(__name__)
+
+
+def _file_state(path):
+    # Время изменения и размер файла; None - файла нет
+    try:
+        stat = os.stat(path)
+    except (OSError, TypeError):
+        return None
+    return [stat.st_mtime_ns, stat.st_size]
+
+
+class ModelStateStore:
+    # Снимки построенных моделей для быстрого перезапуска сервера.
+    # Одна модель - один файл .npz в каталоге MATH_STATE_DIR: массивы
+    # модели (коэффициенты, узлы сплайна, точки и симплексы триангуляции,
+    # таблицы) хранятся как .npy без pickle, параметры - JSON в массиве
+    # __meta__ того же файла, поэтому снимок записывается атомарно.
+    # Снимок не используется, если у него другая версия формата или
+    # исходный Excel изменился после сохранения
+
+    VERSION = 1
+    META = '__meta__'
+
+    def __init__(self, directory):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def path_for(self, model_id):
+        digest = hashlib.sha1(model_id.encode('utf-8')).hexdigest()[:16]
+        return os.path.join(self.directory, f"model.{digest}.npz")
+
+    def paths(self):
+        # Все снимки в каталоге
+        return sorted(os.path.join(self.directory, name) for name in os.listdir(self.directory)
+                      if name.startswith('model.') and name.endswith('.npz'))
+
+    def save(self, model_id, model_name, constants, model):
+        # Записать снимок модели; возвращает путь
+        state, arrays = model.get_state()
+        # Модель рабочего процесса строится по данным из общей памяти и
+        # файла не знает - путь берется у заместителя в главном процессе
+        state['source_path'] = getattr(model, 'source_path', None) or state.get('source_path')
+        record = {
+            'version': self.VERSION,
+            'model_id': model_id,
+            'model_name': model_name,
+            'constants': constants,
+            'source': _file_state(state.get('source_path')),
+            'saved_at': time.time(),
+            'state': state,
+        }
+        meta = np.frombuffer(json.dumps(record, ensure_ascii=False).encode('utf-8'), dtype=np.uint8)
+
+        path = self.path_for(model_id)
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                np.savez(f, **{self.META: meta}, **{name: np.asarray(a) for name, a in arrays.items()})
+                # Данные на диске до переименования: после сбоя питания иначе
+                # на месте снимка может оказаться пустой файл
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+        return path
+
+    def load(self, path):
+        # Снимок (параметры, массивы) или None, если файл поврежден или другой версии.
+        # Поврежденный снимок переименовывается в .bad и больше не читается
+        try:
+            with np.load(path, allow_pickle=False) as npz:
+                record = json.loads(npz[self.META].tobytes().decode('utf-8'))
+                if not isinstance(record, dict) or record.get('version') != self.VERSION:
+                    logger.warning("Снимок %s другой версии, пропускается", path)
+                    return None
+                if not (isinstance(record.get('model_id'), str) and isinstance(record.get('model_name'), str)
+                        and isinstance(record.get('constants'), dict) and isinstance(record.get('state'), dict)):
+                    raise ValueError("нет modelId, имени модели, констант или состояния")
+                arrays = {name: npz[name] for name in npz.files if name != self.META}
+        except (OSError, ValueError, KeyError, EOFError, zipfile.BadZipFile) as e:
+            logger.warning("Снимок %s поврежден (%s), пропускается", path, e)
+            self._set_aside(path)
+            return None
+        except Exception:
+            # Любая другая ошибка чтения не должна мешать запуску сервера
+            logger.exception("Не удалось прочитать снимок %s, пропускается", path)
+            self._set_aside(path)
+            return None
+        return record, arrays
+
+    @staticmethod
+    def _set_aside(path):
+        try:
+            os.replace(path, path + '.bad')
+        except OSError:
+            pass
+
+    @staticmethod
+    def is_current(record):
+        # Исходный файл не менялся после сохранения (или недоступен - тогда
+        # снимок остается единственным источником модели)
+        source = _file_state(record['state'].get('source_path'))
+        return source is None or source == record['source']
+
+    def remove(self, model_id):
+        try:
+            os.remove(self.path_for(model_id))
+        except FileNotFoundError:
+            pass
@@ -0,0 +1,80 @@
+import math
+import os
+import threading
+from collections import OrderedDict
+
+
+class ResultCache:
+    # Кеш результатов одной модели по входам, не больше max_entries записей
+    # (вытесняются давно не использованные). При resolution > 0 входы
+    # округляются к сетке с этим шагом: близкие значения дают один ключ
+    # и результат, посчитанный для первого из них.
+    #
+    # Константы модели (или переменные окружения по умолчанию):
+    #   result_cache_size       (MATH_RESULT_CACHE_SIZE)       - число записей, 0 - без кеша
+    #   result_cache_resolution (MATH_RESULT_CACHE_RESOLUTION) - шаг округления, 0 - точное совпадение
+
+    def __init__(self, max_entries, resolution=0.0):
+        self.max_entries = max_entries
+        self.resolution = resolution
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._items = OrderedDict()
+
+    @staticmethod
+    def defaults():
+        return {
+            'result_cache_size': os.environ.get('MATH_RESULT_CACHE_SIZE', '0'),
+            'result_cache_resolution': os.environ.get('MATH_RESULT_CACHE_RESOLUTION', '0'),
+        }
+
+    @classmethod
+    def from_constants(cls, constants):
+        # Кеш по константам Start или None, если он выключен
+        settings = cls.defaults()
+        settings.update({k: v for k, v in constants.items() if k in settings and v != ''})
+        max_entries = int(float(settings['result_cache_size']))
+        if max_entries <= 0:
+            return None
+        return cls(max_entries, float(settings['result_cache_resolution']))
+
+    def key(self, inputs):
+        if self.resolution > 0:
+            return tuple(round(value / self.resolution) for value in inputs)
+        return tuple(inputs)
+
+    def get_or_compute(self, inputs, compute):
+        # Результат compute(*inputs) из кеша или вычисленный и сохраненный.
+        # NaN и бесконечность считаются без кеша: NaN не равен себе, ключ
+        # с ним никогда не совпадет и только вытеснит полезные записи,
+        # а при округлении NaN и бесконечность вовсе не дают ключа
+        if not all(math.isfinite(value) for value in inputs):
+            return compute(*inputs)
+        key = self.key(inputs)
+
+        with self._lock:
+            result = self._items.get(key)
+            if result is not None:
+                self._items.move_to_end(key)
+                self.hits += 1
+                return result
+            self.misses += 1
+
+        result = compute(*inputs)
+        if result is not None:
+            with self._lock:
+                self._items[key] = result
+                if len(self._items) > self.max_entries:
+                    self._items.popitem(last=False)
+        return result
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'entries': len(self._items),
+                'hit_ratio': self.hits / total if total else 0.0,
+            }